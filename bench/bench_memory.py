@@ -0,0 +1,96 @@
+# Measure how many bytes a parsed page costs per node, comparing the slotted
+# node classes with dict-backed copies of the same tree (the old layout).
+#
+#   python3 bench/bench_memory.py [paragraphs]
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from code_func import markdown_to_html_node
+from htmlnode import HTMLNode, LeafNode, ParentNode
+from textnode import TextNode
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+def sample_markdown(paragraphs):
+    blocks = ["# Memory benchmark"]
+    for i in range(paragraphs):
+        blocks.append(f"Paragraph {i} has **bold**, _italic_, `code` and a [link](/page/{i}) in it.")
+        blocks.append(f"- item {i}\n- item with *emphasis*\n- [nav](/nav/{i})")
+    return "\n\n".join(blocks)
+
+
+def to_dict_nodes(node):
+    # Copy a tree into the dict-backed layout. Like the old parser, only nodes
+    # with attributes (links and images) get a props dict.
+    if isinstance(node, TextNode):
+        return DictTextNode(node.text, node.text_type, node.url)
+    children = None
+    if node.children is not None:
+        children = [to_dict_nodes(child) for child in node.children]
+    return DictHTMLNode(str(node.tag) if node.tag else node.tag, node.value, children,
+                        dict(node.props) if node.props else None)
+
+
+def to_slotted_nodes(node):
+    # The same copy into the current node classes, so both sides share the text
+    if isinstance(node, TextNode):
+        return TextNode(node.text, node.text_type, node.url)
+    if isinstance(node, ParentNode):
+        return ParentNode(node.tag, [to_slotted_nodes(child) for child in node.children], node.props)
+    return LeafNode(node.tag, node.value, node.props)
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        count += 1
+        if isinstance(item, (HTMLNode, DictHTMLNode)) and item.children:
+            stack.extend(item.children)
+    return count
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tree = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return tree, allocated
+
+
+def main():
+    paragraphs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    markdown = sample_markdown(paragraphs)
+
+    tree = markdown_to_html_node(markdown)
+    nodes = count_nodes(tree)
+    _, dict_bytes = measure(lambda: to_dict_nodes(tree))
+    _, slotted_bytes = measure(lambda: to_slotted_nodes(tree))
+
+    print(f"nodes per page:    {nodes}")
+    print(f"dict-backed nodes: {dict_bytes / nodes:7.1f} bytes/node")
+    print(f"slotted nodes:     {slotted_bytes / nodes:7.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
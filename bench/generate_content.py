@@ -0,0 +1,126 @@
+# Generate a deterministic synthetic content tree for benchmarks.
+#
+#   python3 bench/generate_content.py OUTPUT_DIR [--pages N] [--depth D] [--seed S] [--mix NAME]
+#
+# The same arguments always produce byte-identical files, so timings taken on
+# different commits are comparable.
+import argparse
+import os
+import random
+
+WORDS = ("elf hobbit ring mountain river shadow forest wizard tower road sword "
+         "star song king shire mithril dragon gate lake council").split()
+
+# Relative weights of each block kind per mix
+MIXES = {
+    "default": {"paragraph": 6, "long_paragraph": 1, "heading": 2, "list": 2, "ordered_list": 1,
+                "quote": 1, "code": 1, "links": 1, "image": 1, "pathological": 0},
+    "prose": {"paragraph": 4, "long_paragraph": 4, "heading": 1, "list": 0, "ordered_list": 0,
+              "quote": 1, "code": 0, "links": 0, "image": 0, "pathological": 0},
+    "lists": {"paragraph": 1, "long_paragraph": 0, "heading": 1, "list": 6, "ordered_list": 3,
+              "quote": 0, "code": 0, "links": 2, "image": 0, "pathological": 0},
+    "links": {"paragraph": 2, "long_paragraph": 0, "heading": 1, "list": 1, "ordered_list": 0,
+              "quote": 0, "code": 0, "links": 6, "image": 4, "pathological": 0},
+    "pathological": {"paragraph": 2, "long_paragraph": 1, "heading": 1, "list": 1, "ordered_list": 0,
+                     "quote": 0, "code": 0, "links": 0, "image": 0, "pathological": 4},
+}
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def inline_text(rng, count):
+    # Plain words with the occasional inline element
+    parts = []
+    for _ in range(count):
+        roll = rng.random()
+        word = rng.choice(WORDS)
+        if roll < 0.05:
+            parts.append(f"**{word}**")
+        elif roll < 0.10:
+            parts.append(f"_{word}_")
+        elif roll < 0.13:
+            parts.append(f"`{word}`")
+        elif roll < 0.16:
+            parts.append(f"[{word}](/pages/{rng.randrange(1000)})")
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+
+def make_block(rng, kind):
+    if kind == "paragraph":
+        return inline_text(rng, rng.randint(20, 80))
+    if kind == "long_paragraph":
+        return inline_text(rng, rng.randint(800, 2000))
+    if kind == "heading":
+        return "#" * rng.randint(2, 4) + " " + words(rng, rng.randint(2, 6))
+    if kind == "list":
+        return "\n".join("- " + inline_text(rng, rng.randint(3, 12)) for _ in range(rng.randint(5, 60)))
+    if kind == "ordered_list":
+        return "\n".join(f"{i}. " + inline_text(rng, rng.randint(3, 12)) for i in range(1, rng.randint(3, 30)))
+    if kind == "quote":
+        return "\n".join("> " + words(rng, rng.randint(5, 15)) for _ in range(rng.randint(1, 4)))
+    if kind == "code":
+        return "```\n" + "\n".join(f"    call({rng.choice(WORDS)})" for _ in range(rng.randint(2, 15))) + "\n```"
+    if kind == "links":
+        return " ".join(f"[{rng.choice(WORDS)}](/pages/{rng.randrange(1000)})" for _ in range(rng.randint(10, 50)))
+    if kind == "image":
+        return f"![{words(rng, 3)}](/images/{rng.choice(WORDS)}.png)"
+    if kind == "pathological":
+        # Unmatched delimiters that used to make inline parsing quadratic
+        unit = rng.choice(["* ", "_", "[x] ", "** ", "a_b "])
+        return words(rng, 5) + " " + unit * rng.randint(500, 3000)
+    raise ValueError(f"Unknown block kind: {kind}")
+
+
+def make_page(rng, title, blocks, mix):
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    body = [f"# {title}"]
+    body.extend(make_block(rng, kind) for kind in rng.choices(kinds, weights, k=blocks))
+    return "\n\n".join(body) + "\n"
+
+
+def page_paths(pages, depth, fanout=8):
+    # Spread pages over a directory tree at most depth levels deep
+    paths = ["index.md"]
+    for i in range(1, pages):
+        parts = []
+        n = i
+        for _ in range(1 + (i % depth)):
+            parts.append(f"section{n % fanout}")
+            n //= fanout
+        paths.append(os.path.join(*parts, f"page{i}", "index.md"))
+    return paths
+
+
+def generate(output_dir, pages=100, depth=3, blocks=40, seed=1, mix="default"):
+    rng = random.Random(seed)
+    mix_weights = MIXES[mix]
+    written = []
+    for relative_path in page_paths(pages, depth):
+        path = os.path.join(output_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(make_page(rng, f"Page {len(written)}", rng.randint(blocks // 2, blocks * 3 // 2), mix_weights))
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic markdown content tree")
+    parser.add_argument('output_dir')
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--blocks', type=int, default=40, help="average blocks per page")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mix', choices=sorted(MIXES), default="default")
+    args = parser.parse_args()
+    written = generate(args.output_dir, args.pages, args.depth, args.blocks, args.seed, args.mix)
+    print(f"Wrote {len(written)} pages to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# Run the benchmark suite and write the results as JSON.
+#
+#   python3 bench/run_benchmarks.py [--output results.json] [--compare baseline.json] [--threshold 0.10]
+#
+# Micro-benchmarks cover each stage of the pipeline (inline tokenizing, block
+# parsing, serialization) and an end-to-end benchmark runs main() over a
+# generated content tree. With --compare, any benchmark slower than the
+# baseline by more than --threshold is reported and the exit status is 1.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "src"))
+
+import main as site
+from code_func import markdown_to_html_node, text_to_textnodes
+from htmlnode import LeafNode, ParentNode
+from memo import DEFAULT_ENTRIES, inline_cache
+from generate_content import generate, make_block, make_page, MIXES
+
+RESULTS_VERSION = 1
+
+
+def time_runs(func, repeat, number=1, setup=None):
+    # Best-of and median wall time per call, in seconds. setup runs untimed
+    # before each sample.
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {"min": min(samples), "median": statistics.median(samples), "runs": repeat, "number": number}
+
+
+def micro_benchmarks(repeat):
+    # Stages are timed without the inline cache, which would turn every repeat
+    # of the same input into a cache hit; inline_cache.* measures it separately
+    inline_cache.resize(0)
+    rng = random.Random(7)
+    long_paragraph = make_block(rng, "long_paragraph")
+    pathological = " ".join(["* _ [x] ** `"] * 5000)
+    link_heavy = make_block(rng, "links") * 20
+    page = make_page(rng, "Benchmark page", 300, MIXES["default"])
+    tree = markdown_to_html_node(page)
+
+    deep = LeafNode("b", "leaf")
+    for _ in range(5000):
+        deep = ParentNode("div", [deep])
+
+    results = {
+        "text_to_textnodes.long_paragraph": time_runs(lambda: text_to_textnodes(long_paragraph), repeat, 20),
+        "text_to_textnodes.pathological": time_runs(lambda: text_to_textnodes(pathological), repeat, 5),
+        "text_to_textnodes.links": time_runs(lambda: text_to_textnodes(link_heavy), repeat, 20),
+        "markdown_to_html_node.page": time_runs(lambda: markdown_to_html_node(page), repeat, 5),
+        "to_html.page": time_runs(lambda: tree.to_html(), repeat, 5),
+        "to_html.deep": time_runs(lambda: deep.to_html(), repeat, 5),
+    }
+
+    # Distinct pages sharing navigation, footer and disclaimer text, rendered
+    # with and without the inline cache
+    boilerplate = make_block(rng, "list") + "\n\n" + make_block(rng, "paragraph") + "\n\n" + make_block(rng, "links")
+    pages = [make_page(rng, f"Page {i}", 20, MIXES["default"]) + "\n\n" + boilerplate for i in range(20)]
+
+    def render_pages():
+        # Start cold each run, so only repeats within the set of pages can hit
+        inline_cache.clear()
+        for page in pages:
+            markdown_to_html_node(page).to_html()
+
+    results["inline_cache.boilerplate.off"] = time_runs(render_pages, repeat)
+    inline_cache.resize(DEFAULT_ENTRIES)
+    results["inline_cache.boilerplate.on"] = time_runs(render_pages, repeat)
+    return results
+
+
+@contextlib.contextmanager
+def site_dir(pages, depth, mix):
+    # A throwaway site root with generated content, the real template and static files
+    tmp = tempfile.mkdtemp(prefix="ssg-bench-")
+    cwd = os.getcwd()
+    try:
+        generate(os.path.join(tmp, "content"), pages=pages, depth=depth, mix=mix)
+        shutil.copytree(os.path.join(ROOT_DIR, "static"), os.path.join(tmp, "static"))
+        shutil.copy(os.path.join(ROOT_DIR, "template.html"), os.path.join(tmp, "template.html"))
+        os.chdir(tmp)
+        yield tmp
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp)
+
+
+def build_benchmarks(repeat, pages, jobs):
+    results = {}
+    with site_dir(pages, depth=3, mix="default"):
+        def build(*args):
+            with contextlib.redirect_stdout(io.StringIO()):
+                site.main(["--quiet", *args])
+
+        def clean(keep_cache=False):
+            # A full build from scratch: no output to compare writes against,
+            # no manifest and, unless keep_cache, no cached parses on disk or
+            # in this process
+            shutil.rmtree(site.output_dir, ignore_errors=True)
+            if not keep_cache:
+                shutil.rmtree(".build", ignore_errors=True)
+                inline_cache.clear()
+
+        results[f"build.full.{pages}_pages"] = time_runs(lambda: build("--parse-cache-size", "0"), repeat,
+                                                         setup=clean)
+        if jobs > 1:
+            results[f"build.full.{pages}_pages.jobs_{jobs}"] = time_runs(
+                lambda: build("--parse-cache-size", "0", "--jobs", str(jobs)), repeat, setup=clean)
+        # The same build with the parse cache warmed by the one before it
+        build()
+        results[f"build.full_cached.{pages}_pages"] = time_runs(lambda: build(), repeat,
+                                                                setup=lambda: clean(keep_cache=True))
+        build()
+        results[f"build.incremental_noop.{pages}_pages"] = time_runs(lambda: build("--incremental"), repeat)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    # Return (name, baseline, current, change) for every benchmark that regressed
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None:
+            continue
+        change = current["min"] / previous["min"] - 1
+        if change > threshold:
+            regressions.append((name, previous["min"], current["min"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the static site generator benchmarks")
+    parser.add_argument('--output', default=os.path.join(ROOT_DIR, ".build", "bench.json"))
+    parser.add_argument('--compare', metavar='BASELINE', help="results JSON from another commit")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed slowdown as a fraction of the baseline (default 0.10)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=200, help="pages in the end-to-end build")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--skip-build', action='store_true', help="only run the micro-benchmarks")
+    args = parser.parse_args()
+
+    benchmarks = micro_benchmarks(args.repeat)
+    if not args.skip_build:
+        benchmarks.update(build_benchmarks(args.repeat, args.pages, args.jobs))
+
+    results = {
+        "version": RESULTS_VERSION,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": benchmarks,
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+
+    for name, timing in sorted(benchmarks.items()):
+        print(f"{name:<45} min {timing['min'] * 1000:10.3f} ms   median {timing['median'] * 1000:10.3f} ms")
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms (+{change:.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions above {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+# Build the site as N shards in parallel processes, then merge them into docs:
+#   ./build-sharded.sh N [main.py arguments...]
+N=${1:-4}
+[ $# -gt 0 ] && shift
+pids=""
+for i in $(seq 1 "$N"); do
+    python3 src/main.py "$@" --shard "$i/$N" --quiet &
+    pids="$pids $!"
+done
+for pid in $pids; do
+    wait "$pid" || failed=1
+done
+if [ -n "$failed" ]; then
+    echo "A shard failed; not merging"
+    exit 1
+fi
+python3 src/merge.py --shards "$N" --quiet
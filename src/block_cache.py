@@ -0,0 +1,67 @@
+from collections import OrderedDict
+
+from code_func import block_to_html_nodes, markdown_to_blocks
+
+# Pages whose blocks are kept; the least recently rendered page is dropped first
+DEFAULT_PAGES = 256
+
+
+class BlockCache:
+    # The rendered HTML of every block of recently rendered pages, so a long
+    # running process (watch mode, the dev server) only parses and serializes
+    # the blocks an edit actually changed. Blocks render independently of each
+    # other, so a block's text is all the key it needs, alongside the link
+    # rules its URLs were rewritten with.
+    def __init__(self, max_pages=DEFAULT_PAGES):
+        self.max_pages = max_pages
+        # src_path -> (rewriter key, {block text: (html, urls)})
+        self.pages = OrderedDict()
+        self.hits = self.misses = 0
+
+    def render(self, src_path, markdown, rewriter, links=None):
+        # Return the page's content HTML, the same as rendering the whole
+        # markdown_to_html_node tree after rewriter.rewrite, and add the
+        # page's URLs to links like rewrite would
+        previous = self.pages.pop(src_path, None)
+        if previous is None or previous[0] != rewriter.key:
+            previous = (rewriter.key, {})
+        old_blocks = previous[1]
+        blocks = {}
+        parts = ["<div>"]
+        for block in markdown_to_blocks(markdown):
+            rendered = blocks.get(block)
+            if rendered is None:
+                rendered = old_blocks.get(block)
+            if rendered is None:
+                self.misses += 1
+                rendered = self.render_block(block, rewriter)
+            else:
+                self.hits += 1
+            blocks[block] = rendered
+            parts.append(rendered[0])
+            if links is not None:
+                links.extend(rendered[1])
+        parts.append("</div>")
+
+        # Blocks that were edited away are dropped with the old mapping
+        self.pages[src_path] = (rewriter.key, blocks)
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+        return "".join(parts)
+
+    def render_block(self, block, rewriter):
+        # Returns (html, urls) for one block
+        parts = []
+        urls = []
+        for node in block_to_html_nodes(block):
+            rewriter.rewrite(node, urls)
+            parts.append(node.to_html())
+        return "".join(parts), tuple(urls)
+
+    def forget(self, src_path):
+        self.pages.pop(src_path, None)
+
+    def take_stats(self):
+        stats = (self.hits, self.misses)
+        self.hits = self.misses = 0
+        return stats
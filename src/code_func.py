@@ -1,6 +1,7 @@
 import re
 from textnode import TextNode, TextType, BlockType
 from htmlnode import LeafNode, ParentNode, text_node_to_html_node, HTMLNode
+from memo import inline_cache
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
@@ -90,105 +91,93 @@ def split_nodes_link(old_nodes):
             new_nodes.append(node)
     return new_nodes
 
+# Inline markers, in the order they win when several start at the same position
+INLINE_MARKERS = (
+    ("**", TextType.BOLD),
+    ("__", TextType.BOLD),
+    ("*", TextType.ITALIC),
+    ("_", TextType.ITALIC),
+    ("[", TextType.LINK),
+    ("`", TextType.CODE),
+)
+
+
+class _ForwardFinder:
+    # str.find with a remembered result per needle. The tokenizer only ever
+    # searches forward, so a cached position that is still ahead of the cursor
+    # (or a cached miss) is exactly what str.find would return, and each needle
+    # scans every character of the text at most once.
+    def __init__(self, text):
+        self.text = text
+        self.found = {}
+
+    def find(self, needle, start):
+        found = self.found.get(needle)
+        if found is None or (found != -1 and found < start):
+            found = self.text.find(needle, start)
+            self.found[needle] = found
+        return found
+
+
 def text_to_textnodes(text):
     nodes = []
-    remaining_text = text
-    
-    while remaining_text:
-        # Find the position of each marker, -1 if not found
-        bold_double_asterisk = remaining_text.find("**")
-        bold_double_underscore = remaining_text.find("__")
-        italic_asterisk = remaining_text.find("*")
-        italic_underscore = remaining_text.find("_")
-        link_start = remaining_text.find("[")
-        code_backtick = remaining_text.find("`")
-        
-        # Set invalid positions to a large number
-        if bold_double_asterisk == -1: bold_double_asterisk = float('inf')
-        if bold_double_underscore == -1: bold_double_underscore = float('inf')
-        if italic_asterisk == -1: italic_asterisk = float('inf')
-        if italic_underscore == -1: italic_underscore = float('inf')
-        if link_start == -1: link_start = float('inf')
-        if code_backtick == -1: code_backtick = float('inf')
-        
-        # Find the earliest marker
-        earliest_marker = min(bold_double_asterisk, bold_double_underscore, 
-                              italic_asterisk, italic_underscore, link_start, code_backtick)
-        
-        # If no markers found, add remaining text and break
-        if earliest_marker == float('inf'):
-            nodes.append(TextNode(remaining_text, TextType.TEXT))
+    finder = _ForwardFinder(text)
+    cursor = 0      # Where to look for the next marker
+    text_start = 0  # Start of the plain text not yet emitted
+
+    while cursor < len(text):
+        # Find the earliest marker at or after the cursor
+        marker_pos = -1
+        marker = text_type = None
+        for candidate, candidate_type in INLINE_MARKERS:
+            pos = finder.find(candidate, cursor)
+            if pos != -1 and (marker_pos == -1 or pos < marker_pos):
+                marker_pos, marker, text_type = pos, candidate, candidate_type
+
+        # If no markers found, the rest is plain text
+        if marker_pos == -1:
             break
-            
-        # Add any text before the marker
-        if earliest_marker > 0:
-            nodes.append(TextNode(remaining_text[:earliest_marker], TextType.TEXT))
-            
-        # Handle the appropriate marker type
-        if earliest_marker == bold_double_asterisk:
-            end = remaining_text.find("**", bold_double_asterisk + 2)
-            if end != -1:
-                nodes.append(TextNode(remaining_text[bold_double_asterisk + 2:end], TextType.BOLD))
-                remaining_text = remaining_text[end + 2:]  # Update remaining_text to skip past this marker
-            else:
-                 # If no closing marker, treat the opening marker as plain text and advance past it
-                nodes.append(TextNode(remaining_text[:bold_double_asterisk + 2], TextType.TEXT))
-                remaining_text = remaining_text[bold_double_asterisk + 2:]
-        elif earliest_marker == bold_double_underscore:
-            end = remaining_text.find("__", bold_double_underscore + 2)
-            if end != -1:
-                nodes.append(TextNode(remaining_text[bold_double_underscore + 2:end], TextType.BOLD))
-                remaining_text = remaining_text[end + 2:]
-            else:
-                nodes.append(TextNode(remaining_text[:bold_double_underscore + 2], TextType.TEXT))
-                remaining_text = remaining_text[bold_double_underscore + 2:]
-        elif earliest_marker == italic_asterisk:
-            end = remaining_text.find("*", italic_asterisk + 1)
-            if end != -1:
-                nodes.append(TextNode(remaining_text[italic_asterisk + 1:end], TextType.ITALIC))
-                remaining_text = remaining_text[end + 1:]
-            else:
-                nodes.append(TextNode(remaining_text[:italic_asterisk + 1], TextType.TEXT))
-                remaining_text = remaining_text[italic_asterisk + 1:]
-        elif earliest_marker == italic_underscore:
-            end = remaining_text.find("_", italic_underscore + 1)
-            if end != -1:
-                nodes.append(TextNode(remaining_text[italic_underscore + 1:end], TextType.ITALIC))
-                remaining_text = remaining_text[end + 1:]
-            else:
-                nodes.append(TextNode(remaining_text[:italic_underscore + 1], TextType.TEXT))
-                remaining_text = remaining_text[italic_underscore + 1:] 
-
-        elif earliest_marker == link_start:
-            # Look for closing bracket and opening parenthesis
-            closing_bracket = remaining_text.find("]", link_start)
-            if closing_bracket != -1 and remaining_text[closing_bracket + 1:closing_bracket + 2] == "(":
-                # Find closing parenthesis
-                closing_paren = remaining_text.find(")", closing_bracket)
+
+        node = None
+        if text_type == TextType.LINK:
+            # Look for closing bracket followed directly by an opening parenthesis
+            closing_bracket = finder.find("]", marker_pos)
+            if closing_bracket != -1 and text[closing_bracket + 1:closing_bracket + 2] == "(":
+                closing_paren = finder.find(")", closing_bracket)
                 if closing_paren != -1:
-                    # Extract link text and URL
-                    link_text = remaining_text[link_start + 1:closing_bracket]
-                    link_url = remaining_text[closing_bracket + 2:closing_paren]
-                    # Create link node (you'll need to define TextType.LINK)
-                    nodes.append(TextNode(link_text, TextType.LINK, link_url))
-                    remaining_text = remaining_text[closing_paren + 1:]
-                else:
-                    # No closing parenthesis, treat as plain text
-                    nodes.append(TextNode(remaining_text[:link_start + 1], TextType.TEXT))
-                    remaining_text = remaining_text[link_start + 1:]
-            else:
-                # No proper link format, treat as plain text
-                nodes.append(TextNode(remaining_text[:link_start + 1], TextType.TEXT))
-                remaining_text = remaining_text[link_start + 1:]  
-        elif earliest_marker == code_backtick:
-                end = remaining_text.find("`", code_backtick + 1)
-                if end != -1:
-                    nodes.append(TextNode(remaining_text[code_backtick + 1:end], TextType.CODE))
-                    remaining_text = remaining_text[end + 1:]
-                else:
-                    nodes.append(TextNode(remaining_text[:code_backtick + 1], TextType.TEXT))
-                    remaining_text = remaining_text[code_backtick + 1:]      
-    return nodes   
+                    link_text = text[marker_pos + 1:closing_bracket]
+                    link_url = text[closing_bracket + 2:closing_paren]
+                    node = TextNode(link_text, TextType.LINK, link_url)
+                    end = closing_paren + 1
+        else:
+            closing = finder.find(marker, marker_pos + len(marker))
+            if closing != -1:
+                node = TextNode(text[marker_pos + len(marker):closing], text_type)
+                end = closing + len(marker)
+
+        if node is None:
+            # No closing marker: the opening marker is plain text, keep scanning past it
+            cursor = marker_pos + len(marker)
+            continue
+
+        # Emit any plain text before the marker, then the formatted node
+        if marker_pos > text_start:
+            nodes.append(TextNode(text[text_start:marker_pos], TextType.TEXT))
+        nodes.append(node)
+        cursor = text_start = end
+
+    if text_start < len(text):
+        nodes.append(TextNode(text[text_start:], TextType.TEXT))
+    return nodes
+
+def parse_inline(text):
+    # text_to_textnodes through the shared inline cache. The result may be an
+    # InlineRun shared with other blocks, so use it as a node's children and
+    # never modify it in place.
+    if not text:
+        return []
+    return inline_cache.parse(text, text_to_textnodes)
+
 
 def markdown_to_blocks(markdown):
     # Split markdown into blocks
@@ -201,135 +190,216 @@ def markdown_to_blocks(markdown):
     return blocks
 
 def block_to_block_type(block):
-    # Determine the type of block
-    count = 0 # Count the number of hashes
-    while count < len(block) and block[count] == "#":
-        count += 1
-    if count > 6 or (count > 0 and (len(block) <= count or block[count] != " ")):
-        return BlockType.PARAGRAPH
-    elif block.startswith("#"):
-        count = 0
-        while count < len(block) and block[count] == "#":
-            count += 1
-        if 1 <= count <= 6 and len(block) > count and block[count] == " ":
-            return BlockType.HEADING
-    elif block.startswith("```") and block.endswith("```"):
-        if len(block.strip()) > 6: 
-            return BlockType.CODE
-    # Check every line in a quote block starts with ">"
-    elif all(line.lstrip().startswith(">") for line in block.split("\n")):
-        return BlockType.QUOTE
-    # Check every line in an unordered list block starts with "- "
-    elif all(re.match(r"^- ", line) for line in block.split("\n")):
-        return BlockType.UNORDERED_LIST
-    # Check every line in an ordered list block starts with the number 1 and go down by increments followed by ". "
-    elif all(re.match(r"^\d+\. ", line) for line in block.split("\n")):
-        return BlockType.ORDERED_LIST
-    elif block.startswith("!["):
-        return BlockType.IMAGE
-    elif block.startswith("[") and block.endswith(")"):
-        return BlockType.LINK
-    else:
-        return BlockType.PARAGRAPH
+    # Determine the type of block; custom block kinds return whatever
+    # block_type they were registered with
+    handler, _ = classify_block(block)
+    return handler.block_type
+
+class MarkdownBlockStream:
+    # Yields the same blocks as markdown_to_blocks, but reads its input one line
+    # at a time (e.g. from an open file) so the document is never held in
+    # memory. The title is picked up on the way, as extract_title would find it.
+    def __init__(self, lines):
+        self.lines = lines
+        self.title = None
+
+    def __iter__(self):
+        block_lines = []
+        for line in self.lines:
+            if line.endswith("\n"):
+                line = line[:-1]
+            if self.title is None and line.startswith("# "):
+                self.title = line[2:].strip()
+            if line:
+                block_lines.append(line)
+                continue
+            # An empty line ends the current block, like "\n\n" in markdown_to_blocks
+            block = "\n".join(block_lines).strip()
+            block_lines = []
+            if block:
+                yield block
+        block = "\n".join(block_lines).strip()
+        if block:
+            yield block
+
+
+def iter_block_html_nodes(blocks):
+    # Convert each block to its HTML node as it arrives, so blocks can come
+    # from a list or lazily from a MarkdownBlockStream
+    for block in blocks:
+        yield from block_to_html_nodes(block)
+
 
 def markdown_to_html_node(markdown):
     # Convert markdown to single parent HTMLNode
     blocks = markdown_to_blocks(markdown)
-    # Determine the type of block
-    block_types = [block_to_block_type(block) for block in blocks]
-    # Create an appropriate HTML node based on its type using text_node_to_html_node
-    html_nodes = []
-
-    # Process each block individually with its type at the same time
-    for block, block_type in zip(blocks[:], block_types):
-        if block_type == BlockType.PARAGRAPH:
-            html_nodes.append(ParentNode("p", text_to_textnodes(block)))
-
-        elif block_type == BlockType.HEADING:
-            count = 0
-            while count < len(block) and block[count] == "#":
-                count += 1
-            # Ensure that a missing space doesn't break our function
-            html_nodes.append(ParentNode(f"h{count}", text_to_textnodes(block[count+1:].strip())))
-
-        elif block_type == BlockType.IMAGE:
-            alt_start = block.index("[") + 1
-            alt_end = block.index("]")
-            url_start = block.index("(") + 1
-            url_end = block.index(")")
-
-            alt_text = block[alt_start:alt_end].strip()
-            url = block[url_start:url_end].strip()
-
-            html_nodes.append(LeafNode("img", [], {"src": url, "alt": alt_text}))
-            
-        
-        elif block_type == BlockType.CODE:
-            content = block[3:-3].strip()  # Extract the content of the code block
-
-            # Create a <code> tag as a ParentNode with the TextNode content
-            code_node = ParentNode("code", [TextNode(content, TextType.CODE)])
-            
-            # Wrap the <code> tag in a <pre> tag
-            pre_node = ParentNode("pre", [code_node])
-
-            # Append the resulting <pre> element to the list of nodes
-            html_nodes.append(pre_node)
-
-        elif block_type == BlockType.LINK:
-            text_start = block.find("[") + 1
-            text_end = block.find("]")
-            url_start = block.find("(") + 1
-            url_end = block.find(")")
-
-            # Ensure all positions are valid
-            if text_start > 0 and text_end > 0 and url_start > 0 and url_end > 0:
-                link_text = block[text_start:text_end].strip()
-                href = block[url_start:url_end].strip()
-                link_node = ParentNode("a", [TextNode(link_text, TextType.TEXT)], {"href": href})
-                html_nodes.append(link_node)
+    # wrap all nodes into a single parent <div> node
+    return ParentNode("div", list(iter_block_html_nodes(blocks)))
+
+
+def block_to_html_nodes(block):
+    # Returns the HTML nodes for one block (empty when the block is skipped)
+    handler, found = classify_block(block)
+    return handler.render(block, found)
+
+
+class BlockHandler:
+    # One kind of block. It matches either the block as a whole, through
+    # match(block), or line by line, through a compiled regex every line must
+    # match. A match returns something truthy (a match object, a list of line
+    # matches, True) that is handed to render(block, found), so the renderer
+    # doesn't have to parse the block again. render returns a list of nodes.
+    __slots__ = ("block_type", "render", "match", "line")
+
+    def __init__(self, block_type, render, match=None, line=None):
+        if (match is None) == (line is None):
+            raise ValueError("A block handler needs exactly one of match or line")
+        self.block_type = block_type
+        self.render = render
+        self.match = match
+        self.line = re.compile(line) if isinstance(line, str) else line
+
+    def __repr__(self):
+        return f"BlockHandler({self.block_type})"
+
+
+# Handlers in the order they are tried; a block nothing claims is a paragraph
+block_handlers = []
+
+
+def register_block(block_type, render, match=None, line=None, before=None):
+    # Add a block kind, such as tables or admonitions, without touching the
+    # built-in ones. It is tried before the handler registered for block_type
+    # `before`, or after all of them by default. Register at import time so
+    # worker processes started with --jobs know about it too.
+    handler = BlockHandler(block_type, render, match, line)
+    position = len(block_handlers)
+    if before is not None:
+        position = [existing.block_type for existing in block_handlers].index(before)
+    block_handlers.insert(position, handler)
+    return handler
+
+
+def _match_lines(block):
+    # Run every line-based handler over the block in a single pass, dropping
+    # each handler at its first non-matching line. Returns {handler: matches}
+    # for the handlers that matched every line.
+    candidates = {handler: [] for handler in block_handlers if handler.line is not None}
+    for line in block.split("\n"):
+        for handler in list(candidates):
+            found = handler.line.match(line)
+            if found is None:
+                del candidates[handler]
             else:
-                # Handle malformed link syntax (optional: raise an error or skip)
-                print("Malformed link: treating as paragraph", block)
-                html_nodes.append(ParentNode("p", [TextNode(block, TextType.TEXT)]))
+                candidates[handler].append(found)
+        if not candidates:
+            break
+    return candidates
 
 
+def classify_block(block):
+    # Returns (handler, found) for the first handler that claims the block
+    line_matches = None
+    for handler in block_handlers:
+        if handler.match is not None:
+            found = handler.match(block)
+        else:
+            if line_matches is None:
+                line_matches = _match_lines(block)
+            found = line_matches.get(handler)
+        if found:
+            return handler, found
+    return paragraph_handler, None
 
-        elif block_type == BlockType.QUOTE:
-            lines = block.split("\n")
-            clean_lines = []
-            for line in lines:
-                stripped_line = line.lstrip(">").strip()
-                clean_lines.append(stripped_line)
 
-            cleaned_text = "\n".join(clean_lines)
-            html_nodes.append(ParentNode("blockquote", text_to_textnodes(cleaned_text)))
+def _render_paragraph(block, found):
+    return [ParentNode("p", parse_inline(block))]
 
-        elif block_type == BlockType.UNORDERED_LIST:
-            items = block.split("\n")
-            items = [item.lstrip("- \t") for item in items]
-            items = [ParentNode("li", text_to_textnodes(item)) for item in items]
 
-            if items:
-                html_nodes.append(ParentNode("ul", items))
-            else:
-                print("Warning: Empty unordered list detected, skipping")
-
-        elif block_type == BlockType.ORDERED_LIST:
-            items = block.split("\n") # Split the block into lines
-            list_items = []
-            for item in items:
-                parts = item.split(".", 1) #Split at the first dot
-                if len(parts) > 1 and parts[1].strip(): # Ensure there is a nubmer and content
-                    content = parts[1].strip() #Extract the part after the dot
-                    list_items.append(ParentNode("li", text_to_textnodes(content)))
-            if list_items:
-                html_nodes.append(ParentNode("ol", list_items))
-            else:
-                print("Warning: Empty ordered list detected, skipping")
-          
-    # wrap all nodes into a single parent <div> node
-    return ParentNode("div", html_nodes)
+def _render_heading(block, found):
+    level = len(found.group(1))
+    return [ParentNode(f"h{level}", parse_inline(block[level + 1:].strip()))]
+
+
+def _match_code(block):
+    return block.startswith("```") and block.endswith("```")
+
+
+def _render_code(block, found):
+    # A fence with nothing inside renders nothing
+    if len(block) <= 6:
+        return []
+    content = block[3:-3].strip()  # Extract the content of the code block
+    # Wrap a <code> tag holding the content in a <pre> tag
+    return [ParentNode("pre", [ParentNode("code", [TextNode(content, TextType.CODE)])])]
+
+
+def _render_quote(block, found):
+    clean_lines = [line.lstrip(">").strip() for line in block.split("\n")]
+    return [ParentNode("blockquote", parse_inline("\n".join(clean_lines)))]
+
+
+def _render_unordered_list(block, found):
+    items = [ParentNode("li", parse_inline(item.lstrip("- \t"))) for item in block.split("\n")]
+    return [ParentNode("ul", items)]
+
+
+def _render_ordered_list(block, found):
+    # found holds the match for each line; the item text follows "N. "
+    list_items = []
+    for line_match in found:
+        content = line_match.string[line_match.end():].strip()
+        if content:
+            list_items.append(ParentNode("li", parse_inline(content)))
+    if not list_items:
+        print("Warning: Empty ordered list detected, skipping")
+    return [ParentNode("ol", list_items)] if list_items else []
+
+
+def _match_image(block):
+    return block.startswith("![")
+
+
+def _render_image(block, found):
+    alt_start = block.index("[") + 1
+    alt_end = block.index("]")
+    url_start = block.index("(") + 1
+    url_end = block.index(")")
+
+    alt_text = block[alt_start:alt_end].strip()
+    url = block[url_start:url_end].strip()
+    return [LeafNode("img", [], {"src": url, "alt": alt_text})]
+
+
+def _match_link(block):
+    # The bracket positions, found once for the renderer
+    if block.startswith("[") and block.endswith(")"):
+        return block.find("]"), block.find("("), block.find(")")
+    return None
+
+
+def _render_link(block, found):
+    text_end, url_start, url_end = found
+    # Ensure all positions are valid
+    if text_end > 0 and url_start >= 0:
+        link_text = block[1:text_end].strip()
+        href = block[url_start + 1:url_end].strip()
+        return [ParentNode("a", [TextNode(link_text, TextType.TEXT)], {"href": href})]
+    # Handle malformed link syntax
+    print("Malformed link: treating as paragraph", block)
+    return [ParentNode("p", [TextNode(block, TextType.TEXT)])]
+
+
+paragraph_handler = BlockHandler(BlockType.PARAGRAPH, _render_paragraph, match=bool)
+
+register_block(BlockType.HEADING, _render_heading, match=re.compile(r"(#{1,6}) ").match)
+register_block(BlockType.CODE, _render_code, match=_match_code)
+register_block(BlockType.QUOTE, _render_quote, line=r"\s*>")
+register_block(BlockType.UNORDERED_LIST, _render_unordered_list, line=r"- ")
+register_block(BlockType.ORDERED_LIST, _render_ordered_list, line=r"\d+\. ")
+register_block(BlockType.IMAGE, _render_image, match=_match_image)
+register_block(BlockType.LINK, _render_link, match=_match_link)
+
 
 def extract_title(markdown):
     # Split the markdown into lines
@@ -0,0 +1,78 @@
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from console import info
+from manifest import hash_bytes
+from output import write_if_changed
+
+# Text formats worth precompressing; images, fonts and archives already are
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css', '.js', '.mjs', '.json', '.svg', '.xml', '.txt', '.map',
+                           '.webmanifest')
+# Below this many bytes the gzip header and the extra request cost more than they save
+MIN_SIZE = 1024
+
+
+def gzip_bytes(data):
+    # wbits=31 asks zlib for a gzip container. Its header carries no mtime or
+    # filename, so the same input always gives byte-identical sidecars.
+    compressor = zlib.compressobj(zlib.Z_BEST_COMPRESSION, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def is_compressible(path, min_size=MIN_SIZE):
+    return path.endswith(COMPRESSIBLE_EXTENSIONS) and os.path.isfile(path) and os.path.getsize(path) >= min_size
+
+
+def compress_file(path, previous_hash=None):
+    # Write path + '.gz' unless the sidecar already matches the file's current
+    # contents. Returns (source_hash, action) where action is "compressed",
+    # "reused" or "skipped" (gzip didn't make it smaller, so no sidecar is kept).
+    with open(path, 'rb') as f:
+        data = f.read()
+    source_hash = hash_bytes(data)
+    sidecar = path + '.gz'
+    if source_hash == previous_hash and os.path.isfile(sidecar):
+        return source_hash, "reused"
+    compressed = gzip_bytes(data)
+    if len(compressed) >= len(data):
+        if os.path.isfile(sidecar):
+            os.remove(sidecar)
+        return source_hash, "skipped"
+    write_if_changed(sidecar, compressed)
+    return source_hash, "compressed"
+
+
+def compress_outputs(paths, previous=None, min_size=MIN_SIZE, threads=os.cpu_count() or 1):
+    # Keep a .gz sidecar next to every compressible file in paths. previous maps
+    # output paths to the source hash their sidecar was made from (as returned
+    # by the last call); sidecars of files no longer listed are removed.
+    # zlib releases the GIL while compressing, so threads are enough here.
+    previous = previous or {}
+    candidates = sorted({os.path.normpath(path) for path in paths if is_compressible(path, min_size)})
+    jobs = [(path, previous.get(path)) for path in candidates]
+    if len(jobs) > 1 and threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(lambda job: compress_file(*job), jobs))
+    else:
+        results = [compress_file(*job) for job in jobs]
+
+    compressed = {}
+    counts = {"compressed": 0, "reused": 0, "skipped": 0}
+    for path, (source_hash, action) in zip(candidates, results):
+        counts[action] += 1
+        if action != "skipped":
+            compressed[path] = source_hash
+        if action == "compressed":
+            info(f"Compressed '{path}'")
+
+    for path in sorted(set(previous) - set(compressed)):
+        sidecar = path + '.gz'
+        if os.path.isfile(sidecar):
+            os.remove(sidecar)
+            info(f"Removed stale sidecar '{sidecar}'")
+
+    if candidates:
+        info(f"Gzip: {counts['compressed']} compressed, {counts['reused']} reused, "
+             f"{counts['skipped']} not worth compressing.")
+    return compressed
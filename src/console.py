@@ -0,0 +1,14 @@
+# Progress messages go through info() so --quiet can silence them; warnings
+# and errors are printed directly and always shown
+
+quiet = False
+
+
+def set_quiet(value):
+    global quiet
+    quiet = value
+
+
+def info(message):
+    if not quiet:
+        print(message)
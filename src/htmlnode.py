@@ -1,77 +1,161 @@
+import sys
 from textnode import TextType, TextNode
+from memo import InlineRun, inline_cache
+
+# Translate tables escape a whole string in one C-level pass
+TEXT_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+ATTR_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+
+def escape_text(text):
+    # Most text has nothing to escape, and the membership tests are much
+    # cheaper than a translate that copies the string
+    if "&" in text or "<" in text or ">" in text:
+        return text.translate(TEXT_ESCAPES)
+    return text
+
+
+def escape_attr(value):
+    if "&" in value or "<" in value or ">" in value or '"' in value:
+        return value.translate(ATTR_ESCAPES)
+    return value
+
+
+def attrs_to_html(props):
+    if not props:
+        return ""
+    return "".join(f' {key}="{escape_attr(str(value))}"' for key, value in props.items())
+
 
 class HTMLNode ():
+    # Pages create tens of thousands of nodes, so skip the per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        # Interning makes every node with the same tag share one string
+        self.tag = sys.intern(tag) if type(tag) is str else tag
         self.value = value
         self.children = children 
-        self.props = props
+        # Nodes without attributes keep None rather than allocating an empty dict
+        self.props = props if props else None
     
     def to_html(self):
-        if self.tag is None:
-            return self.value
-        
-        attrs_html = ""
-        for attr, value in self.props.items():
-            attrs_html += f' {attr}="{value}"'
-        
-        if self.tag in self.SELF_CLOSING_TAGS:
-            return f"<{self.tag}{attrs_html}/>"
-        
-        # Check if this is a parent node with no children
-        if not self.children:
-            # For parent nodes with no children, return an empty element
-            return f"<{self.tag}{attrs_html}></{self.tag}>"
-        
-        children_html = ""
-        for child in self.children:
-            children_html += child.to_html()
-        
-        return f"<{self.tag}{attrs_html}>{children_html}</{self.tag}>"
+        return "".join(iter_html(self))
+
+    def write_html(self, writer):
+        # Stream the serialized node into anything with a write() method
+        write_html(self, writer)
     
     def props_to_html(self):
-        if not self.props:
-            return ""
-        props_html = ""
-        for key, value in self.props.items():
-            props_html += f' {key}="{value}"'
-        return props_html.rstrip()
+        return attrs_to_html(self.props)
           
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
     
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         super().__init__(tag, value, None, props)
-    
-    def to_html(self):
-        if self.value == None and self.tag == None:
-            raise ValueError("All leaf nodes must have either a tag or a value")
-        elif self.tag == None:
-            return self.value
-        elif self.value == None:
-            # Self-closing tag
-            return f"<{self.tag}{self.props_to_html()} />"
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, children=None, props=None):
         if children is None:
             children = []
         super().__init__(tag, None, children, props=props)
 
-    def to_html(self):
-        if self.tag == None:
-            raise ValueError("All parent nodes must have a tag")
-        elif self.children == []:
-            raise ValueError("All parent nodes must have children")
-        children_html = ""
-        for child in self.children:
-            if not hasattr(child, 'to_html') or not callable(child.to_html):
-                raise TypeError(f"Child node must be an HTMLNode or compatible type. Found: {type(child)}")
-            children_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+
+def _leaf_html(node):
+    if node.value is None and node.tag is None:
+        raise ValueError("All leaf nodes must have either a tag or a value")
+    elif node.tag is None:
+        return escape_text(str(node.value))
+    elif node.value is None:
+        # Self-closing tag
+        return f"<{node.tag}{attrs_to_html(node.props)} />"
+    return f"<{node.tag}{attrs_to_html(node.props)}>{escape_text(str(node.value))}</{node.tag}>"
+
+
+def _text_node_html(node):
+    text = escape_text(node.text)
+    if node.text_type == TextType.TEXT:
+        return text
+    elif node.text_type == TextType.BOLD:
+        return f"<b>{text}</b>"
+    elif node.text_type == TextType.ITALIC:
+        return f"<i>{text}</i>"
+    elif node.text_type == TextType.CODE:
+        return f"<code>{text}</code>"
+    elif node.text_type == TextType.LINK:
+        return f'<a href="{escape_attr(str(node.url))}">{text}</a>'
+    elif node.text_type == TextType.IMAGE:
+        return f'<img src="{escape_attr(str(node.url))}" alt="{escape_attr(node.text)}">'
+    raise ValueError(f"Invalid text type: {node.text_type}")
+
+
+class _CloseTag:
+    # Pushed on the serializer's stack to emit a closing tag after the children
+    __slots__ = ("html",)
+
+    def __init__(self, tag):
+        self.html = f"</{tag}>"
+
+
+def iter_html(node):
+    # Yield the HTML for node as a stream of fragments. The tree is walked with
+    # an explicit stack, so deep trees can't hit the recursion limit and no
+    # subtree is ever copied into an intermediate string.
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, _CloseTag):
+            yield item.html
+        elif isinstance(item, TextNode):
+            yield _text_node_html(item)
+        elif not isinstance(item, HTMLNode) or type(item).to_html is not HTMLNode.to_html:
+            # Any other object, or a node subclass with its own rendering
+            yield item.to_html()
+        elif isinstance(item, LeafNode):
+            yield _leaf_html(item)
+        elif isinstance(item, ParentNode):
+            if item.tag is None:
+                raise ValueError("All parent nodes must have a tag")
+            elif item.children == []:
+                raise ValueError("All parent nodes must have children")
+            if type(item.children) is InlineRun:
+                # Parsed inline text shared through the inline cache; its HTML
+                # is built once and reused wherever the same text appears
+                yield f"<{item.tag}{attrs_to_html(item.props)}>"
+                yield inline_cache.render(item.children, _text_node_html)
+                yield f"</{item.tag}>"
+                continue
+            for child in item.children:
+                if not hasattr(child, 'to_html') or not callable(child.to_html):
+                    raise TypeError(f"Child node must be an HTMLNode or compatible type. Found: {type(child)}")
+            yield f"<{item.tag}{attrs_to_html(item.props)}>"
+            stack.append(_CloseTag(item.tag))
+            stack.extend(reversed(item.children))
+        else:
+            # A bare HTMLNode is either raw text, a leaf or an element with children
+            if item.tag is None:
+                yield escape_text(str(item.value)) if item.value is not None else ""
+            elif item.children:
+                yield f"<{item.tag}{attrs_to_html(item.props)}>"
+                stack.append(_CloseTag(item.tag))
+                stack.extend(reversed(item.children))
+            else:
+                yield _leaf_html(item)
+
+
+def write_html(node, writer):
+    # writer can be an open file, an io.StringIO or anything else with write()
+    write = writer.write
+    for fragment in iter_html(node):
+        write(fragment)
+
     
 def text_node_to_html_node(text_node):
     if text_node.text_type == TextType.TEXT:
@@ -0,0 +1,70 @@
+import os
+from collections import namedtuple
+
+PAGE = "page"
+ASSET = "asset"
+
+# A source file as seen by the scan. relative_path is relative to the tree the
+# file was found in; size and mtime_ns come from the scan's single stat call.
+SourceFile = namedtuple("SourceFile", ["kind", "path", "relative_path", "size", "mtime_ns"])
+
+
+def scan_tree(root, kind, files=None, relative_dir=""):
+    # Append a SourceFile for every file under root and return the list. The
+    # entry type comes from the directory listing itself, so each file costs
+    # exactly one stat and each directory none. Only .md files count as pages.
+    if files is None:
+        files = []
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except (FileNotFoundError, NotADirectoryError):
+        return files
+    for entry in entries:
+        relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+        if entry.is_dir():
+            scan_tree(entry.path, kind, files, relative_path)
+        elif entry.is_file():
+            if kind == PAGE and not entry.name.endswith('.md'):
+                continue
+            stat = entry.stat()
+            files.append(SourceFile(kind, entry.path, relative_path, stat.st_size, stat.st_mtime_ns))
+        else:
+            print(f"Skipped '{entry.path}' (not a regular file or directory).")
+    return files
+
+
+class Inventory:
+    # Every page and asset of the site, found by one walk of each tree. The
+    # copy and render phases, fingerprinting, the metadata index and the
+    # watcher all work from the same list instead of walking and stat-ing the
+    # trees again.
+    def __init__(self, files=()):
+        # Sorted by kind, then relative path, so builds see a stable order
+        self.files = sorted(files, key=lambda f: (f.kind, f.relative_path))
+        self.by_path = {f.path: f for f in self.files}
+
+    @classmethod
+    def scan(cls, content_dir=None, static_dir=None):
+        files = []
+        if content_dir is not None:
+            scan_tree(content_dir, PAGE, files)
+        if static_dir is not None:
+            scan_tree(static_dir, ASSET, files)
+        return cls(files)
+
+    def pages(self):
+        return [f for f in self.files if f.kind == PAGE]
+
+    def assets(self):
+        return [f for f in self.files if f.kind == ASSET]
+
+    def get(self, path):
+        return self.by_path.get(path)
+
+    def snapshot(self):
+        # path -> (mtime_ns, size), what the watcher compares between polls
+        return {f.path: (f.mtime_ns, f.size) for f in self.files}
+
+    def __len__(self):
+        return len(self.files)
@@ -0,0 +1,110 @@
+import os
+import posixpath
+import re
+from urllib.parse import unquote, urlsplit
+
+# "https:", "mailto:", "data:" and so on; anything with a scheme leaves the site
+SCHEME_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
+
+
+def link_path(url):
+    # The path part of an internal URL, or None for URLs the check skips:
+    # other schemes, other hosts ("//host/x") and bare fragments ("#top")
+    if not url or url.startswith(("#", "//")) or SCHEME_RE.match(url):
+        return None
+    if "?" not in url and "#" not in url and "%" not in url:
+        return url
+    return unquote(urlsplit(url).path)
+
+
+def output_names(paths, dest_dir):
+    # Output paths -> the set of /-separated paths relative to dest_dir that links resolve against
+    return {os.path.relpath(path, dest_dir).replace(os.sep, "/") for path in paths}
+
+
+class LinkIndex:
+    # Every internal URL the build wrote, by the source it came from. Pages
+    # hand their URLs over as they are rendered (see LinkRewriter.rewrite), so
+    # once the outputs are all known the whole site is checked with one set
+    # lookup per link, without parsing anything again.
+    def __init__(self, basepath):
+        self.basepath = basepath
+        # (source, page_dir, urls); page_dir is the /-separated directory of
+        # the source's output that relative URLs resolve against, or None
+        # when there is no single one (the template is part of every page)
+        self.sources = []
+
+    def add(self, source, urls, output=None):
+        page_dir = posixpath.dirname(output) if output is not None else None
+        self.sources.append((source, page_dir, urls))
+
+    def target(self, path, page_dir):
+        # The output path a link's path points at, relative to the output
+        # directory, or None when it can't be resolved
+        if path.startswith("/"):
+            if path + "/" == self.basepath:
+                return ""
+            if not path.startswith(self.basepath):
+                return None
+            return path[len(self.basepath):]
+        if page_dir is None:
+            return None
+        return posixpath.join(page_dir, path) if path else page_dir + "/"
+
+    def check(self, outputs):
+        # Return (source, url, reason) for every link that doesn't lead to one
+        # of outputs, a set of /-separated paths relative to the output directory
+        broken = []
+        # Most URLs (navigation, shared images) recur on many pages, so each
+        # is resolved once; relative ones once per directory
+        reasons = {}
+        for source, page_dir, urls in self.sources:
+            for url in urls:
+                key = url if url.startswith("/") else (page_dir, url)
+                if key in reasons:
+                    reason = reasons[key]
+                else:
+                    reason = reasons[key] = self.resolve(url, page_dir, outputs)
+                if reason is not None:
+                    broken.append((source, url, reason))
+        return broken
+
+    def resolve(self, url, page_dir, outputs):
+        # Why url is broken, or None if it is fine or not checked
+        path = link_path(url)
+        if path is None or (page_dir is None and not path.startswith("/")):
+            return None
+        target = self.target(path, page_dir)
+        if target is None:
+            return f"outside the site's basepath {self.basepath}"
+        # Pages are served from their directory's index.html, and hosts such
+        # as GitHub Pages also serve /x from x.html
+        target = posixpath.normpath(target).lstrip("/") if target.strip("/") else ""
+        if target.startswith("../"):
+            return "outside the site"
+        if (target in outputs or posixpath.join(target, "index.html") in outputs
+                or target + ".html" in outputs):
+            return None
+        return "no such page or file"
+
+
+def check_site(manifest, dest_dir, basepath, outputs):
+    # Check every link a build's manifest records: each page's, plus the
+    # template's and the listing pages' kept in manifest.links. outputs are
+    # the paths of everything the site contains.
+    index = LinkIndex(basepath)
+    for key, entry in sorted(manifest.pages.items()):
+        index.add(key, entry.get("links", ()), output_names([entry["output"]], dest_dir).pop())
+    listings = set(manifest.listings)
+    for key, urls in sorted(manifest.links.items()):
+        index.add(key, urls, output_names([key], dest_dir).pop() if key in listings else None)
+    return index.check(output_names(outputs, dest_dir))
+
+
+def report(broken, strict=False):
+    # Print the broken links; with strict they are errors rather than warnings
+    label = "Error" if strict else "Warning"
+    for source, url, reason in broken:
+        print(f"{label}: broken link in {source}: {url} ({reason})")
+    if broken:
+        print(f"{len(broken)} broken internal link(s)")
@@ -0,0 +1,160 @@
+import re
+
+from htmlnode import HTMLNode, LeafNode
+from manifest import hash_bytes
+from textnode import TextNode, TextType
+
+# Attributes that hold URLs
+URL_ATTRS = ("href", "src")
+# Inline text nodes that become <a href> and <img src>
+URL_TEXT_TYPES = (TextType.LINK, TextType.IMAGE)
+
+# Used only on templates, which are rewritten once per build, never per page
+TAG_RE = re.compile(r"<([A-Za-z][\w-]*)([^>]*?)(\s*/?)>")
+URL_ATTR_RE = re.compile(r'(\s)(href|src)="([^"]*)"')
+
+
+def html_urls(html):
+    # The href/src URLs in raw HTML, such as a template after rewrite_html
+    return [url for _, _, url in URL_ATTR_RE.findall(html)]
+
+
+class BasepathRule:
+    # Prefix site-absolute URLs ("/images/a.png") with the basepath the site is served under
+    def __init__(self, basepath):
+        self.basepath = basepath
+
+    def __call__(self, tag, props):
+        for attr in URL_ATTRS:
+            url = props.get(attr)
+            # "//host/path" is protocol-relative, not site-absolute
+            if url and url.startswith("/") and not url.startswith("//"):
+                props[attr] = self.basepath + url[1:]
+
+    def __repr__(self):
+        return f"BasepathRule({self.basepath!r})"
+
+
+class UrlMapRule:
+    # Replace exact URLs, e.g. asset paths with their fingerprinted names
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def __call__(self, tag, props):
+        for attr in URL_ATTRS:
+            url = props.get(attr)
+            if url in self.mapping:
+                props[attr] = self.mapping[url]
+
+    def __repr__(self):
+        # The repr is part of LinkRewriter.key, so it has to change with the mapping
+        return f"UrlMapRule({hash_bytes(repr(sorted(self.mapping.items())).encode('utf-8'))})"
+
+
+class ExternalLinkRule:
+    # Add attributes such as rel/target to links that leave the site
+    def __init__(self, attrs=None):
+        self.attrs = attrs if attrs is not None else {"rel": "noopener noreferrer", "target": "_blank"}
+
+    def __call__(self, tag, props):
+        url = props.get("href")
+        if tag == "a" and url and url.startswith(("http://", "https://")):
+            for key, value in self.attrs.items():
+                props.setdefault(key, value)
+
+    def __repr__(self):
+        return f"ExternalLinkRule({self.attrs})"
+
+
+class LinkRewriter:
+    # Applies rules to the href/src attributes of a node tree before it is
+    # serialized. A rule is any callable taking (tag, props) that edits props
+    # in place; rules must be picklable to be used with --jobs.
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self.key = repr(self.rules)
+
+    @classmethod
+    def for_basepath(cls, basepath, rules=()):
+        # Extra rules run first, so they see URLs before the basepath is added
+        rules = list(rules)
+        if basepath != '/':
+            rules.append(BasepathRule(basepath))
+        return cls(rules)
+
+    def rewrite_props(self, tag, props):
+        new_props = dict(props)
+        for rule in self.rules:
+            rule(tag, new_props)
+        return new_props
+
+    def rewrite(self, node, links=None):
+        # Walk the tree iteratively and rewrite every node carrying a URL.
+        # With a links list, every URL is appended to it as rewritten, which
+        # is how the build indexes links without walking pages twice.
+        # Returns the number of URLs seen.
+        if not self.rules and links is None:
+            return 0
+        count = 0
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            if not isinstance(item, HTMLNode):
+                continue
+            if item.props and ("href" in item.props or "src" in item.props):
+                if self.rules:
+                    item.props = self.rewrite_props(item.tag, item.props)
+                if links is not None:
+                    links.extend(item.props[attr] for attr in URL_ATTRS if attr in item.props)
+                count += 1
+            children = item.children
+            if children:
+                for index, child in enumerate(children):
+                    if isinstance(child, TextNode):
+                        # Plain text has no URL and no children to visit
+                        if child.text_type not in URL_TEXT_TYPES:
+                            continue
+                        if self.rules:
+                            if isinstance(children, tuple):
+                                # A cached InlineRun is shared with other pages; edit a copy
+                                children = item.children = list(children)
+                            child = children[index] = self.rewrite_text_node(child)
+                        if links is not None:
+                            links.append(child.url if isinstance(child, TextNode)
+                                         else child.props["href" if child.tag == "a" else "src"])
+                        count += 1
+                    else:
+                        stack.append(child)
+        return count
+
+    def rewrite_text_node(self, node):
+        if node.text_type == TextType.LINK:
+            tag, attr, props = "a", "href", {"href": node.url}
+        else:
+            tag, attr, props = "img", "src", {"src": node.url, "alt": node.text}
+        new_props = self.rewrite_props(tag, props)
+        if new_props.keys() == props.keys():
+            # Only the URL changed; keep the lightweight TextNode
+            return TextNode(node.text, node.text_type, new_props[attr])
+        # A rule added attributes, which a TextNode can't carry
+        if tag == "a":
+            return LeafNode("a", node.text, new_props)
+        return LeafNode("img", None, new_props)
+
+    def rewrite_html(self, html):
+        # Rewrite URL attributes in raw HTML. This scans the text, so it is
+        # meant for templates (once per build), not for rendered pages.
+        if not self.rules:
+            return html
+
+        def rewrite_tag(match):
+            tag, attrs, close = match.groups()
+            props = {name: url for _, name, url in URL_ATTR_RE.findall(attrs)}
+            if not props:
+                return match.group(0)
+            new_props = self.rewrite_props(tag.lower(), props)
+            attrs = URL_ATTR_RE.sub(lambda m: f'{m.group(1)}{m.group(2)}="{new_props[m.group(2)]}"', attrs)
+            extra = "".join(f' {key}="{value}"' for key, value in new_props.items() if key not in props)
+            return f"<{tag}{attrs}{extra}{close}>"
+
+        return TAG_RE.sub(rewrite_tag, html)
@@ -0,0 +1,111 @@
+import os
+
+from console import info
+from htmlnode import LeafNode, ParentNode, escape_attr
+from output import write_if_changed
+from textnode import TextNode, TextType
+
+# Posts shown on each listing page
+PAGE_SIZE = 10
+
+
+def page_url(content_dir, src_path):
+    # content/blog/tom/index.md -> /blog/tom, content/blog/post.md -> /blog/post.html
+    relative_path = os.path.relpath(src_path, content_dir).replace(os.sep, "/")
+    if relative_path == "index.md":
+        return "/"
+    if relative_path.endswith("/index.md"):
+        return "/" + relative_path[:-len("/index.md")]
+    return "/" + relative_path[:-len(".md")] + ".html"
+
+
+def listing_entries(index, content_dir, listing_dir):
+    # Every page directly inside listing_dir (a post directory's index.md or a
+    # loose .md file), newest first by their "date" front matter, then by title.
+    # Only the metadata index is consulted, never the posts themselves.
+    entries = []
+    listing_index = os.path.join(listing_dir, "index.md")
+    for src_path in index.entries:
+        if src_path == listing_index:
+            continue
+        parent = os.path.dirname(src_path)
+        if parent == listing_dir or (os.path.basename(src_path) == "index.md"
+                                     and os.path.dirname(parent) == listing_dir):
+            metadata = index.get(src_path)
+            entries.append({
+                "url": page_url(content_dir, src_path),
+                "title": metadata.get("title", os.path.basename(parent)),
+                "date": metadata.get("date", ""),
+                "summary": metadata.get("summary", ""),
+            })
+    entries.sort(key=lambda entry: entry["title"])
+    entries.sort(key=lambda entry: entry["date"], reverse=True)
+    return entries
+
+
+def listing_node(title, entries, page, pages, base_url):
+    items = []
+    for entry in entries:
+        children = [ParentNode("a", [TextNode(entry["title"], TextType.TEXT)], {"href": entry["url"]})]
+        if entry["date"]:
+            children.append(LeafNode("time", entry["date"], {"datetime": entry["date"]}))
+        if entry["summary"]:
+            children.append(LeafNode("p", entry["summary"]))
+        items.append(ParentNode("li", children))
+    children = [LeafNode("h1", title)]
+    if items:
+        children.append(ParentNode("ul", items, {"class": "post-list"}))
+    else:
+        children.append(LeafNode("p", "No posts yet."))
+    links = []
+    if page > 1:
+        links.append(LeafNode("a", "Newer posts", {"href": listing_page_url(base_url, page - 1), "rel": "prev"}))
+    if page < pages:
+        links.append(LeafNode("a", "Older posts", {"href": listing_page_url(base_url, page + 1), "rel": "next"}))
+    if links:
+        children.append(ParentNode("nav", links, {"class": "pagination"}))
+    return ParentNode("div", children)
+
+
+def listing_page_url(base_url, page):
+    return f"{base_url}/" if page == 1 else f"{base_url}/page/{page}/"
+
+
+def listing_page_path(dest_dir, page):
+    if page == 1:
+        return os.path.join(dest_dir, "index.html")
+    return os.path.join(dest_dir, "page", str(page), "index.html")
+
+
+def listing_pages(index, content_dir, listing_dir, page_template, rewriter, page_size=PAGE_SIZE):
+    # Yield (page, final_html, urls) for each page of listing_dir's listing,
+    # numbered from 1, without writing anything
+    title = os.path.basename(listing_dir).replace("-", " ").title()
+    entries = listing_entries(index, content_dir, listing_dir)
+    base_url = page_url(content_dir, os.path.join(listing_dir, "index.md")).rstrip("/")
+    pages = max(1, -(-len(entries) // page_size))
+    for page in range(1, pages + 1):
+        node = listing_node(title, entries[(page - 1) * page_size:page * page_size], page, pages, base_url)
+        urls = []
+        rewriter.rewrite(node, urls)
+        page_title = title if page == 1 else f"{title} (page {page})"
+        final_html = page_template.render({"Title": escape_attr(page_title), "Content": node.to_html(), "Date": "",
+                                           "Summary": ""})
+        yield page, final_html, urls
+
+
+def build_listing(index, content_dir, listing_dir, dest_dir, page_template, rewriter, page_size=PAGE_SIZE,
+                  links=None):
+    # Write the paginated listing of listing_dir's posts into dest_dir and
+    # return the paths of the pages written (or left unchanged). With a links
+    # dict, each page's URLs are stored in it under the page's path.
+    outputs = []
+    for page, final_html, urls in listing_pages(index, content_dir, listing_dir, page_template, rewriter,
+                                                page_size):
+        dest_path = listing_page_path(dest_dir, page)
+        if links is not None:
+            links[dest_path] = sorted(set(urls))
+        if write_if_changed(dest_path, final_html)[1]:
+            info(f"Generated listing page {dest_path}")
+        outputs.append(dest_path)
+    return outputs
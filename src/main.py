@@ -1,9 +1,28 @@
 import os
-import shutil
 import sys
-import re
+import argparse
+from itertools import chain, zip_longest
+from concurrent.futures import ProcessPoolExecutor
 from textnode import TextNode, TextType
-from code_func import extract_title, markdown_to_html_node
+from compress import MIN_SIZE, compress_outputs
+from code_func import extract_title, markdown_to_html_node, MarkdownBlockStream, iter_block_html_nodes
+from memo import DEFAULT_ENTRIES, inline_cache
+from parse_cache import DEFAULT_MAX_BYTES, ParseCache, cache_dir as parse_cache_dir, parse_cache
+from inventory import Inventory
+from metadata import PLACEHOLDER_DEFAULTS, MetadataIndex, read_front_matter, split_front_matter
+from listing import build_listing
+from manifest import Manifest, hash_bytes, hash_file, manifest_path
+from output import OutputFile, write_if_changed
+from pipeline import DEFAULT_IN_FLIGHT, IOPipeline
+from shard import SHARD_INFO, parse_shard, select_shard, shard_dir, write_shard_info
+from sync import SyncPlan, asset_urls, fingerprint_files, run_copies
+from template import Template
+from htmlnode import escape_attr, iter_html
+from links import ExternalLinkRule, LinkRewriter, UrlMapRule, html_urls
+from linkcheck import check_site, report as report_links
+from console import info, set_quiet
+import console
+import profiler
 
 static = './static'
 public = '.public'
@@ -12,156 +31,563 @@ template = './template.html'
 public_index = './public/index.html'
 content_dir = './content'  # Directory path
 output_dir = './docs'
+# Directories of content_dir whose posts get a generated, paginated listing
+listing_dirs = ['blog']
 
-# Check if there's a CLI argument provided
-if len(sys.argv) > 1:
-    basepath = sys.argv[1]
-else:
-    basepath = '/'
+# Sources at least this large are rendered block by block instead of in memory
+STREAM_THRESHOLD = 16 * 1024 * 1024
 
-print(f"The basepath is: {basepath}")
 
-
-def copy_files(src_dir, dest_dir):
+def parse_markdown(markdown_content):
+    # Returns (title, html_node) for a page's markdown; title is None when
+    # there is no "# " line, since front matter may provide it instead
     try:
-        # Ensure the source directory exists
-        if not os.path.exists(src_dir):
-            print(f"Source directory '{src_dir}' does not exist.")
-            return
-        
-        # Ensure the destination directory exists, create if not
-        if not os.path.exists(dest_dir):
-            os.makedirs(dest_dir)
-        
-        # Iterate over all files in the source directory
-        for item in os.listdir(src_dir):
-            src_path = os.path.join(src_dir, item)
-            dest_path = os.path.join(dest_dir, item)
-            
-            # Check if it's a file and copy it
-            if os.path.isfile(src_path):
-                shutil.copy2(src_path, dest_path)
-                print(f"Copied '{src_path}' to '{dest_path}'")
-            elif os.path.isdir(src_path):
-                copy_files(src_path, dest_path)
-            else:
-                print(f"Skipped '{src_path}' (not a regular file or directory).")
-        
-        print("All files copied successfully.")
-    except Exception as e:
-        print(f"An error occurred: {e}")
+        title = extract_title(markdown_content)
+    except ValueError:
+        title = None
+    return title, markdown_to_html_node(markdown_content)
 
 
-def generate_page(src_path, template_path, dest_path, basepath):
-    print(f"Generating page from {src_path} to {dest_path} using {template_path}")
-    
-    # Read markdown file at src_path
-    with open(src_path, 'r') as f:
-        markdown_content = f.read()
+def template_values(page_metadata, metadata, title, html_content):
+    # Front matter keys become placeholders ("date" fills {{ Date }}), and
+    # metadata passed by the caller overrides them. Everything but the content
+    # is plain text that may land in an attribute, so it is escaped for both.
+    values = dict(PLACEHOLDER_DEFAULTS)
+    values.update((key[:1].upper() + key[1:], escape_attr(value)) for key, value in page_metadata.items())
+    if metadata:
+        values.update((key, escape_attr(str(value))) for key, value in metadata.items())
+    values['Title'] = escape_attr(title)
+    values['Content'] = html_content
+    return values
 
-    # Read template file
-    with open(template_path, 'r') as f:
-        template_content = f.read()
+
+def render_markdown(src_path, markdown_content, page_template, rewriter, metadata=None, block_cache=None,
+                    links=None):
+    # Turn a page's markdown into the final HTML string, without touching disk.
+    # page_template must already have its links rewritten by rewriter. With a
+    # block_cache, only blocks that changed since the page was last rendered
+    # are parsed and serialized. The page's URLs are added to links if given.
+    page_metadata, markdown_content = split_front_matter(markdown_content)
+    title = page_metadata.get("title")
 
     # Check if the file is empty
     if not markdown_content.strip():
         print(f"Warning: {src_path} is empty")
         # Create a simple placeholder content
         html_content = "<div>No content available</div>"
-        title = "Empty Page"
+        title = title or "Empty Page"
+    elif block_cache is not None:
+        with profiler.phase("parse", src_path):
+            title = title or extract_title(markdown_content)
+            html_content = block_cache.render(src_path, markdown_content, rewriter, links)
     else:
-        # Extract title
-        title = extract_title(markdown_content)
-        
-        # Convert markdown to HTML
-        html_node = markdown_to_html_node(markdown_content)
+        with profiler.phase("parse", src_path):
+            # Reuse the tree from the parse cache when this markdown was parsed before
+            heading, html_node = parse_cache.parse(markdown_content, parse_markdown)
+        title = title or heading
+        if title is None:
+            raise ValueError("No title found in markdown")
 
-        # Generate HTML content
-        try:
-            html_content = html_node.to_html()
-        except ValueError as e:
-            print(f"Error processing {src_path}: {e}")
-            html_content = "<div>Error processing content</div>"
+        with profiler.phase("rewrite", src_path):
+            rewriter.rewrite(html_node, links)
 
-    
+        if profiler.enabled:
+            # Serialize up front so to_html and the template fill are timed separately
+            with profiler.phase("to_html", src_path):
+                html_content = html_node.to_html()
+        else:
+            # Serialize lazily so the page is built by the template's single join
+            html_content = iter_html(html_node)
 
-    # Replace placeholders in template
-    final_html = template_content.replace('{{ Title }}', title).replace('{{ Content }}', html_content)
+    # Fill the template's slots; page metadata can supply extra placeholders
+    values = template_values(page_metadata, metadata, title, html_content)
+    with profiler.phase("template", src_path):
+        final_html = page_template.render(values)
+    return final_html
 
-    
 
-    # Replace basepath in links and sources
-    if basepath != '/':
-        final_html = re.sub('href="/', f'href="{basepath}', final_html)
-        final_html = re.sub('src="/', f'src="{basepath}', final_html)  
-
-        # Check and log a subset of the final HTML
-    if 'href="' in final_html or 'src="' in final_html:
-        print("Debug: Links found with basepath replacements:")
-        replaced_links = re.findall(f'href="{basepath}[^"]*"', final_html)
-        replaced_srcs = re.findall(f'src="{basepath}[^"]*"', final_html)
-        print("Replaced hrefs:", replaced_links)
-        print("Replaced srcs:", replaced_srcs)
+def generate_page(src_path, template_path, dest_path, basepath, metadata=None, rewriter=None, block_cache=None,
+                  links=None):
+    # template_path may be a path or an already compiled Template
+    if isinstance(template_path, Template):
+        page_template = template_path
+    else:
+        page_template = Template.load(template_path)
+    # Links are rewritten on the node tree, never by scanning the rendered page
+    if rewriter is None:
+        rewriter = LinkRewriter.for_basepath(basepath)
+    page_template = page_template.with_links(rewriter)
+    info(f"Generating page from {src_path} to {dest_path} using {page_template.path}")
+    markdown_content = read_source(src_path)
+    final_html = render_markdown(src_path, markdown_content, page_template, rewriter, metadata, block_cache,
+                                 links)
+    write_page(src_path, dest_path, final_html)
+    return final_html
+
+
+def read_source(src_path):
+    with profiler.phase("read", src_path), open(src_path, 'r') as f:
+        return f.read()
+
+
+def write_page(src_path, dest_path, final_html):
+    # Write the final HTML atomically, leaving identical pages untouched.
+    # Returns the hash of the page.
+    with profiler.phase("write", src_path):
+        digest, written = write_if_changed(dest_path, final_html)
+    if not written:
+        info(f"Unchanged {dest_path}")
+    return digest
+
+
+def stream_page(src_path, template_path, dest_path, basepath, metadata=None, rewriter=None, links=None):
+    # Like generate_page, but for very large sources: blocks are read, rendered
+    # and written one at a time, so memory stays bounded whatever the file size.
+    # Returns the hash of the written page.
+    page_template = template_path if isinstance(template_path, Template) else Template.load(template_path)
+    if rewriter is None:
+        rewriter = LinkRewriter.for_basepath(basepath)
+    page_template = page_template.with_links(rewriter)
+    info(f"Streaming page from {src_path} to {dest_path} using {page_template.path}")
+
+    with open(src_path, 'r') as f:
+        page_metadata = read_front_matter(f)
+        stream = MarkdownBlockStream(f)
+        nodes = iter_block_html_nodes(stream)
+
+        def render_block(node):
+            rewriter.rewrite(node, links)
+            return node.to_html()
+
+        # The title has to be known before the template reaches it, so unless
+        # the front matter has it, render blocks ahead until it turns up
+        # (normally the first block)
+        rendered = []
+        for node in nodes:
+            rendered.append(render_block(node))
+            if stream.title is not None or "title" in page_metadata:
+                break
+
+        if not rendered:
+            print(f"Warning: {src_path} is empty")
+            title = page_metadata.get("title", "Empty Page")
+            html_content = "<div>No content available</div>"
+        elif stream.title is None and "title" not in page_metadata:
+            raise ValueError("No title found in markdown")
+        else:
+            title = page_metadata.get("title", stream.title)
+            html_content = chain(["<div>"], rendered, (render_block(node) for node in nodes), ["</div>"])
+
+        values = template_values(page_metadata, metadata, title, html_content)
+
+        # The page goes to a temporary file and only replaces dest_path once
+        # complete, and only if it differs from what is already there
+        with OutputFile(dest_path) as out:
+            page_template.write(out, values)
+            written = out.commit()
+    if not written:
+        info(f"Unchanged {dest_path}")
+    return out.digest.hexdigest()
+
+
+def collect_pages(dir_path_content, dest_dir_path, inventory=None):
+    # Return a sorted list of (src_path, dest_path) pairs, one per markdown
+    # file, taken from inventory or from a fresh scan of the content tree
+    if inventory is None:
+        inventory = Inventory.scan(content_dir=dir_path_content)
+    return [(page.path, os.path.join(dest_dir_path, os.path.splitext(page.relative_path)[0] + '.html'))
+            for page in inventory.pages()]
+
+
+def render_page(job, block_cache=None):
+    # Runs in a worker process, so it must be a top-level function and must
+    # report failures back instead of raising them across the pool. Profiling
+    # events and inline cache counters are handed back too, since a worker's
+    # memory isn't shared, and so are the page's URLs for the link check.
+    # The job's source is its SourceFile from the scan, which has its size.
+    source, template_path, dest_path, basepath, rewriter = job
+    src_path = source.path
+    output_hash = error = None
+    links = []
+    try:
+        with profiler.phase("page", src_path):
+            if source.size >= STREAM_THRESHOLD:
+                output_hash = stream_page(src_path, template_path, dest_path, basepath, rewriter=rewriter,
+                                          links=links)
+            else:
+                final_html = generate_page(src_path, template_path, dest_path, basepath, rewriter=rewriter,
+                                           block_cache=block_cache, links=links)
+                output_hash = hash_bytes(final_html.encode('utf-8'))
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return (output_hash, error, links, profiler.take_events(),
+            (inline_cache.take_stats(), parse_cache.take_stats()))
+
+
+async def render_page_async(pipeline, job):
+    # render_page for the I/O pipeline: the source is read and the page written
+    # on the pipeline's threads while parsing and rendering run on the event
+    # loop's thread, so one page's I/O overlaps another page's CPU work
+    source, page_template, dest_path, basepath, rewriter = job
+    src_path = source.path
+    output_hash = error = None
+    links = []
+    try:
+        # Pages in flight interleave, so this is the page's wall time including
+        # waits on its reads and writes, not only its own CPU work
+        with profiler.phase("page", src_path):
+            if source.size >= STREAM_THRESHOLD:
+                # Rare, and it renders as it reads, so it stays on this thread
+                # with the rest of the rendering
+                output_hash = stream_page(src_path, page_template, dest_path, basepath, rewriter=rewriter,
+                                          links=links)
+            else:
+                markdown_content = await pipeline.io(read_source, src_path)
+                info(f"Generating page from {src_path} to {dest_path} using {page_template.path}")
+                final_html = render_markdown(src_path, markdown_content, page_template, rewriter, links=links)
+                output_hash = await pipeline.io(write_page, src_path, dest_path, final_html)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return output_hash, error, links
+
+
+def init_worker(quiet, profiling, inline_cache_size, parse_cache_settings):
+    # Worker processes don't inherit these settings under the spawn start method,
+    # and under fork they inherit the parent's events and counters, which must
+    # not be sent back
+    set_quiet(quiet)
+    profiler.enable(profiling)
+    profiler.take_events()
+    inline_cache.resize(inline_cache_size)
+    inline_cache.take_stats()
+    parse_cache.configure(*parse_cache_settings)
+    parse_cache.take_stats()
+
+
+def render_pages(jobs_list, jobs=1, io_limit=DEFAULT_IN_FLIGHT, copies=()):
+    # Render each job and return (output_hash, error, links) in job order.
+    # Rendering in this process goes through the I/O pipeline unless io_limit
+    # is 1; worker processes already overlap each other's I/O. copies are
+    # (copy, src_path, dest_path) file copies (see sync.SyncPlan) run while
+    # the pages render: on the same pipeline, or in this process while the
+    # workers render.
+    if jobs == 1 and io_limit > 1 and (len(jobs_list) > 1 or copies):
+        # Pages and copies take turns at the pipeline's slots, so neither
+        # waits for all of the other to finish
+        items = [item for pair in zip_longest(((render_page_async, job) for job in jobs_list),
+                                              ((None, copy) for copy in copies))
+                 for item in pair if item is not None]
+
+        async def run(pipeline):
+            async def task(item):
+                render, job = item
+                if render is None:
+                    return await pipeline.io(*job)
+                return await render(pipeline, job)
+            results = await pipeline.gather(task, items)
+            return [result for (render, _), result in zip(items, results) if render is not None]
+        return IOPipeline(io_limit).run(run)
+    if jobs == 1 or len(jobs_list) <= 1:
+        run_copies(copies, io_limit)
+        results = [render_page(job) for job in jobs_list]
     else:
-        print("Debug: No links or sources found to replace.") 
+        workers = min(jobs, len(jobs_list))
+        # Hand out several pages per task so small pages don't drown in IPC overhead
+        chunksize = max(1, len(jobs_list) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(console.quiet, profiler.enabled, inline_cache.max_entries,
+                                           (parse_cache.root, parse_cache.max_bytes))) as executor:
+            # map submits every job up front, so the copies run meanwhile
+            pending = executor.map(render_page, jobs_list, chunksize=chunksize)
+            run_copies(copies, io_limit)
+            results = list(pending)
+    for _, _, _, events, (inline_stats, parse_stats) in results:
+        profiler.record(events)
+        inline_cache.add_stats(inline_stats)
+        parse_cache.add_stats(parse_stats)
+    return [(output_hash, error, links) for output_hash, error, links, _, _ in results]
+
+
+def prepare_template(template_path, basepath, rewriter=None):
+    # Returns the compiled template with its links rewritten, the rewriter for
+    # page content and the hash the manifest uses for both
+    if rewriter is None:
+        rewriter = LinkRewriter.for_basepath(basepath)
+    page_template = template_path if isinstance(template_path, Template) else Template.load(template_path)
+    page_template = page_template.with_links(rewriter)
+    # Pages depend on the link rules as well as on the template itself
+    template_hash = hash_bytes(f"{page_template.hash}\n{rewriter.key}".encode('utf-8'))
+    return page_template, rewriter, template_hash
+
 
-    # Create destination directory if needed
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+def check_page(manifest, source, dest_path, template_hash, basepath):
+    # Check a page, given as its SourceFile from the scan, against the
+    # manifest. Returns (source_hash, fresh). The source is only hashed if its
+    # size or mtime changed since it was last hashed. Runs on I/O threads; the
+    # manifest only adds the page to its seen set.
+    source_hash = (manifest.source_hash(source.path, source.size, source.mtime_ns)
+                   or hash_file(source.path))
+    return source_hash, manifest.is_fresh(source.path, source_hash, template_hash, basepath, dest_path)
 
-    # Write the final HTML to the destination file
-    with open(dest_path, 'w') as f:
-        f.write(final_html)
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, manifest=None, jobs=1,
+                             rewriter=None, inventory=None, io_limit=DEFAULT_IN_FLIGHT, copies=()):
+    # copies are file copies to overlap with the rendering (see render_pages).
     # Ensure the content directory exists
     if not os.path.exists(dir_path_content):
         print(f"Content directory '{dir_path_content}' does not exist.")
-        return
+        run_copies(copies, io_limit)
+        return []
 
     # Create the destination directory if it doesn't exist
     os.makedirs(dest_dir_path, exist_ok=True)
 
-    # Iterate over all files and directories in the content directory
-    for item in os.listdir(dir_path_content):
-        src_path = os.path.join(dir_path_content, item)
-        
-        if os.path.isfile(src_path) and src_path.endswith('.md'):
-            # For a markdown file, create a corresponding HTML file
-            # Get the relative path within the content directory
-            relative_path = os.path.relpath(src_path, dir_path_content)
-            # Create the destination path with .html extension
-            html_filename = os.path.splitext(relative_path)[0] + '.html'
-            dest_path = os.path.join(dest_dir_path, html_filename)
-            
-            # Ensure the parent directory exists
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-
-            
-            # Generate the HTML page
-            generate_page(src_path, template_path, dest_path, basepath)
-        
-        elif os.path.isdir(src_path):
-            # For a directory, recursively process it
-            sub_dest_dir = os.path.join(dest_dir_path, item)
-            generate_pages_recursive(src_path, template_path, sub_dest_dir, basepath)
-
-
-
-def main():
-    
-    # Delete all files in public directory
-    if os.path.exists(output_dir):
-        # Remove the entire directory and recreate it
-        shutil.rmtree(output_dir)
-        os.makedirs(output_dir)
-        print(f"Recreated {output_dir} directory")
+    # Load, compile and rewrite the template once per build rather than once per page
+    page_template, rewriter, template_hash = prepare_template(template_path, basepath, rewriter)
+
+    if inventory is None:
+        inventory = Inventory.scan(content_dir=dir_path_content)
+    # Pages travel with their SourceFiles, so checking and rendering use the
+    # scan's size and mtime instead of stat-ing the sources again
+    pages = [(inventory.get(src_path), dest_path)
+             for src_path, dest_path in collect_pages(dir_path_content, dest_dir_path, inventory)]
+    if manifest is None:
+        pending = [(source, dest_path, None) for source, dest_path in pages]
+    else:
+        # Skip pages whose source, template, basepath and output are unchanged.
+        # Checking stats every source and output, and hashes the ones whose
+        # stat changed, so it is pipelined too.
+        def check(page):
+            return check_page(manifest, *page, template_hash, basepath)
+
+        if io_limit > 1 and len(pages) > 1:
+            checks = IOPipeline(io_limit).map(check, pages)
+        else:
+            checks = [check(page) for page in pages]
+        pending = [(source, dest_path, source_hash)
+                   for (source, dest_path), (source_hash, fresh) in zip(pages, checks) if not fresh]
+
+    results = render_pages([(source, page_template, dest_path, basepath, rewriter)
+                            for source, dest_path, _ in pending], jobs, io_limit, copies)
+
+    # Collect per-page errors so one broken page doesn't hide the others
+    errors = []
+    for (source, dest_path, source_hash), (output_hash, error, links) in zip(pending, results):
+        if error is not None:
+            errors.append((source.path, error))
+        elif manifest is not None:
+            manifest.record(source.path, source_hash, template_hash, basepath, dest_path, output_hash, links,
+                            (source.size, source.mtime_ns))
+    return errors
+
+
+def prune_output(dest_dir, keep):
+    # Delete every file under dest_dir not listed in keep, then any directory
+    # left empty. A full build uses this instead of wiping dest_dir up front.
+    keep = {os.path.normpath(path) for path in keep}
+    removed = []
+    for dirpath, dirnames, filenames in os.walk(dest_dir, topdown=False):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.normpath(path) not in keep:
+                os.remove(path)
+                removed.append(path)
+                info(f"Removed '{path}'")
+        if dirpath != dest_dir and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
+
+
+def generate_listings(index, template_path, basepath, rewriter, previous=(), content_root=content_dir,
+                      dest_root=output_dir, links=None):
+    # Write the listing pages of every listing directory and delete listing
+    # pages an earlier build wrote but this one didn't. Returns the paths
+    # written; with a links dict, their URLs are stored in it by path.
+    page_template, rewriter, _ = prepare_template(template_path, basepath, rewriter)
+    outputs = []
+    for name in listing_dirs:
+        listing_dir = os.path.join(content_root, name)
+        if not os.path.isdir(listing_dir):
+            continue
+        if os.path.exists(os.path.join(listing_dir, 'index.md')):
+            print(f"Skipped the listing for {listing_dir}: it has its own index.md")
+            continue
+        outputs.extend(build_listing(index, content_root, listing_dir, os.path.join(dest_root, name),
+                                     page_template, rewriter, links=links))
+    for path in sorted(set(previous) - set(outputs)):
+        if os.path.isfile(path):
+            os.remove(path)
+            info(f"Removed stale listing page '{path}'")
+    return outputs
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site from ./content and ./static")
+    parser.add_argument('basepath', nargs='?', default='/', help="URL prefix the site is served under")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only re-render pages whose inputs changed since the last build")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="number of pages to render in parallel (0 uses every CPU)")
+    parser.add_argument('--hash-assets', action='store_true',
+                        help="compare static files by content hash when size matches but mtime differs")
+    parser.add_argument('--link-assets', action='store_true',
+                        help="hardlink static files into the output instead of copying them")
+    parser.add_argument('--fingerprint-assets', action='store_true',
+                        help="copy static files under content-hashed names and point links at them")
+    parser.add_argument('--gzip', action='store_true',
+                        help="write a .gz sidecar next to each compressible output file")
+    parser.add_argument('--gzip-min-size', type=int, default=MIN_SIZE, metavar='BYTES',
+                        help=f"don't compress files smaller than this (default {MIN_SIZE})")
+    parser.add_argument('--inline-cache', type=int, default=DEFAULT_ENTRIES, metavar='ENTRIES',
+                        help=f"inline fragments to memoize per process, 0 to disable (default {DEFAULT_ENTRIES})")
+    parser.add_argument('--parse-cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar='MB',
+                        help="size limit of the on-disk cache of parsed pages, 0 to disable (default %(default)s)")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help=f"delete the parse cache in {parse_cache_dir} and exit")
+    parser.add_argument('--external-links', action='store_true',
+                        help='open links to other sites in a new tab (rel="noopener noreferrer" target="_blank")')
+    parser.add_argument('--strict-links', action='store_true',
+                        help="fail the build when a page links to a page or file the site doesn't have")
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help="build only shard i of N (numbered from 1) into its own directory under"
+                             " ./.build/shards; merge.py combines the shards into ./docs")
+    parser.add_argument('--io-limit', type=int, default=DEFAULT_IN_FLIGHT, metavar='N',
+                        help="file reads, copies and writes kept in flight at once, 1 to do them one by one"
+                             f" (default {DEFAULT_IN_FLIGHT})")
+    parser.add_argument('--profile', nargs='?', const='./.build/trace.json', metavar='TRACE_PATH',
+                        help="time each build phase and write a Chrome trace (default ./.build/trace.json)"
+                             " plus a summary next to it")
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help="don't print a line for every page and file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    basepath = args.basepath
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    io_limit = max(1, args.io_limit)
+    set_quiet(args.quiet)
+    profiler.enable(bool(args.profile))
+    inline_cache.resize(args.inline_cache)
+    if args.clear_cache:
+        ParseCache(parse_cache_dir).clear()
+        print(f"Cleared {parse_cache_dir}")
+        return
+    parse_cache.configure(parse_cache_dir, args.parse_cache_size * 1024 * 1024)
+    info(f"The basepath is: {basepath}")
+
+    dest_dir, manifest_file = output_dir, manifest_path
+    # The first shard (and an unsharded build) also copies static files and
+    # writes the listings, which depend on every page's header
+    primary = True
+    if args.shard:
+        shard_index, shard_count = args.shard
+        directory = shard_dir(shard_index, shard_count)
+        dest_dir = os.path.join(directory, 'site')
+        manifest_file = os.path.join(directory, 'manifest.json')
+        primary = shard_index == 1
+        # shard.json marks a finished shard, so a failed one can't be merged
+        if os.path.exists(os.path.join(directory, SHARD_INFO)):
+            os.remove(os.path.join(directory, SHARD_INFO))
+        info(f"Building shard {shard_index} of {shard_count} into {dest_dir}")
+
+    if args.incremental:
+        # Keep the existing output and let the manifest decide what to rebuild
+        os.makedirs(dest_dir, exist_ok=True)
+        manifest = Manifest.load(manifest_file)
     else:
-        os.makedirs(output_dir)
-        print(f"Created {output_dir} directory")
+        # Existing output is kept so pages that render to the same bytes are
+        # not rewritten; whatever this build doesn't produce is pruned after
+        os.makedirs(dest_dir, exist_ok=True)
+        # A full build starts from an empty manifest but still records one,
+        # so the next incremental build can skip everything that is unchanged.
+        # Sidecars are checked against the output's hash and asset hashes
+        # against size and mtime, so those carry over.
+        previous = Manifest.load(manifest_file)
+        manifest = Manifest(manifest_file, compressed=previous.compressed, asset_hashes=previous.asset_hashes)
+
+    with profiler.phase("build"):
+        # One walk of each tree, shared by every phase below
+        with profiler.phase("scan"):
+            inventory = Inventory.scan(content_dir, static)
+            # Listings need every page, whichever shard renders it
+            all_pages = inventory.pages()
+            if args.shard:
+                inventory = select_shard(inventory, *args.shard)
+        with profiler.phase("static"):
+            names = None
+            if args.fingerprint_assets:
+                names, manifest.asset_hashes = fingerprint_files(static, manifest.asset_hashes,
+                                                                 inventory.assets())
+            else:
+                manifest.asset_hashes = {}
+            # Fingerprinted URLs only need the hashes, so the copies themselves
+            # are left to run alongside the rendering
+            assets = None
+            if primary:
+                assets = SyncPlan(static, dest_dir, manifest.assets, use_hash=args.hash_assets,
+                                  link=args.link_assets, names=names, files=inventory.assets())
+        # Pages and the template point at assets by their original names
+        rules = [UrlMapRule(asset_urls(names))] if names else []
+        if args.external_links:
+            rules.append(ExternalLinkRule())
+        rewriter = LinkRewriter.for_basepath(basepath, rules)
+        errors = generate_pages_recursive(content_dir, template, dest_dir, basepath, manifest, jobs,
+                                          rewriter=rewriter, inventory=inventory, io_limit=io_limit,
+                                          copies=assets.copies if assets is not None else ())
+        if assets is not None:
+            manifest.assets = assets.finish()
+        manifest.remove_stale()
+        # The template's links are on every page, so they are kept once
+        manifest.links = {template: html_urls(prepare_template(template, basepath, rewriter)[0].source)}
+        # Listings are built from the metadata index, which only reads the
+        # headers of pages that changed since the last build
+        if primary:
+            with profiler.phase("listings"):
+                index = MetadataIndex.load()
+                index.update(all_pages)
+                index.save()
+                manifest.listings = generate_listings(index, template, basepath, rewriter, manifest.listings,
+                                                      dest_root=dest_dir, links=manifest.links)
+        outputs = [entry["output"] for entry in manifest.pages.values()] + manifest.listings
+        outputs.extend(os.path.join(dest_dir, relative_path) for relative_path in manifest.assets)
+        # Pages recorded their links as they rendered (or in an earlier build,
+        # for pages an incremental build skipped), so checking is one lookup
+        # per link. A shard only has its own pages; merge.py checks the whole site.
+        broken = []
+        if not args.shard:
+            with profiler.phase("links"):
+                broken = check_site(manifest, dest_dir, basepath, outputs)
+        # Runs even without --gzip so sidecars left by an earlier build are removed
+        with profiler.phase("gzip"):
+            manifest.compressed = compress_outputs(outputs if args.gzip else [], manifest.compressed,
+                                                   min_size=args.gzip_min_size)
+        if not args.incremental:
+            prune_output(dest_dir, outputs + [path + '.gz' for path in manifest.compressed])
+        manifest.save()
+        parse_cache.prune()
+    info(inline_cache.report())
+    info(parse_cache.report())
 
+    if args.profile:
+        summary = "\n".join([profiler.summarize(), inline_cache.report(), parse_cache.report()])
+        profiler.write_trace(args.profile)
+        summary_path = os.path.splitext(args.profile)[0] + '-summary.txt'
+        with open(summary_path, 'w') as f:
+            f.write(summary + "\n")
+        print(summary)
+        print(f"Wrote trace to {args.profile} and summary to {summary_path}")
 
-    copy_files(static, output_dir)
-    generate_pages_recursive(content_dir, template, output_dir, basepath)
+    report_links(broken, args.strict_links)
+    if errors:
+        for src_path, error in errors:
+            print(f"Error processing {src_path}: {error}")
+        print(f"{len(errors)} page(s) failed to build")
+    if errors or (broken and args.strict_links):
+        sys.exit(1)
+    if args.shard:
+        write_shard_info(directory, shard_index, shard_count, basepath)
     # text_node = TextNode("this is some anchor text", TextType.LINK, "https://www.boot.dev")
     # print(text_node)
     
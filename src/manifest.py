@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import stat
+
+from console import info
+
+# Bump this whenever a change to the generator alters the HTML it produces,
+# so pages built by an older version are re-rendered on the next run
+GENERATOR_VERSION = "4"
+
+manifest_path = './.build/manifest.json'
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    # Hash in chunks so large sources don't have to fit in memory twice
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    def __init__(self, path=manifest_path, pages=None, assets=None, compressed=None, asset_hashes=None,
+                 listings=None, links=None):
+        self.path = path
+        # relative source path -> {source_hash, template_hash, basepath, version, output, output_hash, links,
+        # plus the size and mtime_ns of the source and the output when they were hashed}
+        self.pages = pages if pages is not None else {}
+        # Static files synced into the output directory by the last build
+        self.assets = assets if assets is not None else []
+        # Output path -> hash of the contents its .gz sidecar was made from
+        self.compressed = compressed if compressed is not None else {}
+        # Static file -> {size, mtime_ns, hash}, so fingerprinting only hashes changed files
+        self.asset_hashes = asset_hashes if asset_hashes is not None else {}
+        # Listing pages written by the last build
+        self.listings = listings if listings is not None else []
+        # URLs written by everything other than pages (the template and the
+        # listing pages), by template or output path, for the link check
+        self.links = links if links is not None else {}
+        # Sources seen during the current build, used to find deleted pages
+        self.seen = set()
+
+    @classmethod
+    def load(cls, path=manifest_path):
+        if not os.path.exists(path):
+            return cls(path)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable manifest '{path}': {e}")
+            return cls(path)
+        if data.get("version") != GENERATOR_VERSION:
+            # Everything in an old manifest describes stale output
+            return cls(path)
+        return cls(path, data.get("pages", {}), data.get("assets", []), data.get("compressed", {}),
+                   data.get("asset_hashes", {}), data.get("listings", []), data.get("links", {}))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": GENERATOR_VERSION, "pages": self.pages, "assets": self.assets,
+                       "compressed": self.compressed, "asset_hashes": self.asset_hashes,
+                       "listings": self.listings, "links": self.links},
+                      f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def is_fresh(self, key, source_hash, template_hash, basepath, dest_path):
+        self.seen.add(key)
+        entry = self.pages.get(key)
+        if entry is None:
+            return False
+        if (entry["source_hash"] != source_hash
+                or entry["template_hash"] != template_hash
+                or entry["basepath"] != basepath
+                or entry["version"] != GENERATOR_VERSION
+                or entry["output"] != dest_path
+                # Recorded before pages kept their links, so the link check can't use it
+                or "links" not in entry):
+            return False
+        # The output may have been deleted or edited by hand since the last
+        # build. A stat is enough while its size and mtime are the recorded
+        # ones; otherwise it is hashed.
+        try:
+            output_stat = os.stat(dest_path)
+        except FileNotFoundError:
+            return False
+        if not stat.S_ISREG(output_stat.st_mode):
+            return False
+        if (entry.get("output_size") == output_stat.st_size
+                and entry.get("output_mtime_ns") == output_stat.st_mtime_ns):
+            return True
+        if hash_file(dest_path) != entry["output_hash"]:
+            return False
+        # Same bytes under a new mtime (touched or copied), so later builds
+        # can trust the stat again
+        entry["output_size"], entry["output_mtime_ns"] = output_stat.st_size, output_stat.st_mtime_ns
+        return True
+
+    def source_hash(self, key, size, mtime_ns):
+        # The hash recorded for key's source if the source still has the size
+        # and mtime it had when it was hashed, else None
+        entry = self.pages.get(key)
+        if entry is None or entry.get("source_size") != size or entry.get("source_mtime_ns") != mtime_ns:
+            return None
+        return entry["source_hash"]
+
+    def record(self, key, source_hash, template_hash, basepath, dest_path, output_hash, links=(),
+               source_stat=None):
+        # links are the URLs the page contains, kept so an incremental build
+        # can check links on pages it doesn't render. source_stat is the
+        # source's (size, mtime_ns) from before it was hashed, if known.
+        self.seen.add(key)
+        entry = self.pages[key] = {
+            "source_hash": source_hash,
+            "template_hash": template_hash,
+            "basepath": basepath,
+            "version": GENERATOR_VERSION,
+            "output": dest_path,
+            "output_hash": output_hash,
+            "links": sorted(set(links)),
+        }
+        if source_stat is not None:
+            entry["source_size"], entry["source_mtime_ns"] = source_stat
+        try:
+            output_stat = os.stat(dest_path)
+        except FileNotFoundError:
+            return
+        entry["output_size"], entry["output_mtime_ns"] = output_stat.st_size, output_stat.st_mtime_ns
+
+    def remove(self, key):
+        # Forget a page and delete its output; returns the output path
+        output = self.pages.pop(key)["output"]
+        self.seen.discard(key)
+        if os.path.isfile(output):
+            os.remove(output)
+            info(f"Removed stale page '{output}'")
+            # Drop the page's directory too if nothing else lives there
+            parent = os.path.dirname(output)
+            if parent and not os.listdir(parent):
+                os.rmdir(parent)
+        return output
+
+    def remove_stale(self):
+        # Delete the outputs of pages whose sources disappeared since the last build
+        return [self.remove(key) for key in sorted(set(self.pages) - self.seen)]
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+
+# Default number of distinct inline fragments kept per process
+DEFAULT_ENTRIES = 4096
+# Longer fragments are long paragraphs, which rarely repeat and would crowd
+# out the short footer lines, nav links and list items that do
+MAX_FRAGMENT = 2048
+
+
+class InlineRun(tuple):
+    # The parsed text nodes of one inline fragment. Runs are shared by every
+    # block with the same text, so they are immutable, and the serializer
+    # stores the run's HTML on it the first time it is rendered.
+    html = None
+
+
+class InlineCache:
+    # Bounded LRU of parsed inline fragments keyed on their markdown text,
+    # with hit and miss counters for both parsing and rendering. It lives for
+    # the whole process, so it serves every page a build renders in it.
+    def __init__(self, max_entries=DEFAULT_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        # Hashes of fragments seen once but not cached yet
+        self.seen = set()
+        self.parse_hits = self.parse_misses = 0
+        self.render_hits = self.render_misses = 0
+
+    def resize(self, max_entries):
+        self.max_entries = max_entries
+        while len(self.entries) > max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.seen.clear()
+
+    def parse(self, text, parse):
+        # Return the InlineRun for text, calling parse(text) on a miss.
+        # Fragments that aren't cached get parse's own result instead.
+        if self.max_entries <= 0 or len(text) > MAX_FRAGMENT:
+            return parse(text)
+        run = self.entries.get(text)
+        if run is not None:
+            self.entries.move_to_end(text)
+            self.parse_hits += 1
+            return run
+        self.parse_misses += 1
+        key = hash(text)
+        if key not in self.seen:
+            # Only text that comes back gets a slot. Most fragments are one-off
+            # prose, and caching those just churns the LRU and the GC for nothing.
+            if len(self.seen) >= self.max_entries * 8:
+                self.seen.clear()
+            self.seen.add(key)
+            return parse(text)
+        run = self.entries[text] = InlineRun(parse(text))
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return run
+
+    def render(self, run, render_node):
+        # The HTML of run's nodes, built with render_node only the first time
+        if run.html is not None:
+            self.render_hits += 1
+            return run.html
+        self.render_misses += 1
+        run.html = "".join(map(render_node, run))
+        return run.html
+
+    def take_stats(self):
+        # Return the counters and reset them, so worker processes can hand
+        # back what they did for each batch of pages
+        stats = (self.parse_hits, self.parse_misses, self.render_hits, self.render_misses)
+        self.parse_hits = self.parse_misses = self.render_hits = self.render_misses = 0
+        return stats
+
+    def add_stats(self, stats):
+        parse_hits, parse_misses, render_hits, render_misses = stats
+        self.parse_hits += parse_hits
+        self.parse_misses += parse_misses
+        self.render_hits += render_hits
+        self.render_misses += render_misses
+
+    def report(self):
+        def rate(hits, misses):
+            return f"{hits / (hits + misses):.0%}" if hits + misses else "n/a"
+        return (f"Inline cache: parse {self.parse_hits} hits / {self.parse_misses} misses "
+                f"({rate(self.parse_hits, self.parse_misses)}), "
+                f"render {self.render_hits} hits / {self.render_misses} misses "
+                f"({rate(self.render_hits, self.render_misses)})")
+
+
+inline_cache = InlineCache()
@@ -0,0 +1,133 @@
+import argparse
+import os
+import sys
+
+import main as site
+from console import info, set_quiet
+from linkcheck import check_site, report as report_links
+from manifest import Manifest, manifest_path
+from shard import SHARD_INFO, read_shard_info, shards_dir
+from sync import scan_files, sync_files
+
+
+def find_shards(count=None, root=shards_dir):
+    # Finished shard directories under root, optionally only those of an N-shard build
+    if not os.path.isdir(root):
+        return []
+    found = []
+    for entry in sorted(os.scandir(root), key=lambda entry: entry.name):
+        if count is not None and not entry.name.endswith(f"-of-{count}"):
+            continue
+        if os.path.isfile(os.path.join(entry.path, SHARD_INFO)):
+            found.append(entry.path)
+    return found
+
+
+def load_shards(shard_dirs):
+    # Returns (info, manifest, site_dir) per shard in shard order, after
+    # checking they are the complete set of one build
+    shards = []
+    for directory in shard_dirs:
+        if not os.path.isfile(os.path.join(directory, SHARD_INFO)):
+            raise ValueError(f"{directory} is not a finished shard (no {SHARD_INFO})")
+        shard_info = read_shard_info(directory)
+        shards.append((shard_info, Manifest.load(os.path.join(directory, 'manifest.json')),
+                       os.path.join(directory, 'site')))
+    if not shards:
+        raise ValueError("no shards to merge")
+    shards.sort(key=lambda shard: shard[0]["index"])
+    counts = {shard_info["count"] for shard_info, _, _ in shards}
+    if len(counts) > 1:
+        raise ValueError(f"shards come from builds with different shard counts: {sorted(counts)}")
+    count = counts.pop()
+    indexes = [shard_info["index"] for shard_info, _, _ in shards]
+    if indexes != list(range(1, count + 1)):
+        missing = sorted(set(range(1, count + 1)) - set(indexes))
+        raise ValueError(f"expected shards 1 to {count} once each, got {indexes}"
+                         + (f" (missing {missing})" if missing else ""))
+    basepaths = {shard_info["basepath"] for shard_info, _, _ in shards}
+    if len(basepaths) > 1:
+        raise ValueError(f"shards were built with different basepaths: {sorted(basepaths)}")
+    return shards
+
+
+def merge_shards(shard_dirs, dest_dir=site.output_dir, manifest_file=manifest_path, link=False):
+    # Combine the outputs of a sharded build into dest_dir and their manifests
+    # into one, so the result matches an unsharded full build. Nothing is
+    # copied unless every output and every page belongs to exactly one shard.
+    # Returns the number of files in the merged site and its broken links,
+    # which only the merged site can be checked for.
+    shards = load_shards(shard_dirs)
+
+    output_owners = {}
+    page_owners = {}
+    collisions = []
+    shard_files = []
+    for shard_info, manifest, site_dir in shards:
+        files = scan_files(site_dir)
+        shard_files.append(files)
+        for source in files:
+            owner = output_owners.setdefault(source.relative_path, shard_info["index"])
+            if owner != shard_info["index"]:
+                collisions.append(f"output {source.relative_path} is in shards {owner} and {shard_info['index']}")
+        for key in manifest.pages:
+            owner = page_owners.setdefault(key, shard_info["index"])
+            if owner != shard_info["index"]:
+                collisions.append(f"page {key} was rendered by shards {owner} and {shard_info['index']}")
+    if collisions:
+        raise ValueError(f"{len(collisions)} collision(s):\n  " + "\n  ".join(collisions))
+
+    def moved(path, site_dir):
+        return os.path.join(dest_dir, os.path.relpath(path, site_dir))
+
+    merged = Manifest(manifest_file)
+    for (shard_info, manifest, site_dir), files in zip(shards, shard_files):
+        info(f"Merging shard {shard_info['index']} of {shard_info['count']} ({len(files)} files)")
+        if files:
+            sync_files(site_dir, dest_dir, link=link, files=files)
+        for key, entry in manifest.pages.items():
+            merged.pages[key] = dict(entry, output=moved(entry["output"], site_dir))
+        merged.listings.extend(moved(path, site_dir) for path in manifest.listings)
+        listings = set(manifest.listings)
+        # Listing links are kept by output path, the template's by its own path
+        merged.links.update((moved(key, site_dir) if key in listings else key, urls)
+                            for key, urls in manifest.links.items())
+        # compress_outputs keys these by normalized path
+        merged.compressed.update((os.path.normpath(moved(path, site_dir)), source_hash)
+                                 for path, source_hash in manifest.compressed.items())
+        merged.assets.extend(manifest.assets)
+        merged.asset_hashes.update(manifest.asset_hashes)
+    merged.assets.sort()
+    site.prune_output(dest_dir, [os.path.join(dest_dir, relative_path) for relative_path in output_owners])
+    merged.save()
+    outputs = [os.path.join(dest_dir, relative_path) for relative_path in output_owners
+               if not relative_path.endswith('.gz')]
+    return len(output_owners), check_site(merged, dest_dir, shards[0][0]["basepath"], outputs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Combine the shards of a sharded build (main.py --shard i/N)"
+                                                 f" into {site.output_dir}")
+    parser.add_argument('shard_dirs', nargs='*', metavar='SHARD_DIR',
+                        help=f"shard directories to merge (default: every finished shard in {shards_dir})")
+    parser.add_argument('--shards', type=int, metavar='N', help="only merge the shards of an N-shard build")
+    parser.add_argument('--link', action='store_true', help="hardlink outputs into place instead of copying them")
+    parser.add_argument('--strict-links', action='store_true',
+                        help="fail when a page links to a page or file the merged site doesn't have")
+    parser.add_argument('--quiet', '-q', action='store_true', help="don't print a line for every file")
+    args = parser.parse_args(argv)
+    set_quiet(args.quiet)
+    shard_dirs = args.shard_dirs or find_shards(args.shards)
+    try:
+        files, broken = merge_shards(shard_dirs, link=args.link)
+    except ValueError as e:
+        print(f"Merge failed: {e}")
+        sys.exit(1)
+    print(f"Merged {len(shard_dirs)} shard(s), {files} files, into {site.output_dir}")
+    report_links(broken, args.strict_links)
+    if broken and args.strict_links:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
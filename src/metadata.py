@@ -0,0 +1,142 @@
+import json
+import os
+
+from console import info
+
+FENCE = "---"
+# Front matter and the title line are expected near the top of a page, so
+# header reads give up after this many bytes
+HEADER_LIMIT = 64 * 1024
+# Bump when the fields read from headers change, to re-read every page
+METADATA_VERSION = "1"
+
+index_path = './.build/metadata.json'
+
+# Placeholders filled on every page, so pages without the field don't show
+# a literal {{ Date }}
+PLACEHOLDER_DEFAULTS = {"Date": "", "Summary": ""}
+
+
+def parse_front_matter(lines):
+    # "key: value" lines, like a flat YAML mapping. Blank lines and lines
+    # starting with # are skipped, and values may be quoted.
+    metadata = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        metadata[key.strip().lower()] = value
+    return metadata
+
+
+def split_front_matter(markdown):
+    # Returns (metadata, body). A page has front matter only if its first
+    # line is "---" and a later line closes it with "---".
+    if not markdown.startswith(FENCE):
+        return {}, markdown
+    first_end = markdown.find("\n")
+    if first_end == -1 or markdown[:first_end].rstrip() != FENCE:
+        return {}, markdown
+    position = first_end + 1
+    while True:
+        line_end = markdown.find("\n", position)
+        line = markdown[position:] if line_end == -1 else markdown[position:line_end]
+        if line.rstrip() == FENCE:
+            body = "" if line_end == -1 else markdown[line_end + 1:]
+            return parse_front_matter(markdown[first_end + 1:position].split("\n")), body
+        if line_end == -1:
+            # Never closed, so it was just a page starting with "---"
+            return {}, markdown
+        position = line_end + 1
+
+
+def read_front_matter(f, limit=HEADER_LIMIT):
+    # Read front matter from an open text file, leaving f at the start of the
+    # body. Without front matter, f is left where it was.
+    start = f.tell()
+    if f.readline().rstrip() != FENCE:
+        f.seek(start)
+        return {}
+    lines = []
+    read = 0
+    for line in iter(f.readline, ""):
+        if line.rstrip() == FENCE:
+            return parse_front_matter(lines)
+        lines.append(line)
+        read += len(line)
+        if read > limit:
+            break
+    f.seek(start)
+    return {}
+
+
+def read_header(path, limit=HEADER_LIMIT):
+    # The page's front matter plus its title, read from the top of the file
+    # only. The title comes from the front matter or the first "# " line.
+    with open(path, 'r') as f:
+        metadata = read_front_matter(f, limit)
+        if "title" not in metadata:
+            read = 0
+            for line in iter(f.readline, ""):
+                if line.startswith("# "):
+                    metadata["title"] = line[2:].strip()
+                    break
+                read += len(line)
+                if read > limit:
+                    break
+    return metadata
+
+
+class MetadataIndex:
+    # Header metadata of every page, persisted between builds. Entries are
+    # refreshed only for files whose size or mtime changed, and lookups are
+    # plain dict reads.
+    def __init__(self, path=index_path, entries=None):
+        self.path = path
+        # source path -> {size, mtime_ns, metadata}
+        self.entries = entries if entries is not None else {}
+
+    @classmethod
+    def load(cls, path=index_path):
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable metadata index '{path}': {e}")
+            return cls(path)
+        if data.get("version") != METADATA_VERSION:
+            return cls(path)
+        return cls(path, data.get("entries", {}))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": METADATA_VERSION, "entries": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def update(self, pages):
+        # Bring the index in line with pages, the inventory's SourceFiles:
+        # re-read changed headers and drop pages that are gone. Sizes and
+        # mtimes come from the scan. Returns the number of headers read.
+        entries = {}
+        read = 0
+        for page in pages:
+            entry = self.entries.get(page.path)
+            if entry is None or entry["size"] != page.size or entry["mtime_ns"] != page.mtime_ns:
+                entry = {"size": page.size, "mtime_ns": page.mtime_ns, "metadata": read_header(page.path)}
+                read += 1
+            entries[page.path] = entry
+        self.entries = entries
+        info(f"Metadata index: {read} of {len(entries)} headers read")
+        return read
+
+    def get(self, src_path):
+        entry = self.entries.get(src_path)
+        return entry["metadata"] if entry is not None else {}
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import threading
+
+from manifest import hash_file
+
+
+def temp_path_for(path):
+    # A hidden sibling of path that no other process or thread will pick.
+    # Keeping it in the same directory lets os.replace swap it in atomically.
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{os.getpid()}-{threading.get_ident()}.tmp")
+
+
+def matches_existing(path, digest, size):
+    # Whether path already holds exactly these bytes; the size check skips
+    # hashing in the common case where the content changed
+    try:
+        if os.path.getsize(path) != size:
+            return False
+        return hash_file(path) == digest
+    except OSError:
+        return False
+
+
+class OutputFile:
+    # A text file written to a temporary path and hashed as it is written.
+    # commit() moves it over path only if the bytes differ from what is
+    # already there, so readers never see a half-written page and unchanged
+    # pages keep their mtime.
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = temp_path_for(path)
+        self.digest = hashlib.sha256()
+        self.size = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(self.tmp_path, 'wb')
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self.digest.update(data)
+        self.size += len(data)
+        self.file.write(data)
+
+    def writelines(self, parts):
+        for part in parts:
+            self.write(part)
+
+    def commit(self):
+        # Returns True if path was replaced, False if it was already identical
+        self.file.close()
+        if matches_existing(self.path, self.digest.hexdigest(), self.size):
+            os.remove(self.tmp_path)
+            return False
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Anything not committed by the end of the block is thrown away
+        if os.path.exists(self.tmp_path):
+            self.discard()
+
+
+def write_if_changed(path, data):
+    # Write data (text or bytes) to path atomically unless path already holds
+    # the same bytes. Returns (sha256 hex digest, whether the file was written).
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    if matches_existing(path, digest, len(data)):
+        return digest, False
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = temp_path_for(path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return digest, True
@@ -0,0 +1,155 @@
+import os
+import pickle
+import shutil
+
+from code_func import block_handlers
+from console import info
+from htmlnode import LeafNode, ParentNode
+from manifest import hash_bytes
+from output import write_if_changed
+from textnode import TextNode, TextType
+
+# Bump this whenever a parser change alters the trees markdown_to_html_node
+# builds, so trees cached by an older parser are never reused
+PARSER_VERSION = "1"
+
+cache_dir = './.build/parse-cache'
+# Default size limit of the cache directory
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_TEXT_TYPES = list(TextType)
+_TEXT_TYPE_INDEX = {text_type: index for index, text_type in enumerate(_TEXT_TYPES)}
+
+
+class Uncacheable(Exception):
+    # The tree holds a node type the compact form can't describe
+    pass
+
+
+_TEXT, _LEAF, _PARENT = range(3)
+
+
+def encode_node(node):
+    # Node trees are stored as nested tuples, which pickle far smaller and
+    # faster than the node objects themselves
+    node_type = type(node)
+    if node_type is TextNode:
+        return (_TEXT, node.text, _TEXT_TYPE_INDEX[node.text_type], node.url)
+    if node_type is LeafNode:
+        return (_LEAF, node.tag, node.value, node.props)
+    if node_type is ParentNode:
+        return (_PARENT, node.tag, node.props, [encode_node(child) for child in node.children])
+    raise Uncacheable(f"Can't cache {node_type.__name__} nodes")
+
+
+def decode_node(data):
+    kind = data[0]
+    if kind == _TEXT:
+        return TextNode(data[1], _TEXT_TYPES[data[2]], data[3])
+    if kind == _LEAF:
+        return LeafNode(data[1], data[2], data[3])
+    return ParentNode(data[1], [decode_node(child) for child in data[3]], data[2])
+
+
+class ParseCache:
+    # Parsed pages on disk, keyed on the markdown and the parser version, so a
+    # rebuild after a template or basepath change skips parsing. Each entry is
+    # a pickled (title, encoded tree) in a file named after its key. A root of
+    # None disables the cache.
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+
+    def configure(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root if max_bytes > 0 else None
+        self.max_bytes = max_bytes
+
+    def key(self, markdown):
+        # Custom block handlers change what the parser produces, so they are
+        # part of the key too
+        parser = f"{PARSER_VERSION}:{[handler.block_type for handler in block_handlers]}"
+        return hash_bytes(f"{parser}\n{markdown}".encode('utf-8'))
+
+    def path_for(self, key):
+        return os.path.join(self.root, key[:2], key + '.pickle')
+
+    def parse(self, markdown, parse):
+        # Return (title, html_node) for markdown, loading it from disk if it
+        # was parsed before and calling parse(markdown) otherwise
+        if self.root is None:
+            return parse(markdown)
+        path = self.path_for(self.key(markdown))
+        try:
+            with open(path, 'rb') as f:
+                title, tree = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            pass
+        else:
+            self.hits += 1
+            # The modification time doubles as the last use, for prune()
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return title, decode_node(tree)
+
+        self.misses += 1
+        title, html_node = parse(markdown)
+        try:
+            data = pickle.dumps((title, encode_node(html_node)), protocol=pickle.HIGHEST_PROTOCOL)
+        except Uncacheable:
+            return title, html_node
+        write_if_changed(path, data)
+        return title, html_node
+
+    def prune(self):
+        # Delete the least recently used entries until the cache fits in
+        # max_bytes. Returns the number of entries removed.
+        if self.root is None or not os.path.isdir(self.root):
+            return 0
+        entries = []
+        total = 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Pruned by another build sharing the cache
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            info(f"Pruned {removed} parse cache entries")
+        return removed
+
+    def clear(self):
+        if self.root is not None and os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+
+    def take_stats(self):
+        stats = (self.hits, self.misses)
+        self.hits = self.misses = 0
+        return stats
+
+    def add_stats(self, stats):
+        self.hits += stats[0]
+        self.misses += stats[1]
+
+    def report(self):
+        return f"Parse cache: {self.hits} hits / {self.misses} misses"
+
+
+parse_cache = ParseCache()
@@ -0,0 +1,48 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# Blocking file operations kept in flight at once. Each one holds at most a
+# couple of open files, so this also bounds the descriptors the build uses.
+DEFAULT_IN_FLIGHT = 8
+
+
+class IOPipeline:
+    # Issues blocking file operations (reads, hashes, copies, writes) from
+    # asyncio onto a thread pool, at most limit at a time. On high-latency
+    # storage this keeps requests outstanding while the event loop's thread
+    # does the CPU work, instead of stalling on each call in turn.
+    def __init__(self, limit=DEFAULT_IN_FLIGHT):
+        self.limit = max(1, limit)
+        self.executor = None
+        self.slots = None
+
+    async def io(self, func, *args):
+        # Run func(*args) on the pool and wait for it without blocking the loop
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def run(self, main):
+        # Run the coroutine function main(pipeline) to completion. Tasks hold
+        # one of pipeline.slots while they are in flight, which bounds how many
+        # sources and pages are held in memory at once.
+        async def runner():
+            self.slots = asyncio.Semaphore(self.limit)
+            with ThreadPoolExecutor(max_workers=self.limit, thread_name_prefix="io") as self.executor:
+                try:
+                    return await main(self)
+                finally:
+                    self.executor = self.slots = None
+        return asyncio.run(runner())
+
+    def map(self, func, items):
+        # Return [func(item) for item in items], with the calls run on the pool
+        async def main(pipeline):
+            return await pipeline.gather(lambda item: pipeline.io(func, item), items)
+        return self.run(main)
+
+    async def gather(self, task, items):
+        # Await task(item) for every item, at most limit at a time; results
+        # come back in item order
+        async def bounded(item):
+            async with self.slots:
+                return await task(item)
+        return await asyncio.gather(*(bounded(item) for item in items))
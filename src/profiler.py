@@ -0,0 +1,96 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Set by enable(); phases cost a single flag check while profiling is off
+enabled = False
+# (name, page, start, duration, pid) tuples recorded in this process
+events = []
+
+
+def enable(value=True):
+    global enabled
+    enabled = value
+
+
+@contextmanager
+def phase(name, page=None):
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        events.append((name, page, start, time.perf_counter() - start, os.getpid()))
+
+
+def take_events():
+    # Hand this process's events over (e.g. from a worker back to the parent)
+    taken = events[:]
+    del events[:]
+    return taken
+
+
+def record(new_events):
+    events.extend(new_events)
+
+
+def peak_memory_bytes():
+    # Largest resident set of this process or any finished worker process
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def write_trace(path, recorded=None):
+    # Chrome trace-event format, viewable in chrome://tracing or Perfetto
+    recorded = events if recorded is None else recorded
+    origin = min((start for _, _, start, _, _ in recorded), default=0)
+    trace_events = []
+    for name, page, start, duration, pid in recorded:
+        event = {
+            "name": name,
+            "cat": "page" if page else "build",
+            "ph": "X",
+            "ts": round((start - origin) * 1e6, 3),
+            "dur": round(duration * 1e6, 3),
+            "pid": 0,
+            "tid": pid,
+        }
+        if page:
+            event["args"] = {"page": page}
+        trace_events.append(event)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+
+def summarize(recorded=None, slowest=10):
+    recorded = events if recorded is None else recorded
+    totals = {}
+    pages = {}
+    for name, page, _, duration, _ in recorded:
+        totals[name] = totals.get(name, 0) + duration
+        if page and name == "page":
+            pages[page] = pages.get(page, 0) + duration
+
+    lines = ["Build profile", "", "Totals per phase:"]
+    for name, total in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {name:<12} {total * 1000:10.2f} ms")
+    lines += ["", f"Slowest pages ({min(slowest, len(pages))} of {len(pages)}):"]
+    for page, total in sorted(pages.items(), key=lambda item: item[1], reverse=True)[:slowest]:
+        lines.append(f"  {total * 1000:10.2f} ms  {page}")
+    peak = peak_memory_bytes()
+    if peak is not None:
+        lines += ["", f"Peak memory: {peak / (1024 * 1024):.1f} MiB"]
+    return "\n".join(lines)
@@ -0,0 +1,230 @@
+import argparse
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import main as site
+from block_cache import BlockCache
+from console import info, set_quiet
+from inventory import Inventory
+from listing import listing_pages
+from metadata import MetadataIndex
+
+
+class PageCache:
+    # Bounded LRU of rendered pages. Keys include the source and template
+    # mtimes, so an edited page simply misses and its old entry ages out.
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            page = self.entries.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return page
+
+    def put(self, key, page):
+        with self.lock:
+            self.entries[key] = page
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class DevSite:
+    # Renders content/**/index.md and the listings on request instead of
+    # building ./docs
+    def __init__(self, content_dir=site.content_dir, static_dir=site.static, template_path=site.template,
+                 basepath='/', cache_size=256):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.basepath = basepath
+        self.cache = PageCache(cache_size)
+        # An edited page only re-renders the blocks that changed
+        self.block_cache = BlockCache()
+        self.template_lock = threading.Lock()
+        self.block_lock = threading.Lock()
+        self.template_mtime = None
+        self.template = self.rewriter = None
+        # Headers of every page, for the listings; kept in memory and only
+        # re-read for pages that changed since the last listing request
+        self.index = MetadataIndex()
+        self.index_lock = threading.Lock()
+
+    def current_template(self):
+        # Recompile the template only when it changes on disk
+        mtime = os.stat(self.template_path).st_mtime_ns
+        with self.template_lock:
+            if mtime != self.template_mtime:
+                self.template, self.rewriter, _ = site.prepare_template(self.template_path, self.basepath)
+                self.template_mtime = mtime
+            return self.template, self.rewriter, mtime
+
+    def resolve(self, root, url_path):
+        # Map a URL path to a file under root, refusing anything that escapes it
+        relative_path = os.path.normpath(url_path.lstrip('/')) if url_path.strip('/') else ''
+        if relative_path.startswith('..') or os.path.isabs(relative_path):
+            return None
+        return os.path.join(root, relative_path)
+
+    def page_source(self, url_path):
+        # "/", "/blog/tom", "/blog/tom/" and "/blog/tom/index.html" all map to
+        # content/blog/tom/index.md; "/about.html" maps to content/about.md
+        if url_path.endswith('.html'):
+            url_path = url_path[:-len('.html')]
+            if url_path.endswith('/index'):
+                url_path = url_path[:-len('index')]
+            else:
+                path = self.resolve(self.content_dir, url_path + '.md')
+                return path if path and os.path.isfile(path) else None
+        path = self.resolve(self.content_dir, url_path)
+        if path is None:
+            return None
+        path = os.path.join(path, 'index.md')
+        return path if os.path.isfile(path) else None
+
+    def listing_page(self, url_path):
+        # "/blog", "/blog/" and "/blog/index.html" map to page 1 of the blog
+        # listing, "/blog/page/2/" to page 2. Returns (listing_dir, page), or
+        # None when there is no such listing, as main.generate_listings decides.
+        for name in site.listing_dirs:
+            base = "/" + name.replace(os.sep, "/")
+            if url_path in (base, base + "/", base + "/index.html"):
+                page = 1
+            else:
+                match = re.fullmatch(re.escape(base) + r"/page/(\d+)/(?:index\.html)?", url_path)
+                if match is None:
+                    continue
+                page = int(match.group(1))
+            listing_dir = os.path.join(self.content_dir, name)
+            if os.path.isdir(listing_dir) and not os.path.exists(os.path.join(listing_dir, 'index.md')):
+                return listing_dir, page
+        return None
+
+    def render_listing(self, listing_dir, page):
+        # The listing page as a build would write it, or None past the last page.
+        # Listings are cheap to render, so they aren't cached.
+        page_template, rewriter, _ = self.current_template()
+        with self.index_lock:
+            self.index.update(Inventory.scan(content_dir=self.content_dir).pages())
+            for number, final_html, _ in listing_pages(self.index, self.content_dir, listing_dir, page_template,
+                                                       rewriter):
+                if number == page:
+                    return final_html.encode('utf-8')
+        return None
+
+    def render(self, src_path):
+        page_template, rewriter, template_mtime = self.current_template()
+        key = (src_path, os.stat(src_path).st_mtime_ns, template_mtime)
+        page = self.cache.get(key)
+        if page is None:
+            with open(src_path, 'r') as f:
+                markdown_content = f.read()
+            with self.block_lock:
+                html = site.render_markdown(src_path, markdown_content, page_template, rewriter,
+                                            block_cache=self.block_cache)
+            page = html.encode('utf-8')
+            self.cache.put(key, page)
+        return page
+
+    def static_file(self, url_path):
+        path = self.resolve(self.static_dir, url_path)
+        return path if path and os.path.isfile(path) else None
+
+
+class DevRequestHandler(BaseHTTPRequestHandler):
+    dev_site = None
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        start = time.perf_counter()
+        url_path = unquote(urlsplit(self.path).path)
+        dev_site = self.dev_site
+        try:
+            src_path = dev_site.page_source(url_path)
+            listing = dev_site.listing_page(url_path) if src_path is None else None
+            if src_path is not None:
+                body = dev_site.render(src_path)
+                content_type = 'text/html; charset=utf-8'
+            elif listing is not None:
+                body = dev_site.render_listing(*listing)
+                if body is None:
+                    self.send_error(404, "No such listing page")
+                    return
+                content_type = 'text/html; charset=utf-8'
+            else:
+                static_path = dev_site.static_file(url_path)
+                if static_path is None:
+                    self.send_error(404, "No page or static file for this path")
+                    return
+                with open(static_path, 'rb') as f:
+                    body = f.read()
+                content_type = mimetypes.guess_type(static_path)[0] or 'application/octet-stream'
+        except Exception as e:
+            self.send_error(500, f"{type(e).__name__}: {e}")
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+        info(f"{self.command} {url_path} {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def log_message(self, format, *args):
+        # Requests are logged by respond() with their render time instead
+        pass
+
+
+def make_server(dev_site, host='127.0.0.1', port=8000):
+    handler = type('BoundDevRequestHandler', (DevRequestHandler,), {'dev_site': dev_site})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the site, rendering pages on request")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-size', type=int, default=256, help="rendered pages to keep in memory")
+    parser.add_argument('--quiet', '-q', action='store_true', help="don't log every request")
+    args = parser.parse_args(argv)
+    set_quiet(args.quiet)
+
+    dev_site = DevSite(cache_size=args.cache_size)
+    server = make_server(dev_site, args.host, args.port)
+    print(f"Serving {dev_site.content_dir} and {dev_site.static_dir} on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Page cache: {dev_site.cache.hits} hits, {dev_site.cache.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
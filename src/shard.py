@@ -0,0 +1,63 @@
+import argparse
+import hashlib
+import json
+import os
+
+from inventory import Inventory
+
+# Each shard of an i/N build writes its pages, manifest and shard.json here
+shards_dir = './.build/shards'
+SHARD_INFO = 'shard.json'
+
+
+def parse_shard(value):
+    # argparse type for --shard: "2/4" -> (2, 4), with shards numbered from 1
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, such as 1/4, got {value!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {value} is out of range (i must be between 1 and N)")
+    return index, count
+
+
+def shard_dir(index, count, root=shards_dir):
+    return os.path.join(root, f"{index}-of-{count}")
+
+
+def path_hash(relative_path):
+    # Hash of the path with / separators, so every machine agrees on it
+    return hashlib.sha256(relative_path.replace(os.sep, '/').encode('utf-8')).hexdigest()
+
+
+def partition(files, count):
+    # Deal files out into count shards of roughly equal total size: largest
+    # first, each to the shard with the fewest bytes so far. Files of equal
+    # size are ordered by path hash, so every shard process computes the same
+    # split from the same tree without talking to the others.
+    shards = [[] for _ in range(count)]
+    loads = [0] * count
+    for source in sorted(files, key=lambda f: (-f.size, path_hash(f.relative_path))):
+        target = min(range(count), key=lambda i: (loads[i], i))
+        shards[target].append(source)
+        loads[target] += source.size
+    return shards
+
+
+def select_shard(inventory, index, count):
+    # The inventory a shard builds: its share of the pages plus every asset,
+    # which each shard needs for fingerprinted URLs even though only the
+    # first one copies them
+    pages = partition(inventory.pages(), count)[index - 1]
+    return Inventory(pages + inventory.assets())
+
+
+def write_shard_info(directory, index, count, basepath):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, SHARD_INFO), 'w') as f:
+        json.dump({"index": index, "count": count, "basepath": basepath}, f, indent=1, sort_keys=True)
+
+
+def read_shard_info(directory):
+    with open(os.path.join(directory, SHARD_INFO), 'r') as f:
+        return json.load(f)
@@ -0,0 +1,212 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from console import info
+from inventory import ASSET, scan_tree
+from manifest import hash_file
+from output import temp_path_for
+
+COPY_CHUNK = 8 * 1024 * 1024
+# Hex digits of the content hash put into fingerprinted file names
+FINGERPRINT_LENGTH = 10
+
+
+def scan_files(src_dir):
+    # Every regular file under src_dir as SourceFiles sorted by relative path,
+    # for callers that weren't handed an inventory
+    return sorted(scan_tree(src_dir, ASSET), key=lambda f: f.relative_path)
+
+
+def _copy_with(copy_chunk, src, dest, size):
+    # Drive a kernel-side copy primitive until the whole file has been copied
+    with open(src, 'rb') as fsrc, open(dest, 'wb') as fdest:
+        offset = 0
+        while offset < size:
+            copied = copy_chunk(fsrc.fileno(), fdest.fileno(), offset, min(COPY_CHUNK, size - offset))
+            if copied == 0:
+                break
+            offset += copied
+    return offset == size
+
+
+def fast_copy(src, dest):
+    # Copy file contents using the cheapest path the platform offers, then the
+    # metadata, so the destination's size and mtime match the source exactly.
+    # The copy is made next to dest and renamed over it, so readers never see
+    # a half-written file and a dest hardlinked to src is replaced, not
+    # truncated along with its source.
+    size = os.path.getsize(src)
+    tmp_path = temp_path_for(dest)
+    try:
+        copied = False
+        if hasattr(os, 'copy_file_range'):
+            try:
+                copied = _copy_with(lambda i, o, off, n: os.copy_file_range(i, o, n, off, off), src, tmp_path, size)
+            except OSError:
+                copied = False
+        if not copied and hasattr(os, 'sendfile'):
+            try:
+                copied = _copy_with(lambda i, o, off, n: os.sendfile(o, i, off, n), src, tmp_path, size)
+            except OSError:
+                copied = False
+        if not copied:
+            shutil.copyfile(src, tmp_path)
+        shutil.copystat(src, tmp_path)
+        os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def link_or_copy(src, dest):
+    # Hardlinks cost no data at all, but need both paths on the same filesystem
+    tmp_path = temp_path_for(dest)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        fast_copy(src, dest)
+        return
+    os.replace(tmp_path, dest)
+    # rename() does nothing when dest is already a link to the same file
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+
+
+def needs_copy(src_path, dest_path, use_hash=False, source=None):
+    # source is the file's SourceFile from a scan, which saves stat-ing it again
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return True
+    if source is None:
+        src_stat = os.stat(src_path)
+        size, mtime_ns = src_stat.st_size, src_stat.st_mtime_ns
+    else:
+        size, mtime_ns = source.size, source.mtime_ns
+    if size != dest_stat.st_size:
+        return True
+    if mtime_ns == dest_stat.st_mtime_ns:
+        return False
+    if use_hash and hash_file(src_path) == hash_file(dest_path):
+        # Same bytes, only the timestamp drifted; fix it without rewriting data
+        os.utime(dest_path, ns=(dest_stat.st_atime_ns, mtime_ns))
+        return False
+    return True
+
+
+def fingerprinted_name(relative_path, digest):
+    # "images/tom.png" -> "images/tom.3f9a1c0b2e.png"
+    root, ext = os.path.splitext(relative_path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def fingerprint_files(src_dir, known=None, files=None):
+    # Map every file under src_dir to its content-hashed name. known holds the
+    # hashes from the last build keyed by relative path; a hash is reused while
+    # the file's size and mtime are unchanged. files is src_dir's scan, if the
+    # caller already has one. Returns (names, hashes), where hashes is the
+    # updated version of known.
+    known = known or {}
+    names = {}
+    hashes = {}
+    for source in scan_files(src_dir) if files is None else files:
+        relative_path = source.relative_path
+        entry = known.get(relative_path)
+        if entry is None or entry["size"] != source.size or entry["mtime_ns"] != source.mtime_ns:
+            entry = {"size": source.size, "mtime_ns": source.mtime_ns, "hash": hash_file(source.path)}
+        hashes[relative_path] = entry
+        names[relative_path] = fingerprinted_name(relative_path, entry["hash"])
+    return names, hashes
+
+
+def asset_urls(names):
+    # Site-absolute URL of each asset -> URL of its fingerprinted copy, for links.UrlMapRule
+    return {"/" + relative_path.replace(os.sep, "/"): "/" + name.replace(os.sep, "/")
+            for relative_path, name in names.items()}
+
+
+def remove_empty_parents(path, root):
+    # Remove the directories above path that are now empty, stopping at root
+    root = os.path.normpath(root)
+    parent = os.path.dirname(os.path.normpath(path))
+    while parent != root and parent.startswith(root + os.sep):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            # Not empty (or already gone), so neither are the ones above it
+            break
+        parent = os.path.dirname(parent)
+
+
+def run_copies(copies, threads=8):
+    # Run (copy, src_path, dest_path) copies, on a thread pool when there are several
+    if len(copies) > 1 and threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda job: job[0](*job[1:]), copies))
+    else:
+        for copy, src_path, dest_path in copies:
+            copy(src_path, dest_path)
+
+
+class SyncPlan:
+    # sync_files in two halves around the copies themselves, so a caller can
+    # run the copies alongside other work (see main.render_pages). Creating
+    # the plan decides what to copy and makes the directories; finish() then
+    # logs the copies and removes stale files.
+    def __init__(self, src_dir, dest_dir, previous=(), use_hash=False, link=False, names=None, files=None):
+        self.dest_dir = dest_dir
+        self.previous = previous
+        self.outputs = []
+        # (copy, src_path, dest_path) for every file that has to be copied
+        self.copies = []
+        self.file_count = 0
+        self.missing = not os.path.exists(src_dir)
+        if self.missing:
+            print(f"Source directory '{src_dir}' does not exist.")
+            return
+
+        if files is None:
+            files = scan_files(src_dir)
+        self.file_count = len(files)
+        paths = [source.relative_path for source in files]
+        self.outputs = sorted(names.get(path, path) for path in paths) if names else sorted(paths)
+        copy = link_or_copy if link else fast_copy
+        made_dirs = set()
+        for source in files:
+            relative_path = source.relative_path
+            dest_path = os.path.join(dest_dir, names.get(relative_path, relative_path) if names else relative_path)
+            if needs_copy(source.path, dest_path, use_hash, source):
+                dest_parent = os.path.dirname(dest_path)
+                if dest_parent not in made_dirs:
+                    os.makedirs(dest_parent, exist_ok=True)
+                    made_dirs.add(dest_parent)
+                self.copies.append((copy, source.path, dest_path))
+
+    def finish(self):
+        # Call once the copies are done; returns the sorted relative paths of the outputs
+        if self.missing:
+            return []
+        for _, src_path, dest_path in self.copies:
+            info(f"Copied '{src_path}' to '{dest_path}'")
+
+        for relative_path in sorted(set(self.previous) - set(self.outputs)):
+            dest_path = os.path.join(self.dest_dir, relative_path)
+            if os.path.isfile(dest_path):
+                os.remove(dest_path)
+                info(f"Removed stale file '{dest_path}'")
+                remove_empty_parents(dest_path, self.dest_dir)
+
+        info(f"Synced {self.file_count} files ({len(self.copies)} copied).")
+        return self.outputs
+
+
+def sync_files(src_dir, dest_dir, previous=(), use_hash=False, link=False, threads=8, names=None, files=None):
+    # Make dest_dir mirror the files in src_dir, copying only what changed and
+    # removing files that were synced previously but no longer exist in src_dir.
+    # names optionally maps a source's relative path to a different output path
+    # (see fingerprint_files), and files is src_dir's scan if the caller
+    # already has one. Returns the sorted relative paths of the outputs.
+    plan = SyncPlan(src_dir, dest_dir, previous, use_hash, link, names, files)
+    run_copies(plan.copies, threads)
+    return plan.finish()
@@ -0,0 +1,64 @@
+import re
+
+from manifest import hash_bytes
+
+# Matches placeholders such as {{ Title }} or {{Content}}
+PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class Template:
+    def __init__(self, source, path=None):
+        self.source = source
+        self.path = path
+        # LinkRewriter.key of the rules already applied to this template's URLs
+        self.links_key = None
+        self.hash = hash_bytes(source.encode('utf-8'))
+        # The template is split once into literal chunks with a named slot
+        # between each pair, so rendering is a single join with no rescans
+        self.chunks = []
+        self.slots = []
+        self.placeholders = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            self.chunks.append(source[position:match.start()])
+            self.slots.append(match.group(1))
+            self.placeholders.append(match.group(0))
+            position = match.end()
+        self.chunks.append(source[position:])
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls(f.read(), path)
+
+    def with_links(self, rewriter):
+        # Return a copy whose href/src URLs have been passed through rewriter.
+        # This scans the template source, so it is done once per build.
+        if self.links_key == rewriter.key:
+            return self
+        template = Template(rewriter.rewrite_html(self.source), self.path)
+        template.links_key = rewriter.key
+        return template
+
+    def iter_parts(self, values):
+        # A value may be a string or an iterable of fragments, such as the
+        # output of htmlnode.iter_html. Placeholders without a value are left
+        # in the output untouched.
+        for chunk, name, placeholder in zip(self.chunks, self.slots, self.placeholders):
+            yield chunk
+            value = values.get(name, placeholder)
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+        yield self.chunks[-1]
+
+    def render(self, values):
+        return "".join(self.iter_parts(values))
+
+    def write(self, f, values):
+        # Stream the page into an open file without building it in memory first
+        f.writelines(self.iter_parts(values))
+
+    def __repr__(self):
+        return f"Template({self.path}, {self.slots})"
@@ -0,0 +1,52 @@
+import unittest
+
+from block_cache import BlockCache
+from code_func import markdown_to_html_node
+from links import LinkRewriter
+
+MARKDOWN = "# Title\n\nFirst [link](/a) & **bold**\n\n- one\n- two\n\n![img](/i.png)\n\nLast paragraph"
+
+
+def full_render(markdown, rewriter):
+    node = markdown_to_html_node(markdown)
+    rewriter.rewrite(node)
+    return node.to_html()
+
+
+class TestBlockCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = BlockCache()
+        self.rewriter = LinkRewriter.for_basepath("/site/")
+
+    def test_matches_full_render(self):
+        self.assertEqual(self.cache.render("a.md", MARKDOWN, self.rewriter), full_render(MARKDOWN, self.rewriter))
+
+    def test_edit_renders_only_changed_blocks(self):
+        self.cache.render("a.md", MARKDOWN, self.rewriter)
+        self.assertEqual(self.cache.take_stats(), (0, 5))
+        edited = MARKDOWN.replace("Last paragraph", "Edited paragraph\n\nNew block")
+        self.assertEqual(self.cache.render("a.md", edited, self.rewriter), full_render(edited, self.rewriter))
+        self.assertEqual(self.cache.take_stats(), (4, 2))
+
+    def test_repeated_blocks_render_once(self):
+        self.cache.render("a.md", "# T\n\nsame\n\nsame\n\nsame", self.rewriter)
+        self.assertEqual(self.cache.take_stats(), (2, 2))
+
+    def test_new_link_rules_render_everything(self):
+        self.cache.render("a.md", MARKDOWN, self.rewriter)
+        self.cache.take_stats()
+        other = LinkRewriter.for_basepath("/other/")
+        self.assertEqual(self.cache.render("a.md", MARKDOWN, other), full_render(MARKDOWN, other))
+        self.assertEqual(self.cache.take_stats(), (0, 5))
+
+    def test_pages_are_evicted_least_recently_used(self):
+        cache = BlockCache(max_pages=2)
+        for src_path in ("a.md", "b.md", "a.md", "c.md"):
+            cache.render(src_path, MARKDOWN, self.rewriter)
+        self.assertEqual(list(cache.pages), ["a.md", "c.md"])
+        cache.forget("a.md")
+        self.assertEqual(list(cache.pages), ["c.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
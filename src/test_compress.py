@@ -0,0 +1,68 @@
+import unittest
+import gzip
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from compress import compress_outputs, gzip_bytes
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.page = self.write("index.html", "<p>hello</p>" * 200)
+        self.css = self.write("index.css", "body { color: red }\n" * 100)
+        self.small = self.write("small.html", "<p>hi</p>")
+        self.image = self.write("tom.png", "x" * 5000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(data)
+        return path
+
+    def compress(self, paths, previous=None, **kwargs):
+        with redirect_stdout(StringIO()):
+            return compress_outputs(paths, previous, **kwargs)
+
+    def test_gzip_bytes_round_trips_and_is_reproducible(self):
+        data = b"<p>hello</p>" * 100
+        self.assertEqual(gzip.decompress(gzip_bytes(data)), data)
+        self.assertEqual(gzip_bytes(data), gzip_bytes(data))
+
+    def test_only_large_text_files_get_sidecars(self):
+        compressed = self.compress([self.page, self.css, self.small, self.image])
+        self.assertEqual(sorted(compressed), sorted([os.path.normpath(self.page), os.path.normpath(self.css)]))
+        with open(self.page + ".gz", "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()).decode(), "<p>hello</p>" * 200)
+        self.assertFalse(os.path.exists(self.small + ".gz"))
+        self.assertFalse(os.path.exists(self.image + ".gz"))
+        # gzip would make a file this small bigger, so it never gets a sidecar
+        self.assertEqual(self.compress([self.small], min_size=1), {})
+        self.assertFalse(os.path.exists(self.small + ".gz"))
+
+    def test_unchanged_files_reuse_their_sidecar(self):
+        compressed = self.compress([self.page, self.css])
+        os.utime(self.page + ".gz", (0, 0))
+        self.write("index.css", "a { color: blue }\n" * 100)
+        os.utime(self.css + ".gz", (0, 0))
+        again = self.compress([self.page, self.css], compressed, threads=1)
+        self.assertEqual(os.stat(self.page + ".gz").st_mtime, 0)
+        self.assertNotEqual(os.stat(self.css + ".gz").st_mtime, 0)
+        self.assertNotEqual(again[os.path.normpath(self.css)], compressed[os.path.normpath(self.css)])
+
+    def test_sidecars_of_dropped_outputs_are_removed(self):
+        compressed = self.compress([self.page, self.css])
+        css = os.path.normpath(self.css)
+        self.assertEqual(self.compress([self.css], compressed), {css: compressed[css]})
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.compress([], compressed)
+        self.assertFalse(os.path.exists(self.css + ".gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import re
+import time
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
@@ -8,7 +9,11 @@ from htmlnode import HTMLNode
 from htmlnode import LeafNode
 from htmlnode import ParentNode
 from textnode import TextType, TextNode
-from htmlnode import text_node_to_html_node
+from htmlnode import text_node_to_html_node, iter_html, write_html
+from io import StringIO
+from code_func import MarkdownBlockStream
+from code_func import block_handlers, block_to_block_type, register_block
+from textnode import BlockType
 from code_func import split_nodes_delimiter, extract_markdown_images, split_nodes_image, split_nodes_link, text_to_textnodes, markdown_to_blocks, extract_title, markdown_to_html_node
 
 
@@ -222,6 +227,160 @@ class TestHtmlNode(unittest.TestCase):
 
 
 
+class TestCompactNodes(unittest.TestCase):
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("div"), LeafNode("p", "x"), ParentNode("div", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_tags_are_interned(self):
+        level = 2
+        self.assertIs(ParentNode(f"h{level}", []).tag, ParentNode("h2", []).tag)
+
+    def test_empty_props_are_not_allocated(self):
+        self.assertIsNone(LeafNode("p", "x", {}).props)
+
+
+class TestSerializer(unittest.TestCase):
+    def test_escapes_text_and_attributes(self):
+        node = ParentNode("p", [LeafNode(None, "a < b & c"), LeafNode("a", "x", {"href": '/q?a=1&b="2"'})])
+        self.assertEqual(node.to_html(), '<p>a &lt; b &amp; c<a href="/q?a=1&amp;b=&quot;2&quot;">x</a></p>')
+
+    def test_text_node_children(self):
+        node = ParentNode("p", [TextNode("hi ", TextType.TEXT), TextNode("there", TextType.BOLD),
+                                TextNode("pic", TextType.IMAGE, "/a.png")])
+        self.assertEqual(node.to_html(), '<p>hi <b>there</b><img src="/a.png" alt="pic"></p>')
+
+    def test_deep_tree_does_not_recurse(self):
+        node = LeafNode("b", "deep")
+        for _ in range(sys.getrecursionlimit() * 2):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertIn("<b>deep</b>", html)
+
+    def test_write_html_matches_to_html(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode("i", "x")]), LeafNode(None, "tail")])
+        out = StringIO()
+        write_html(node, out)
+        self.assertEqual(out.getvalue(), node.to_html())
+        self.assertEqual("".join(iter_html(node)), node.to_html())
+
+    def test_invalid_child_raises_type_error(self):
+        with self.assertRaises(TypeError):
+            ParentNode("div", ["not a node"]).to_html()
+
+
+class TestTextToTextNodes(unittest.TestCase):
+    def test_all_inline_types(self):
+        nodes = text_to_textnodes("a **b** __c__ *d* _e_ `f` [g](h)")
+        self.assertEqual(nodes, [
+            TextNode("a ", TextType.TEXT),
+            TextNode("b", TextType.BOLD),
+            TextNode(" ", TextType.TEXT),
+            TextNode("c", TextType.BOLD),
+            TextNode(" ", TextType.TEXT),
+            TextNode("d", TextType.ITALIC),
+            TextNode(" ", TextType.TEXT),
+            TextNode("e", TextType.ITALIC),
+            TextNode(" ", TextType.TEXT),
+            TextNode("f", TextType.CODE),
+            TextNode(" ", TextType.TEXT),
+            TextNode("g", TextType.LINK, "h"),
+        ])
+
+    def test_unmatched_markers_stay_plain_text(self):
+        self.assertEqual(text_to_textnodes("snake_case and 2 * 3"),
+                         [TextNode("snake_case and 2 * 3", TextType.TEXT)])
+        self.assertEqual(text_to_textnodes("[not a link] then *x*"),
+                         [TextNode("[not a link] then ", TextType.TEXT), TextNode("x", TextType.ITALIC)])
+
+    def test_code_wins_over_later_markers(self):
+        self.assertEqual(text_to_textnodes("`a*b*`"), [TextNode("a*b*", TextType.CODE)])
+
+    def time_tokenize(self, text):
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            text_to_textnodes(text)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def test_linear_on_pathological_inputs(self):
+        # A quadratic tokenizer slows down ~64x for 8x the input; allow a wide margin over 8x
+        patterns = ["*", "_ ", "[a] ", "**b* ", "`x` *", "[a](b"]
+        for pattern in patterns:
+            small = self.time_tokenize(pattern * 1000)
+            large = self.time_tokenize(pattern * 8000)
+            self.assertLess(large, max(small, 1e-4) * 24, f"tokenizing {pattern!r} is not linear")
+
+
+class TestMarkdownBlockStream(unittest.TestCase):
+    def test_matches_markdown_to_blocks(self):
+        markdown = "# Title\n\n\n\npara one\nstill one\n  \nstill one\n\n \n\n- a\n- b\n\n\n```\ncode\n```\n"
+        stream = MarkdownBlockStream(StringIO(markdown))
+        self.assertEqual(list(stream), markdown_to_blocks(markdown))
+        self.assertEqual(stream.title, "Title")
+
+    def test_title_found_later_in_file(self):
+        stream = MarkdownBlockStream(["intro\n", "\n", "#  Late title \n"])
+        self.assertEqual(list(stream), ["intro", "#  Late title"])
+        self.assertEqual(stream.title, "Late title")
+
+    def test_blocks_are_lazy(self):
+        lines = iter(["a\n", "\n", "b\n", "\n", "c\n"])
+        blocks = iter(MarkdownBlockStream(lines))
+        self.assertEqual(next(blocks), "a")
+        self.assertEqual(next(lines), "b\n")
+
+
+class TestBlockTypes(unittest.TestCase):
+    def test_block_to_block_type(self):
+        cases = {
+            "### Heading": BlockType.HEADING,
+            "####### Too deep": BlockType.PARAGRAPH,
+            "#hashtag": BlockType.PARAGRAPH,
+            "```\ncode\n```": BlockType.CODE,
+            "> one\n  > two": BlockType.QUOTE,
+            "- one\n- two": BlockType.UNORDERED_LIST,
+            "- one\ntwo": BlockType.PARAGRAPH,
+            "1. one\n10. two": BlockType.ORDERED_LIST,
+            "> quote\n- list": BlockType.PARAGRAPH,
+            "![alt](/a.png)": BlockType.IMAGE,
+            "[text](/a)": BlockType.LINK,
+            "plain text": BlockType.PARAGRAPH,
+        }
+        for block, block_type in cases.items():
+            self.assertEqual(block_to_block_type(block), block_type, block)
+
+    def register(self, *args, **kwargs):
+        handler = register_block(*args, **kwargs)
+        self.addCleanup(block_handlers.remove, handler)
+        return handler
+
+    def test_custom_line_block(self):
+        def render_table(block, found):
+            rows = [ParentNode("tr", [LeafNode("td", cell.strip()) for cell in line_match.group(1).split("|")])
+                    for line_match in found]
+            return [ParentNode("table", rows)]
+
+        self.register("table", render_table, line=r"\|(.*)\|$")
+        self.assertEqual(block_to_block_type("| a | b |\n| c | d |"), "table")
+        self.assertEqual(block_to_block_type("| a | b |\nnot a row"), BlockType.PARAGRAPH)
+        html = markdown_to_html_node("# T\n\n| a | b |\n| c | d |").to_html()
+        self.assertEqual(html, "<div><h1>T</h1><table><tr><td>a</td><td>b</td></tr>"
+                               "<tr><td>c</td><td>d</td></tr></table></div>")
+
+    def test_custom_block_takes_priority_when_registered_before(self):
+        def render_admonition(block, found):
+            return [ParentNode("aside", text_to_textnodes(block[found.end():].strip()), {"class": found.group(1)})]
+
+        self.register("admonition", render_admonition, match=re.compile(r"> \[!(\w+)\]").match,
+                      before=BlockType.QUOTE)
+        html = markdown_to_html_node("> [!note] Mind the **gap**\n\n> plain quote").to_html()
+        self.assertEqual(html, '<div><aside class="note">Mind the <b>gap</b></aside>'
+                               '<blockquote>plain quote</blockquote></div>')
+
+
 class TestExtractTitle(unittest.TestCase):
     def test_extract_title_normal_case(self):
         markdown = "# This is a title\nSome content"
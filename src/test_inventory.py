@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from inventory import ASSET, PAGE, Inventory
+from main import collect_pages
+
+
+class TestInventory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        for relative_path, data in [
+            ("content/index.md", "# Home"),
+            ("content/notes.txt", "not a page"),
+            ("content/blog/b/index.md", "# B"),
+            ("content/blog/a.md", "# A"),
+            ("static/index.css", "body {}"),
+            ("static/images/tom.png", "png"),
+        ]:
+            path = os.path.join(self.tmp.name, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_finds_pages_and_assets_in_order(self):
+        inventory = Inventory.scan(self.content, self.static)
+        self.assertEqual([f.relative_path for f in inventory.pages()],
+                         [os.path.join("blog", "a.md"), os.path.join("blog", "b", "index.md"), "index.md"])
+        self.assertEqual([f.relative_path for f in inventory.assets()],
+                         [os.path.join("images", "tom.png"), "index.css"])
+        self.assertEqual(len(inventory), 5)
+
+    def test_entries_carry_stat_results(self):
+        inventory = Inventory.scan(self.content, self.static)
+        css = inventory.get(os.path.join(self.static, "index.css"))
+        stat = os.stat(css.path)
+        self.assertEqual(css.kind, ASSET)
+        self.assertEqual((css.size, css.mtime_ns), (stat.st_size, stat.st_mtime_ns))
+        self.assertEqual(inventory.snapshot()[css.path], (stat.st_mtime_ns, stat.st_size))
+        self.assertEqual(inventory.get(os.path.join(self.content, "index.md")).kind, PAGE)
+        self.assertIsNone(inventory.get(os.path.join(self.content, "notes.txt")))
+
+    def test_missing_directories_are_empty(self):
+        inventory = Inventory.scan(os.path.join(self.tmp.name, "nope"), os.path.join(self.tmp.name, "none"))
+        self.assertEqual(len(inventory), 0)
+
+    def test_collect_pages_uses_inventory(self):
+        inventory = Inventory.scan(self.content)
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertEqual(collect_pages(self.content, "docs", inventory), [
+            (os.path.join(self.content, "blog", "a.md"), os.path.join("docs", "blog", "a.html")),
+            (os.path.join(self.content, "blog", "b", "index.md"), os.path.join("docs", "blog", "b", "index.html")),
+            (os.path.join(self.content, "index.md"), os.path.join("docs", "index.html")),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from linkcheck import LinkIndex, check_site, link_path
+from main import generate_pages_recursive
+from manifest import Manifest
+
+OUTPUTS = {"index.html", "blog/index.html", "blog/tom/index.html", "contact.html", "images/tom.png"}
+
+
+class TestLinkIndex(unittest.TestCase):
+    def check(self, urls, basepath="/", output="blog/tom/index.html"):
+        index = LinkIndex(basepath)
+        index.add("tom.md", urls, output)
+        return [(url, reason) for _, url, reason in index.check(OUTPUTS)]
+
+    def test_link_path_skips_external_urls(self):
+        for url in ["https://x.dev/a", "mailto:a@b.c", "//cdn.example/x.js", "#top", "", "data:image/png;base64,x"]:
+            self.assertIsNone(link_path(url))
+        self.assertEqual(link_path("/blog/a%20b?x=1#top"), "/blog/a b")
+
+    def test_resolves_pages_directories_and_files(self):
+        self.assertEqual(self.check(["/", "/blog", "/blog/", "/blog/tom#part", "/contact", "/contact.html",
+                                     "/images/tom.png", "../", "../../contact.html", "index.html", ""]), [])
+
+    def test_reports_missing_targets(self):
+        self.assertEqual(self.check(["/blog/nope", "/images/nope.png", "nope.html"]), [
+            ("/blog/nope", "no such page or file"),
+            ("/images/nope.png", "no such page or file"),
+            ("nope.html", "no such page or file"),
+        ])
+
+    def test_honours_the_basepath(self):
+        self.assertEqual(self.check(["/site/", "/site", "/site/blog/tom", "/blog/tom"], basepath="/site/"),
+                         [("/blog/tom", "outside the site's basepath /site/")])
+
+    def test_relative_links_without_a_page_are_skipped(self):
+        self.assertEqual(self.check(["nope.html", "/nope"], output=None), [("/nope", "no such page or file")])
+
+
+class TestBuildLinkCheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.output = os.path.join(self.tmp.name, "docs")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+        self.write_page("index.md", "# Home\n\n[Broken](/nope) and [About](/about)")
+        self.write_page("about/index.md", "# About\n\n[Home](/)")
+        self.manifest_path = os.path.join(self.tmp.name, "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_page(self, relative_path, markdown):
+        path = os.path.join(self.content, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(markdown)
+
+    def build(self, **kwargs):
+        manifest = Manifest.load(self.manifest_path)
+        self.log = StringIO()
+        with redirect_stdout(self.log):
+            generate_pages_recursive(self.content, self.template, self.output, "/site/", manifest, **kwargs)
+        manifest.save()
+        outputs = [entry["output"] for entry in manifest.pages.values()]
+        return [(os.path.relpath(source, self.content), url)
+                for source, url, _ in check_site(manifest, self.output, "/site/", outputs)]
+
+    def test_parallel_and_incremental_builds_report_the_same_links(self):
+        expected = [("index.md", "/site/nope")]
+        self.assertEqual(self.build(jobs=2), expected)
+        # Nothing is re-rendered, so the links come from the manifest
+        self.assertEqual(self.build(io_limit=1), expected)
+        self.assertNotIn("Generating", self.log.getvalue())
+
+        self.write_page("index.md", "# Home\n\n[About](/about)")
+        self.assertEqual(self.build(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
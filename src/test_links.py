@@ -0,0 +1,74 @@
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from links import BasepathRule, ExternalLinkRule, LinkRewriter, UrlMapRule, html_urls
+from textnode import TextNode, TextType
+
+
+class TestLinkRewriter(unittest.TestCase):
+    def test_basepath_rewrites_site_absolute_urls(self):
+        tree = ParentNode("div", [
+            LeafNode("img", None, {"src": "/images/a.png", "alt": "a"}),
+            ParentNode("p", [TextNode("home", TextType.LINK, "/"), TextNode("ext", TextType.LINK, "https://x.dev")]),
+            ParentNode("a", [TextNode("cdn", TextType.TEXT)], {"href": "//cdn.example/x.js"}),
+        ])
+        rewriter = LinkRewriter.for_basepath("/site/")
+        self.assertEqual(rewriter.rewrite(tree), 4)
+        self.assertEqual(tree.to_html(), '<div><img src="/site/images/a.png" alt="a" />'
+                                         '<p><a href="/site/">home</a><a href="https://x.dev">ext</a></p>'
+                                         '<a href="//cdn.example/x.js">cdn</a></div>')
+
+    def test_text_that_looks_like_an_attribute_is_untouched(self):
+        tree = ParentNode("p", [TextNode('write href="/x" in HTML', TextType.TEXT)])
+        LinkRewriter.for_basepath("/site/").rewrite(tree)
+        self.assertEqual(tree.to_html(), '<p>write href="/x" in HTML</p>')
+
+    def test_root_basepath_has_no_rules(self):
+        rewriter = LinkRewriter.for_basepath("/")
+        self.assertEqual(rewriter.rules, [])
+        self.assertEqual(rewriter.rewrite(ParentNode("p", [TextNode("a", TextType.LINK, "/x")])), 0)
+
+    def test_url_map_runs_before_basepath(self):
+        rewriter = LinkRewriter.for_basepath("/site/", [UrlMapRule({"/index.css": "/index.abc123.css"})])
+        self.assertEqual(rewriter.rewrite_props("link", {"href": "/index.css"}), {"href": "/site/index.abc123.css"})
+
+    def test_external_link_attributes(self):
+        tree = ParentNode("p", [TextNode("ext", TextType.LINK, "https://x.dev"), TextNode("in", TextType.LINK, "/in")])
+        LinkRewriter([ExternalLinkRule()]).rewrite(tree)
+        self.assertEqual(tree.to_html(), '<p><a href="https://x.dev" rel="noopener noreferrer" target="_blank">ext</a>'
+                                         '<a href="/in">in</a></p>')
+
+    def test_rewrite_html_for_templates(self):
+        rewriter = LinkRewriter([BasepathRule("/site/")])
+        html = '<link href="/index.css" rel="stylesheet" />\n<script src="/a.js"></script><a href="https://x">x</a>'
+        self.assertEqual(rewriter.rewrite_html(html),
+                         '<link href="/site/index.css" rel="stylesheet" />\n'
+                         '<script src="/site/a.js"></script><a href="https://x">x</a>')
+
+    def test_rewrite_collects_final_urls(self):
+        tree = ParentNode("div", [
+            LeafNode("img", None, {"src": "/a.png", "alt": "a"}),
+            ParentNode("p", (TextNode("home", TextType.LINK, "/"), TextNode("ext", TextType.LINK, "https://x.dev"))),
+        ])
+        links = []
+        LinkRewriter([BasepathRule("/site/"), ExternalLinkRule()]).rewrite(tree, links)
+        self.assertEqual(sorted(links), ["/site/", "/site/a.png", "https://x.dev"])
+
+        # Without rules the tree is still walked for its links, but left as it was
+        links = []
+        children = (TextNode("home", TextType.LINK, "/"),)
+        tree = ParentNode("p", children)
+        self.assertEqual(LinkRewriter.for_basepath("/").rewrite(tree, links), 1)
+        self.assertEqual(links, ["/"])
+        self.assertIs(tree.children, children)
+
+    def test_html_urls(self):
+        self.assertEqual(html_urls('<link href="/index.css" /><img src="a.png" alt="x">'), ["/index.css", "a.png"])
+
+    def test_key_changes_with_rules(self):
+        self.assertNotEqual(LinkRewriter.for_basepath("/a/").key, LinkRewriter.for_basepath("/b/").key)
+        self.assertNotEqual(LinkRewriter([UrlMapRule({"/a": "/b"})]).key, LinkRewriter([UrlMapRule({"/a": "/c"})]).key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+import main as site
+import profiler
+from main import collect_pages, generate_page, generate_pages_recursive, prune_output, stream_page
+from manifest import Manifest, hash_file
+from template import Template
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write(TEMPLATE)
+        self.write_page("index.md", "# Home\n\nWelcome **home**")
+        self.write_page("blog/b/index.md", "# B\n\n- one\n- two")
+        self.write_page("blog/a/index.md", "# A\n\n[link](/blog/b)")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_page(self, relative_path, markdown):
+        path = os.path.join(self.content, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(markdown)
+
+    def build(self, name, **kwargs):
+        output = os.path.join(self.tmp.name, name)
+        with redirect_stdout(StringIO()):
+            errors = generate_pages_recursive(self.content, self.template, output, "/", **kwargs)
+        return output, errors
+
+    def read_tree(self, root):
+        tree = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path) as f:
+                    tree[os.path.relpath(path, root)] = f.read()
+        return tree
+
+    def test_collect_pages_is_sorted(self):
+        pages = collect_pages(self.content, "out")
+        self.assertEqual(pages, [
+            (os.path.join(self.content, "blog", "a", "index.md"), os.path.join("out", "blog", "a", "index.html")),
+            (os.path.join(self.content, "blog", "b", "index.md"), os.path.join("out", "blog", "b", "index.html")),
+            (os.path.join(self.content, "index.md"), os.path.join("out", "index.html")),
+        ])
+
+    def test_parallel_output_matches_serial(self):
+        serial, serial_errors = self.build("serial", jobs=1)
+        parallel, parallel_errors = self.build("parallel", jobs=3)
+        self.assertEqual(serial_errors, [])
+        self.assertEqual(parallel_errors, [])
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_pipelined_output_matches_one_by_one(self):
+        self.write_page("broken/index.md", "no title here")
+        manifests = [Manifest(os.path.join(self.tmp.name, f"manifest-{limit}.json")) for limit in (1, 8)]
+        one_by_one, one_by_one_errors = self.build("one", manifest=manifests[0], io_limit=1)
+        pipelined, pipelined_errors = self.build("pipelined", manifest=manifests[1], io_limit=8)
+        self.assertEqual(len(pipelined_errors), 1)
+        self.assertEqual(one_by_one_errors, pipelined_errors)
+        self.assertEqual(self.read_tree(one_by_one), self.read_tree(pipelined))
+        self.assertEqual([entry["output_hash"] for entry in manifests[0].pages.values()],
+                         [entry["output_hash"] for entry in manifests[1].pages.values()])
+
+    def test_large_sources_are_streamed_on_every_path(self):
+        # Whether to stream comes from the scanned size, in the pipeline too
+        regular, _ = self.build("regular")
+        threshold = site.STREAM_THRESHOLD
+        site.STREAM_THRESHOLD = 1
+        try:
+            for io_limit in (1, 8):
+                log = StringIO()
+                with redirect_stdout(log):
+                    output = os.path.join(self.tmp.name, f"streamed-{io_limit}")
+                    errors = generate_pages_recursive(self.content, self.template, output, "/", io_limit=io_limit)
+                self.assertEqual(errors, [])
+                self.assertEqual(log.getvalue().count("Streaming page"), 3)
+                self.assertEqual(self.read_tree(output), self.read_tree(regular))
+        finally:
+            site.STREAM_THRESHOLD = threshold
+
+    def test_copies_run_alongside_rendering(self):
+        def copy(src_path, dest_path):
+            print(f"Copy {src_path}")
+
+        copies = [(copy, f"asset{i}", f"out{i}") for i in range(5)]
+        for jobs, io_limit in [(1, 1), (1, 2), (2, 2)]:
+            log = StringIO()
+            with redirect_stdout(log):
+                generate_pages_recursive(self.content, self.template, os.path.join(self.tmp.name, "out"), "/",
+                                         jobs=jobs, io_limit=io_limit, copies=copies)
+            lines = log.getvalue().splitlines()
+            copied = [i for i, line in enumerate(lines) if line.startswith("Copy ")]
+            self.assertEqual(len(copied), 5)
+            if (jobs, io_limit) == (1, 2):
+                # On the pipeline, copies start before the last page does
+                rendered = [i for i, line in enumerate(lines) if line.startswith("Generating page")]
+                self.assertLess(copied[0], rendered[-1])
+
+    def test_errors_are_collected_per_page(self):
+        self.write_page("broken/index.md", "no title here")
+        output, errors = self.build("out", jobs=2)
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0][0].endswith(os.path.join("broken", "index.md")))
+        self.assertIn("No title found", errors[0][1])
+        self.assertTrue(os.path.exists(os.path.join(output, "index.html")))
+
+    def test_stream_page_matches_generate_page(self):
+        self.write_page("long/index.md", "intro\n\n# Long\n\n" + "\n\n".join(
+            f"para {i} with [a link](/x/{i}) and ![img](/i.png)" for i in range(50)))
+        src = os.path.join(self.content, "long", "index.md")
+        regular = os.path.join(self.tmp.name, "regular.html")
+        streamed = os.path.join(self.tmp.name, "streamed.html")
+        with redirect_stdout(StringIO()):
+            final_html = generate_page(src, self.template, regular, "/site/")
+            output_hash = stream_page(src, self.template, streamed, "/site/")
+        with open(streamed) as f:
+            self.assertEqual(f.read(), final_html)
+        self.assertEqual(output_hash, hash_file(streamed))
+
+    def test_title_and_front_matter_are_escaped(self):
+        self.write_page("escaped/index.md", '---\nsummary: say "hi" & <leave>\n---\n# a < b\n\ntext')
+        src = os.path.join(self.content, "escaped", "index.md")
+        template = Template('<title>{{ Title }}</title><meta content="{{ Summary }}">{{ Content }}')
+        with redirect_stdout(StringIO()):
+            final_html = generate_page(src, template, os.path.join(self.tmp.name, "regular.html"), "/")
+            stream_page(src, template, os.path.join(self.tmp.name, "streamed.html"), "/")
+        self.assertTrue(final_html.startswith(
+            '<title>a &lt; b</title><meta content="say &quot;hi&quot; &amp; &lt;leave&gt;">'))
+        with open(os.path.join(self.tmp.name, "streamed.html")) as f:
+            self.assertEqual(f.read(), final_html)
+
+    def test_stream_page_without_title_fails_cleanly(self):
+        self.write_page("untitled/index.md", "no title\n\nat all")
+        dest = os.path.join(self.tmp.name, "untitled.html")
+        with redirect_stdout(StringIO()), self.assertRaises(ValueError):
+            stream_page(os.path.join(self.content, "untitled", "index.md"), self.template, dest, "/")
+        self.assertFalse(os.path.exists(dest))
+        self.assertEqual([name for name in os.listdir(self.tmp.name) if name.endswith(".tmp")], [])
+
+    def test_incremental_skips_unchanged_pages(self):
+        manifest = Manifest(os.path.join(self.tmp.name, "manifest.json"))
+        output, _ = self.build("out", manifest=manifest)
+        self.assertEqual(len(manifest.pages), 3)
+        page = os.path.join(output, "index.html")
+        os.utime(page, (0, 0))
+        self.build("out", manifest=manifest)
+        self.assertEqual(os.stat(page).st_mtime, 0)
+
+    def test_incremental_trusts_unchanged_source_stat(self):
+        manifest = Manifest(os.path.join(self.tmp.name, "manifest.json"))
+        output, _ = self.build("out", manifest=manifest)
+        # Different bytes under the same size and mtime aren't read again...
+        src = os.path.join(self.content, "index.md")
+        stat = os.stat(src)
+        self.write_page("index.md", "# Hoem\n\nWelcome **home**")
+        os.utime(src, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.build("out", manifest=manifest)
+        with open(os.path.join(output, "index.html")) as f:
+            self.assertIn("<title>Home</title>", f.read())
+        # ...but a new mtime has the source hashed and the page rebuilt
+        os.utime(src, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.build("out", manifest=manifest)
+        with open(os.path.join(output, "index.html")) as f:
+            self.assertIn("<title>Hoem</title>", f.read())
+
+    def test_identical_output_is_not_rewritten(self):
+        output, _ = self.build("out")
+        page = os.path.join(output, "index.html")
+        other = os.path.join(output, "blog", "a", "index.html")
+        os.utime(page, (0, 0))
+        os.utime(other, (0, 0))
+        self.write_page("blog/a/index.md", "# A\n\nChanged")
+        self.build("out")
+        self.assertEqual(os.stat(page).st_mtime, 0)
+        self.assertNotEqual(os.stat(other).st_mtime, 0)
+
+    def test_prune_output_removes_unlisted_files(self):
+        output, _ = self.build("out")
+        keep = [os.path.join(output, "index.html"), os.path.join(output, "blog", "a", "index.html")]
+        with redirect_stdout(StringIO()):
+            removed = prune_output(output, keep)
+        self.assertEqual(removed, [os.path.join(output, "blog", "b", "index.html")])
+        self.assertFalse(os.path.exists(os.path.join(output, "blog", "b")))
+        self.assertEqual(sorted(self.read_tree(output)), [os.path.join("blog", "a", "index.html"), "index.html"])
+
+
+
+class TestBuildCommand(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        os.makedirs("static")
+        with open("template.html", "w") as f:
+            f.write(TEMPLATE)
+        for name in ["index", "about", "contact"]:
+            os.makedirs(os.path.join("content", name))
+            with open(os.path.join("content", name, "index.md"), "w") as f:
+                f.write(f"# {name}\n\nSome *text*")
+
+    def tearDown(self):
+        profiler.enable(False)
+        profiler.take_events()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_default_build_reports_page_timings(self):
+        # --jobs 1 with the default --io-limit renders through the I/O pipeline
+        out = StringIO()
+        with redirect_stdout(out):
+            site.main(["--profile", "trace.json", "--parse-cache-size", "0"])
+        self.assertIn("Slowest pages (3 of 3):", out.getvalue())
+        self.assertIn(os.path.join("content", "about", "index.md"), out.getvalue())
+
+    def test_external_links_flag(self):
+        with open(os.path.join("content", "about", "index.md"), "w") as f:
+            f.write("# About\n\nGo [elsewhere](https://example.com) or [home](/)")
+        with redirect_stdout(StringIO()):
+            site.main(["--external-links", "--parse-cache-size", "0"])
+        with open(os.path.join("docs", "about", "index.html")) as f:
+            html = f.read()
+        self.assertIn('<a href="https://example.com" rel="noopener noreferrer" target="_blank">elsewhere</a>', html)
+        self.assertIn('<a href="/">home</a>', html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from manifest import Manifest, hash_bytes, hash_file
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.manifest_path = os.path.join(self.dir, "manifest.json")
+        self.output = os.path.join(self.dir, "out", "index.html")
+        os.makedirs(os.path.dirname(self.output))
+        with open(self.output, "w") as f:
+            f.write("<p>hi</p>")
+        self.output_hash = hash_bytes(b"<p>hi</p>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hash_file_matches_hash_bytes(self):
+        self.assertEqual(hash_file(self.output), self.output_hash)
+
+    def test_unknown_page_is_not_fresh(self):
+        manifest = Manifest(self.manifest_path)
+        self.assertFalse(manifest.is_fresh("a.md", "s", "t", "/", self.output))
+
+    def test_recorded_page_is_fresh_after_reload(self):
+        manifest = Manifest(self.manifest_path)
+        manifest.record("a.md", "s", "t", "/", self.output, self.output_hash)
+        manifest.save()
+        reloaded = Manifest.load(self.manifest_path)
+        self.assertTrue(reloaded.is_fresh("a.md", "s", "t", "/", self.output))
+
+    def test_changed_inputs_are_not_fresh(self):
+        manifest = Manifest(self.manifest_path)
+        manifest.record("a.md", "s", "t", "/", self.output, self.output_hash)
+        self.assertFalse(manifest.is_fresh("a.md", "s2", "t", "/", self.output))
+        self.assertFalse(manifest.is_fresh("a.md", "s", "t2", "/", self.output))
+        self.assertFalse(manifest.is_fresh("a.md", "s", "t", "/blog/", self.output))
+
+    def test_edited_output_is_not_fresh(self):
+        manifest = Manifest(self.manifest_path)
+        manifest.record("a.md", "s", "t", "/", self.output, self.output_hash)
+        with open(self.output, "w") as f:
+            f.write("<p>edited</p>")
+        self.assertFalse(manifest.is_fresh("a.md", "s", "t", "/", self.output))
+
+    def test_output_with_recorded_stat_is_not_rehashed(self):
+        manifest = Manifest(self.manifest_path)
+        manifest.record("a.md", "s", "t", "/", self.output, self.output_hash)
+        # Same size and mtime: trusted without reading the file
+        stat = os.stat(self.output)
+        with open(self.output, "w") as f:
+            f.write("<p>ho</p>")
+        os.utime(self.output, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertTrue(manifest.is_fresh("a.md", "s", "t", "/", self.output))
+        # A new mtime makes it hash the output, which no longer matches
+        os.utime(self.output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertFalse(manifest.is_fresh("a.md", "s", "t", "/", self.output))
+
+    def test_touched_output_is_fresh_and_restamped(self):
+        manifest = Manifest(self.manifest_path)
+        manifest.record("a.md", "s", "t", "/", self.output, self.output_hash)
+        os.utime(self.output, (5000, 5000))
+        self.assertTrue(manifest.is_fresh("a.md", "s", "t", "/", self.output))
+        self.assertEqual(manifest.pages["a.md"]["output_mtime_ns"], 5000 * 10**9)
+
+    def test_source_hash_needs_matching_stat(self):
+        manifest = Manifest(self.manifest_path)
+        manifest.record("a.md", "s", "t", "/", self.output, self.output_hash, source_stat=(10, 20))
+        self.assertEqual(manifest.source_hash("a.md", 10, 20), "s")
+        self.assertIsNone(manifest.source_hash("a.md", 10, 21))
+        self.assertIsNone(manifest.source_hash("a.md", 11, 20))
+        self.assertIsNone(manifest.source_hash("b.md", 10, 20))
+
+    def test_remove_stale_deletes_unseen_outputs(self):
+        manifest = Manifest(self.manifest_path)
+        manifest.record("a.md", "s", "t", "/", self.output, self.output_hash)
+        manifest.save()
+        reloaded = Manifest.load(self.manifest_path)
+        out = StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(reloaded.remove_stale(), [self.output])
+        self.assertIn(f"Removed stale page '{self.output}'", out.getvalue())
+        self.assertFalse(os.path.exists(self.output))
+        self.assertEqual(reloaded.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from code_func import markdown_to_html_node, parse_inline, text_to_textnodes
+from links import LinkRewriter
+from memo import InlineCache, InlineRun, inline_cache
+
+
+class TestInlineCache(unittest.TestCase):
+    def test_caches_fragments_seen_twice(self):
+        cache = InlineCache(max_entries=4)
+        first = cache.parse("a **b**", text_to_textnodes)
+        self.assertIsInstance(first, list)
+        second = cache.parse("a **b**", text_to_textnodes)
+        self.assertIsInstance(second, InlineRun)
+        self.assertEqual(list(second), first)
+        self.assertIs(cache.parse("a **b**", text_to_textnodes), second)
+        self.assertEqual((cache.parse_hits, cache.parse_misses), (1, 2))
+
+    def test_evicts_least_recently_used(self):
+        cache = InlineCache(max_entries=2)
+        for text in ("a", "b", "a", "b", "c", "c", "a"):
+            cache.parse(text, text_to_textnodes)
+        self.assertEqual(list(cache.entries), ["c", "a"])
+
+    def test_disabled_and_long_fragments_are_not_cached(self):
+        cache = InlineCache(max_entries=0)
+        cache.parse("a", text_to_textnodes)
+        cache.parse("a", text_to_textnodes)
+        self.assertEqual(len(cache.entries), 0)
+        cache = InlineCache()
+        long_text = "x" * 5000
+        cache.parse(long_text, text_to_textnodes)
+        self.assertIsInstance(cache.parse(long_text, text_to_textnodes), list)
+
+    def test_render_is_memoized_per_run(self):
+        cache = InlineCache()
+        run = InlineRun(text_to_textnodes("a & **b**"))
+        calls = []
+
+        def render(node):
+            calls.append(node)
+            return node.text
+
+        self.assertEqual(cache.render(run, render), "a & b")
+        self.assertEqual(cache.render(run, render), "a & b")
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((cache.render_hits, cache.render_misses), (1, 1))
+
+    def test_stats_round_trip(self):
+        cache = InlineCache()
+        cache.parse("a", text_to_textnodes)
+        stats = cache.take_stats()
+        self.assertEqual(stats, (0, 1, 0, 0))
+        self.assertEqual(cache.take_stats(), (0, 0, 0, 0))
+        cache.add_stats(stats)
+        cache.add_stats(stats)
+        self.assertEqual(cache.parse_misses, 2)
+
+
+class TestSharedRuns(unittest.TestCase):
+    def test_cached_output_matches_uncached(self):
+        markdown = "# T\n\n- [Home](/) & **more**\n- [Home](/) & **more**\n\nfooter _text_\n\nfooter _text_"
+        size = inline_cache.max_entries
+        self.addCleanup(inline_cache.resize, size)
+        inline_cache.resize(0)
+        expected = markdown_to_html_node(markdown).to_html()
+        inline_cache.resize(size)
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), expected)
+
+    def test_rewriting_does_not_touch_shared_runs(self):
+        text = "see [docs](/docs) now"
+        parse_inline(text)
+        run = parse_inline(text)
+        self.assertIsInstance(run, InlineRun)
+        node = markdown_to_html_node(text)
+        LinkRewriter.for_basepath("/site/").rewrite(node)
+        self.assertEqual(node.to_html(), '<div><p>see <a href="/site/docs">docs</a> now</p></div>')
+        self.assertEqual(run[1].url, "/docs")
+        self.assertEqual(markdown_to_html_node(text).to_html(), '<div><p>see <a href="/docs">docs</a> now</p></div>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from inventory import Inventory
+from links import LinkRewriter
+from listing import build_listing, listing_entries, page_url
+from metadata import MetadataIndex, read_front_matter, read_header, split_front_matter
+from template import Template
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_split_front_matter(self):
+        markdown = '---\ntitle: "Hello: world"\nDate: 2024-01-02\n# a comment\n---\n# Heading\n\nBody\n'
+        metadata, body = split_front_matter(markdown)
+        self.assertEqual(metadata, {"title": "Hello: world", "date": "2024-01-02"})
+        self.assertEqual(body, "# Heading\n\nBody\n")
+
+    def test_no_front_matter(self):
+        for markdown in ["# Title\n\nBody", "---\n\nA page after a rule", "---x\n---\n"]:
+            self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_read_front_matter_leaves_file_at_body(self):
+        f = io.StringIO("---\ntitle: Post\n---\n# Heading\n")
+        self.assertEqual(read_front_matter(f), {"title": "Post"})
+        self.assertEqual(f.read(), "# Heading\n")
+
+        f = io.StringIO("# Heading\n")
+        self.assertEqual(read_front_matter(f), {})
+        self.assertEqual(f.read(), "# Heading\n")
+
+    def test_read_header_falls_back_to_heading(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            with open(path, 'w') as f:
+                f.write("---\ndate: 2024-05-01\n---\nIntro\n\n# The Title\n\nBody\n")
+            self.assertEqual(read_header(path), {"date": "2024-05-01", "title": "The Title"})
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.blog = os.path.join(self.content, "blog")
+        os.makedirs(self.blog)
+        self.index_path = os.path.join(self.tmp.name, "metadata.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, relative_path, text):
+        path = os.path.join(self.content, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def pages(self, *paths):
+        inventory = Inventory.scan(content_dir=self.content)
+        return [inventory.get(path) for path in paths]
+
+    def post(self, name, title, date):
+        return self.write(os.path.join("blog", name, "index.md"), f"---\ndate: {date}\n---\n# {title}\n\nText\n")
+
+    def test_update_rereads_only_changed_headers(self):
+        first = self.post("a", "First", "2024-01-01")
+        second = self.post("b", "Second", "2024-02-01")
+        with redirect_stdout(io.StringIO()):
+            index = MetadataIndex(self.index_path)
+            self.assertEqual(index.update(self.pages(first, second)), 2)
+            index.save()
+
+            index = MetadataIndex.load(self.index_path)
+            self.assertEqual(index.update(self.pages(first, second)), 0)
+            self.assertEqual(index.get(second)["title"], "Second")
+
+            self.write(os.path.join("blog", "b", "index.md"), "# Renamed post\n")
+            self.assertEqual(index.update(self.pages(first, second)), 1)
+            self.assertEqual(index.get(second), {"title": "Renamed post"})
+
+            self.assertEqual(index.update(self.pages(first)), 0)
+            self.assertEqual(index.get(second), {})
+
+    def test_page_url(self):
+        self.assertEqual(page_url(self.content, os.path.join(self.content, "index.md")), "/")
+        self.assertEqual(page_url(self.content, os.path.join(self.blog, "tom", "index.md")), "/blog/tom")
+        self.assertEqual(page_url(self.content, os.path.join(self.blog, "post.md")), "/blog/post.html")
+
+    def test_listing_entries_newest_first(self):
+        paths = [
+            self.post("old", "Old", "2023-01-01"),
+            self.post("new", "New", "2024-01-01"),
+            self.post("also-new", "Also new", "2024-01-01"),
+            self.write(os.path.join("blog", "loose.md"), "# Loose\n"),
+            self.write(os.path.join("blog", "a", "b", "index.md"), "# Too deep\n"),
+            self.write("other.md", "# Not a post\n"),
+        ]
+        index = MetadataIndex(self.index_path)
+        with redirect_stdout(io.StringIO()):
+            index.update(self.pages(*paths))
+        entries = listing_entries(index, self.content, self.blog)
+        self.assertEqual([entry["title"] for entry in entries], ["Also new", "New", "Old", "Loose"])
+        self.assertEqual(entries[1]["url"], "/blog/new")
+        self.assertEqual(entries[3]["url"], "/blog/loose.html")
+
+    def test_build_listing_paginates(self):
+        paths = [self.post(f"post{i}", f"Post {i}", f"2024-01-{i + 1:02}") for i in range(5)]
+        index = MetadataIndex(self.index_path)
+        dest = os.path.join(self.tmp.name, "docs", "blog")
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        with redirect_stdout(io.StringIO()):
+            index.update(self.pages(*paths))
+            outputs = build_listing(index, self.content, self.blog, dest, template,
+                                    LinkRewriter.for_basepath("/site/"), page_size=2)
+        self.assertEqual(outputs, [
+            os.path.join(dest, "index.html"),
+            os.path.join(dest, "page", "2", "index.html"),
+            os.path.join(dest, "page", "3", "index.html"),
+        ])
+        with open(outputs[0]) as f:
+            first = f.read()
+        self.assertIn("<title>Blog</title>", first)
+        self.assertIn('<a href="/site/blog/post4">Post 4</a>', first)
+        self.assertNotIn("Post 2", first)
+        self.assertIn('href="/site/blog/page/2/" rel="next"', first)
+        with open(outputs[2]) as f:
+            last = f.read()
+        self.assertIn("Post 0", last)
+        self.assertIn('href="/site/blog/page/2/" rel="prev"', last)
+        self.assertNotIn('rel="next"', last)
+
+
+if __name__ == "__main__":
+    unittest.main()
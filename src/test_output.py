@@ -0,0 +1,62 @@
+import unittest
+import os
+import tempfile
+
+from manifest import hash_bytes
+from output import OutputFile, write_if_changed
+
+
+class TestOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "site", "index.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def test_write_if_changed(self):
+        digest, written = write_if_changed(self.path, "<p>hi</p>")
+        self.assertTrue(written)
+        self.assertEqual(digest, hash_bytes(b"<p>hi</p>"))
+        self.assertEqual(self.read(), "<p>hi</p>")
+
+        os.utime(self.path, (0, 0))
+        self.assertEqual(write_if_changed(self.path, "<p>hi</p>"), (digest, False))
+        self.assertEqual(os.stat(self.path).st_mtime, 0)
+
+        self.assertTrue(write_if_changed(self.path, "<p>bye</p>")[1])
+        self.assertEqual(self.read(), "<p>bye</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_output_file_commit(self):
+        write_if_changed(self.path, "<p>old</p>")
+        with OutputFile(self.path) as out:
+            out.writelines(["<p>", "new", "</p>"])
+            # Nothing is visible until the commit
+            self.assertEqual(self.read(), "<p>old</p>")
+            self.assertTrue(out.commit())
+        self.assertEqual(self.read(), "<p>new</p>")
+        self.assertEqual(out.digest.hexdigest(), hash_bytes(b"<p>new</p>"))
+
+        os.utime(self.path, (0, 0))
+        with OutputFile(self.path) as out:
+            out.write("<p>new</p>")
+            self.assertFalse(out.commit())
+        self.assertEqual(os.stat(self.path).st_mtime, 0)
+
+    def test_output_file_discarded_on_error(self):
+        write_if_changed(self.path, "<p>old</p>")
+        with self.assertRaises(RuntimeError):
+            with OutputFile(self.path) as out:
+                out.write("<p>half")
+                raise RuntimeError("render failed")
+        self.assertEqual(self.read(), "<p>old</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
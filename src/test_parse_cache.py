@@ -0,0 +1,105 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from code_func import markdown_to_html_node
+from htmlnode import HTMLNode, ParentNode
+from main import parse_markdown
+from parse_cache import ParseCache, decode_node, encode_node
+
+MARKDOWN = ("# Title\n\nSome **bold** and [a link](/x) & more\n\n- one\n- `two`\n\n"
+            "![img](/i.png)\n\n```\ncode\n```\n\n> quote")
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(os.path.join(self.tmp.name, "parse-cache"))
+        self.calls = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def parse(self, markdown):
+        self.calls += 1
+        return parse_markdown(markdown)
+
+    def test_encode_round_trip(self):
+        node = markdown_to_html_node(MARKDOWN)
+        self.assertEqual(decode_node(encode_node(node)).to_html(), node.to_html())
+
+    def test_second_parse_is_loaded_from_disk(self):
+        title, node = self.cache.parse(MARKDOWN, self.parse)
+        cached_title, cached_node = self.cache.parse(MARKDOWN, self.parse)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(cached_title, "Title")
+        self.assertEqual(cached_node.to_html(), node.to_html())
+        self.assertIsNot(cached_node, node)
+        self.assertEqual(self.cache.take_stats(), (1, 1))
+
+    def test_changed_markdown_misses(self):
+        self.cache.parse(MARKDOWN, self.parse)
+        self.cache.parse(MARKDOWN + "\n\nmore", self.parse)
+        self.assertEqual(self.calls, 2)
+
+    def test_errors_are_not_cached(self):
+        def parse(markdown):
+            self.calls += 1
+            raise ValueError("broken")
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.cache.parse(MARKDOWN, parse)
+        self.assertEqual(self.calls, 2)
+
+    def test_missing_title_is_cached_as_none(self):
+        # Front matter may supply the title, so a page without a heading still parses
+        self.cache.parse("no title", self.parse)
+        self.assertEqual(self.cache.parse("no title", self.parse)[0], None)
+        self.assertEqual(self.calls, 1)
+
+    def test_corrupt_entry_is_reparsed(self):
+        self.cache.parse(MARKDOWN, self.parse)
+        with open(self.cache.path_for(self.cache.key(MARKDOWN)), "wb") as f:
+            f.write(b"not a pickle")
+        title, _ = self.cache.parse(MARKDOWN, self.parse)
+        self.assertEqual((title, self.calls), ("Title", 2))
+
+    def test_unknown_node_types_are_not_cached(self):
+        def parse(markdown):
+            self.calls += 1
+            return "T", ParentNode("div", [HTMLNode("p", "raw")])
+
+        self.cache.parse(MARKDOWN, parse)
+        self.cache.parse(MARKDOWN, parse)
+        self.assertEqual(self.calls, 2)
+
+    def test_disabled_cache_always_parses(self):
+        cache = ParseCache(None)
+        cache.parse(MARKDOWN, self.parse)
+        cache.parse(MARKDOWN, self.parse)
+        self.assertEqual(self.calls, 2)
+
+    def test_prune_removes_least_recently_used(self):
+        for i in range(4):
+            markdown = f"{MARKDOWN}\n\npage {i}"
+            self.cache.parse(markdown, self.parse)
+            path = self.cache.path_for(self.cache.key(markdown))
+            os.utime(path, (i, i))
+        size = os.path.getsize(path)
+        self.cache.max_bytes = size * 2 + size // 2
+        with redirect_stdout(StringIO()):
+            self.assertEqual(self.cache.prune(), 2)
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists(self.cache.path_for(self.cache.key(f"{MARKDOWN}\n\npage 0"))))
+
+    def test_clear(self):
+        self.cache.parse(MARKDOWN, self.parse)
+        self.cache.clear()
+        self.assertFalse(os.path.exists(self.cache.root))
+
+
+if __name__ == "__main__":
+    unittest.main()
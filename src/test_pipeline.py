@@ -0,0 +1,47 @@
+import threading
+import time
+import unittest
+
+from pipeline import IOPipeline
+
+
+class TestIOPipeline(unittest.TestCase):
+    def test_map_keeps_item_order(self):
+        def slow_square(n):
+            # Later items finish first
+            time.sleep((10 - n) / 1000)
+            return n * n
+        self.assertEqual(IOPipeline(4).map(slow_square, range(10)), [n * n for n in range(10)])
+
+    def test_in_flight_limit(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def work(_):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.002)
+            with lock:
+                state["running"] -= 1
+
+        IOPipeline(3).map(work, range(30))
+        self.assertEqual(state["peak"], 3)
+
+    def test_gather_runs_coroutine_tasks(self):
+        async def task(pipeline, item):
+            data = await pipeline.io(lambda: item)
+            return data + 1
+
+        results = IOPipeline(2).run(lambda pipeline: pipeline.gather(lambda item: task(pipeline, item), [1, 2, 3]))
+        self.assertEqual(results, [2, 3, 4])
+
+    def test_errors_propagate(self):
+        def fail(_):
+            raise OSError("disk gone")
+        with self.assertRaises(OSError):
+            IOPipeline(2).map(fail, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import json
+import os
+import tempfile
+
+import profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        profiler.take_events()
+
+    def tearDown(self):
+        profiler.enable(False)
+        profiler.take_events()
+
+    def test_disabled_phase_records_nothing(self):
+        with profiler.phase("parse", "a.md"):
+            pass
+        self.assertEqual(profiler.events, [])
+
+    def test_enabled_phase_records_event(self):
+        profiler.enable()
+        with profiler.phase("parse", "a.md"):
+            pass
+        [(name, page, start, duration, pid)] = profiler.take_events()
+        self.assertEqual((name, page, pid), ("parse", "a.md", os.getpid()))
+        self.assertGreaterEqual(duration, 0)
+        self.assertEqual(profiler.events, [])
+
+    def test_trace_and_summary(self):
+        recorded = [("page", "a.md", 1.0, 0.002, 1), ("parse", "a.md", 1.0, 0.001, 1),
+                    ("page", "b.md", 1.5, 0.004, 2), ("static", None, 0.5, 0.01, 1)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            profiler.write_trace(path, recorded)
+            with open(path) as f:
+                trace = json.load(f)
+        first = trace["traceEvents"][0]
+        self.assertEqual((first["ph"], first["ts"], first["dur"], first["args"]), ("X", 500000.0, 2000.0, {"page": "a.md"}))
+        summary = profiler.summarize(recorded)
+        self.assertIn("static", summary)
+        self.assertLess(summary.index("b.md"), summary.index("a.md"))
+
+
+if __name__ == "__main__":
+    unittest.main()
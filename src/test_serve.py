@@ -0,0 +1,120 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+import main as site
+from inventory import Inventory
+from metadata import MetadataIndex
+from serve import DevSite, PageCache
+
+
+class TestPageCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = PageCache(max_entries=2)
+        cache.put("a", b"A")
+        cache.put("b", b"B")
+        cache.get("a")
+        cache.put("c", b"C")
+        self.assertEqual(cache.get("a"), b"A")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), b"C")
+        self.assertEqual(len(cache), 2)
+
+    def test_counts_hits_and_misses(self):
+        cache = PageCache()
+        cache.get("a")
+        cache.put("a", b"A")
+        cache.get("a")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+
+class TestDevSite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("content/index.md", "# Home\n\n[About](/about)")
+        self.write("content/about/index.md", "# About\n\nHello")
+        self.write("content/contact.md", "# Contact\n\nMail")
+        self.write("static/index.css", "body {}")
+        self.write("secret.txt", "no")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.site = DevSite(self.path("content"), self.path("static"), self.path("template.html"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, relative_path):
+        return os.path.join(self.root, relative_path)
+
+    def write(self, relative_path, data, bump=0):
+        path = self.path(relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(data)
+        if bump:
+            # Make sure the edit is visible even on filesystems with coarse mtimes
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+    def test_page_source(self):
+        about = self.path("content/about/index.md")
+        self.assertEqual(self.site.page_source("/"), self.path("content/index.md"))
+        for url_path in ("/about", "/about/", "/about/index.html"):
+            self.assertEqual(os.path.normpath(self.site.page_source(url_path)), about)
+        self.assertEqual(os.path.normpath(self.site.page_source("/contact.html")), self.path("content/contact.md"))
+        self.assertIsNone(self.site.page_source("/missing"))
+        self.assertIsNone(self.site.page_source("/../content/about"))
+
+    def test_static_file_stays_inside_static_dir(self):
+        self.assertEqual(os.path.normpath(self.site.static_file("/index.css")), self.path("static/index.css"))
+        self.assertIsNone(self.site.static_file("/../secret.txt"))
+        self.assertIsNone(self.site.static_file("/"))
+
+    def test_render_is_cached_until_source_changes(self):
+        src_path = self.site.page_source("/about")
+        self.assertIn(b"<title>About</title>", self.site.render(src_path))
+        self.site.render(src_path)
+        self.assertEqual((self.site.cache.hits, self.site.cache.misses), (1, 1))
+
+        self.write("content/about/index.md", "# About\n\nChanged", bump=1)
+        self.assertIn(b"Changed", self.site.render(src_path))
+        self.assertEqual(self.site.cache.misses, 2)
+
+    def test_template_change_rerenders(self):
+        src_path = self.site.page_source("/")
+        self.site.render(src_path)
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}", bump=1)
+        self.assertIn(b"<h1>Home</h1>", self.site.render(src_path))
+
+    def test_listing_pages_match_a_build(self):
+        for i in range(12):
+            self.write(f"content/blog/post{i:02}/index.md", f"---\ndate: 2024-01-{i + 1:02}\n---\n# Post {i}\n")
+        self.assertEqual(self.site.listing_page("/blog/"), (self.path("content/blog"), 1))
+        self.assertEqual(self.site.listing_page("/blog"), (self.path("content/blog"), 1))
+        self.assertEqual(self.site.listing_page("/blog/page/2/"), (self.path("content/blog"), 2))
+        self.assertIsNone(self.site.listing_page("/about/page/2/"))
+
+        index = MetadataIndex()
+        index.update(Inventory.scan(content_dir=self.path("content")).pages())
+        dest = self.path("docs")
+        with redirect_stdout(StringIO()):
+            site.generate_listings(index, self.path("template.html"), "/", None, content_root=self.path("content"),
+                                   dest_root=dest)
+        for page, built in [(1, "docs/blog/index.html"), (2, "docs/blog/page/2/index.html")]:
+            with open(self.path(built), "rb") as f:
+                self.assertEqual(self.site.render_listing(self.path("content/blog"), page), f.read())
+        self.assertIsNone(self.site.render_listing(self.path("content/blog"), 3))
+
+        # New posts show up on the next request
+        self.write("content/blog/zzz/index.md", "---\ndate: 2025-01-01\n---\n# Newest\n", bump=1)
+        self.assertIn(b"Newest", self.site.render_listing(self.path("content/blog"), 1))
+
+    def test_own_index_replaces_the_listing(self):
+        self.write("content/blog/index.md", "# Blog\n\nHand-written")
+        self.assertIsNone(self.site.listing_page("/blog/"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import argparse
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+import main as site
+from inventory import PAGE, SourceFile
+from merge import find_shards, merge_shards
+from shard import parse_shard, partition, shard_dir
+
+
+def page(relative_path, size):
+    return SourceFile(PAGE, os.path.join("content", relative_path), relative_path, size, 0)
+
+
+class TestPartition(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ["0/4", "5/4", "1/0", "x/4", "1"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_every_page_lands_in_exactly_one_shard(self):
+        pages = [page(f"p{i}.md", (i * 37) % 101) for i in range(50)]
+        shards = partition(pages, 4)
+        self.assertEqual(sorted(f.relative_path for shard in shards for f in shard),
+                         sorted(f.relative_path for f in pages))
+
+    def test_balanced_by_size(self):
+        pages = [page("big.md", 1000)] + [page(f"p{i}.md", 100) for i in range(20)]
+        loads = [sum(f.size for f in shard) for shard in partition(pages, 3)]
+        self.assertEqual(sorted(loads), [1000, 1000, 1000])
+
+    def test_independent_of_listing_order(self):
+        pages = [page(f"p{i}.md", 10) for i in range(30)]
+        self.assertEqual(partition(pages, 3), partition(list(reversed(pages)), 3))
+
+
+class TestShardedBuild(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.write("template.html", '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        self.write("static/index.css", "body {}")
+        self.write("content/index.md", "# Home\n\n[Post](/blog/post0)")
+        for i in range(6):
+            self.write(f"content/blog/post{i}/index.md", f"---\ndate: 2024-01-0{i + 1}\n---\n# Post {i}\n\n"
+                       + "text " * (i * 50))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def write(self, relative_path, data):
+        os.makedirs(os.path.dirname(relative_path) or '.', exist_ok=True)
+        with open(relative_path, "w") as f:
+            f.write(data)
+
+    def build(self, *args):
+        with redirect_stdout(StringIO()):
+            site.main(["/site/", "--fingerprint-assets", "--parse-cache-size", "0", *args])
+
+    def read_tree(self, root):
+        tree = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, "rb") as f:
+                    tree[os.path.relpath(path, root)] = f.read()
+        return tree
+
+    def test_merged_shards_match_a_single_build(self):
+        self.build()
+        single = self.read_tree("docs")
+        shutil.rmtree("docs")
+        for i in range(1, 4):
+            self.build("--shard", f"{i}/3")
+        self.assertEqual(len(find_shards(3)), 3)
+        with redirect_stdout(StringIO()):
+            _, broken = merge_shards(find_shards(3))
+        self.assertEqual(broken, [])
+        self.assertEqual(self.read_tree("docs"), single)
+        self.assertIn("blog/index.html", single)
+        self.assertEqual(len(site.Manifest.load().pages), 7)
+
+    def test_merge_rejects_incomplete_and_colliding_shards(self):
+        for i in range(1, 3):
+            self.build("--shard", f"{i}/2")
+        with self.assertRaisesRegex(ValueError, "missing \\[2\\]"):
+            merge_shards(find_shards(2)[:1])
+
+        # The same output in both shards
+        for i in range(1, 3):
+            self.write(os.path.join(shard_dir(i, 2), "site", "extra.html"), "<p>extra</p>")
+        with self.assertRaisesRegex(ValueError, "output extra.html is in shards 1 and 2"):
+            merge_shards(find_shards(2))
+        self.assertFalse(os.path.exists("docs/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
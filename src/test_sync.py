@@ -0,0 +1,133 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from manifest import hash_bytes
+from sync import asset_urls, fast_copy, fingerprint_files, fingerprinted_name, link_or_copy, needs_copy, sync_files
+
+
+class TestSyncFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        self.write(self.src, "index.css", "body {}")
+        self.write(self.src, "images/a.png", "png-bytes")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, root, relative_path, data):
+        path = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(data)
+        return path
+
+    def sync(self, *args, **kwargs):
+        with redirect_stdout(StringIO()):
+            return sync_files(self.src, self.dest, *args, **kwargs)
+
+    def test_fast_copy_preserves_content_and_mtime(self):
+        src = self.write(self.src, "big.bin", "x" * 100000)
+        dest = os.path.join(self.tmp.name, "big.bin")
+        os.utime(src, (1000, 2000))
+        fast_copy(src, dest)
+        with open(dest) as f:
+            self.assertEqual(f.read(), "x" * 100000)
+        self.assertEqual(os.stat(dest).st_mtime, 2000)
+
+    def test_fast_copy_replaces_a_hardlinked_dest(self):
+        # Copying over a link to the source must not truncate the source
+        src = self.write(self.src, "linked.css", "body {}")
+        dest = os.path.join(self.tmp.name, "linked.css")
+        os.link(src, dest)
+        self.write(self.src, "linked.css", "body { color: red }")
+        fast_copy(src, dest)
+        with open(src) as f:
+            self.assertEqual(f.read(), "body { color: red }")
+        self.assertFalse(os.path.samefile(src, dest))
+        self.assertEqual([name for name in os.listdir(self.tmp.name) if name.endswith(".tmp")], [])
+
+    def test_sync_copies_everything_once(self):
+        files = self.sync()
+        self.assertEqual(files, ["images/a.png", "index.css"])
+        css = os.path.join(self.dest, "index.css")
+        self.assertFalse(needs_copy(os.path.join(self.src, "index.css"), css))
+        # A second sync must not touch unchanged files
+        os.chmod(css, 0o444)
+        inode = os.stat(css).st_ino
+        self.sync(files)
+        self.assertEqual(os.stat(css).st_ino, inode)
+
+    def test_sync_copies_changed_and_removes_stale(self):
+        files = self.sync()
+        self.write(self.src, "index.css", "body { color: red }")
+        os.remove(os.path.join(self.src, "images", "a.png"))
+        self.sync(files)
+        with open(os.path.join(self.dest, "index.css")) as f:
+            self.assertEqual(f.read(), "body { color: red }")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images", "a.png")))
+        # The directory it lived in is gone too, but not the output directory
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.isdir(self.dest))
+
+    def test_stale_removal_keeps_directories_in_use(self):
+        self.write(self.src, "images/icons/x.svg", "<svg/>")
+        files = self.sync()
+        os.remove(os.path.join(self.src, "images", "icons", "x.svg"))
+        self.sync(files)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images", "icons")))
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "images", "a.png")))
+
+    def test_hash_check_skips_touched_files(self):
+        self.sync()
+        src = os.path.join(self.src, "index.css")
+        dest = os.path.join(self.dest, "index.css")
+        os.utime(src, (5000, 5000))
+        self.assertFalse(needs_copy(src, dest, use_hash=True))
+        self.assertEqual(os.stat(dest).st_mtime, 5000)
+
+    def test_link_mode_hardlinks(self):
+        self.sync(link=True)
+        src = os.path.join(self.src, "index.css")
+        dest = os.path.join(self.dest, "index.css")
+        self.assertTrue(os.path.samefile(src, dest))
+        link_or_copy(src, dest)
+        self.assertTrue(os.path.samefile(src, dest))
+        self.assertEqual([name for name in os.listdir(self.dest) if name.endswith(".tmp")], [])
+
+    def test_fingerprinted_name(self):
+        self.assertEqual(fingerprinted_name("images/tom.png", "3f9a1c0b2e77"), "images/tom.3f9a1c0b2e.png")
+
+    def test_fingerprinted_sync_replaces_old_versions(self):
+        names, hashes = fingerprint_files(self.src)
+        css = fingerprinted_name("index.css", hash_bytes(b"body {}"))
+        self.assertEqual(names["index.css"], css)
+        self.assertEqual(asset_urls(names)["/index.css"], "/" + css)
+        files = self.sync(names=names)
+        self.assertEqual(files, sorted([names["images/a.png"], css]))
+
+        self.write(self.src, "index.css", "body { color: red }")
+        names, _ = fingerprint_files(self.src, hashes)
+        self.sync(files, names=names)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, css)))
+        with open(os.path.join(self.dest, names["index.css"])) as f:
+            self.assertEqual(f.read(), "body { color: red }")
+
+    def test_fingerprint_reuses_hashes_of_unchanged_files(self):
+        _, hashes = fingerprint_files(self.src)
+        # A stale hash is trusted while size and mtime match...
+        hashes["index.css"] = dict(hashes["index.css"], hash="0" * 64)
+        names, _ = fingerprint_files(self.src, hashes)
+        self.assertEqual(names["index.css"], fingerprinted_name("index.css", "0" * 64))
+        # ...and recomputed once the file changes
+        os.utime(os.path.join(self.src, "index.css"), (5000, 5000))
+        names, _ = fingerprint_files(self.src, hashes)
+        self.assertEqual(names["index.css"], fingerprinted_name("index.css", hash_bytes(b"body {}")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from io import StringIO
+
+from links import LinkRewriter
+from template import Template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compiles_chunks_and_slots(self):
+        template = Template("<title>{{ Title }}</title><body>{{Content}}</body>")
+        self.assertEqual(template.chunks, ["<title>", "</title><body>", "</body>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    def test_render_fills_slots(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(template.render({"Title": "Hi", "Content": "<p>x</p>"}), "<title>Hi</title><p>x</p>")
+
+    def test_render_leaves_unknown_placeholders(self):
+        template = Template("{{ Title }} by {{ Author }}")
+        self.assertEqual(template.render({"Title": "Hi"}), "Hi by {{ Author }}")
+        self.assertEqual(template.render({"Title": "Hi", "Author": "Tolkien"}), "Hi by Tolkien")
+
+    def test_values_are_not_rescanned(self):
+        template = Template("{{ Title }}|{{ Content }}")
+        self.assertEqual(template.render({"Title": "{{ Content }}", "Content": "c"}), "{{ Content }}|c")
+
+    def test_template_without_placeholders(self):
+        template = Template("<p>static</p>")
+        self.assertEqual(template.render({"Title": "x"}), "<p>static</p>")
+
+    def test_write_matches_render(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}")
+        values = {"Title": "Hi", "Content": "body"}
+        out = StringIO()
+        template.write(out, values)
+        self.assertEqual(out.getvalue(), template.render(values))
+
+    def test_with_links_rewrites_once(self):
+        template = Template('<link href="/index.css" />{{ Content }}')
+        rewriter = LinkRewriter.for_basepath("/site/")
+        rewritten = template.with_links(rewriter)
+        self.assertEqual(rewritten.render({"Content": ""}), '<link href="/site/index.css" />')
+        self.assertIs(rewritten.with_links(rewriter), rewritten)
+
+
+if __name__ == "__main__":
+    unittest.main()
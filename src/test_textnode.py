@@ -42,6 +42,10 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node2", TextType.BOLD, "https://www.boot.dev")
         self.assertNotEqual(node, node2)
 
+    def test_has_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,157 @@
+import unittest
+import gzip
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+
+from watch import Watcher
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("content/index.md", "# Home\n\n[About](/about)")
+        self.write("content/about/index.md", "# About\n\nHello")
+        self.write("static/index.css", "body {}")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.watcher = Watcher("/", self.path("content"), self.path("static"), self.path("template.html"),
+                               self.path("docs"), self.path(".build/manifest.json"))
+        with redirect_stdout(StringIO()):
+            self.watcher.build()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, relative_path):
+        return os.path.join(self.root, relative_path)
+
+    def write(self, relative_path, data):
+        path = self.path(relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(data)
+        # Make sure the edit is visible even on filesystems with coarse mtimes
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def read(self, relative_path):
+        with open(self.path(relative_path)) as f:
+            return f.read()
+
+    def poll(self):
+        with redirect_stdout(StringIO()):
+            return self.watcher.poll()
+
+    def test_initial_build(self):
+        self.assertIn("<title>About</title>", self.read("docs/about/index.html"))
+        self.assertEqual(self.read("docs/index.css"), "body {}")
+
+    def test_no_changes_does_nothing(self):
+        self.assertEqual(self.poll(), [])
+
+    def test_markdown_edit_renders_one_page(self):
+        self.write("content/about/index.md", "# About\n\nChanged")
+        self.assertEqual(self.poll(), [("rendered", self.path("content/about/index.md"))])
+        self.assertIn("Changed", self.read("docs/about/index.html"))
+
+    def test_template_edit_renders_every_page(self):
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        actions = self.poll()
+        self.assertEqual(sorted(actions), [("rendered", self.path("content/about/index.md")),
+                                           ("rendered", self.path("content/index.md"))])
+        self.assertTrue(self.read("docs/index.html").startswith("<h1>Home</h1>"))
+
+    def test_static_edit_copies_one_file(self):
+        self.write("static/index.css", "body { color: red }")
+        self.assertEqual(self.poll(), [("copied", self.path("static/index.css"))])
+        self.assertEqual(self.read("docs/index.css"), "body { color: red }")
+
+    def asset_output(self):
+        names = self.watcher.names
+        return os.path.join("docs", names["index.css"] if names else "index.css")
+
+    def test_static_edit_leaves_hardlinked_source_alone(self):
+        # After a main.py --link-assets build the output and the source are one file
+        os.remove(self.path(self.asset_output()))
+        os.link(self.path("static/index.css"), self.path(self.asset_output()))
+        with open(self.path("static/index.css"), "a") as f:
+            f.write(" p {}")
+        stat = os.stat(self.path("static/index.css"))
+        os.utime(self.path("static/index.css"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.poll()
+        self.assertEqual(self.read("static/index.css"), "body {} p {}")
+        self.assertEqual(self.read(self.asset_output()), "body {} p {}")
+
+    def test_added_and_removed_pages(self):
+        self.write("content/new/index.md", "# New")
+        os.remove(self.path("content/about/index.md"))
+        actions = self.poll()
+        self.assertIn(("rendered", self.path("content/new/index.md")), actions)
+        self.assertIn(("removed", self.path("content/about/index.md")), actions)
+        self.assertTrue(os.path.exists(self.path("docs/new/index.html")))
+        self.assertFalse(os.path.exists(self.path("docs/about/index.html")))
+
+    def test_new_post_updates_blog_listing(self):
+        self.write("content/blog/first/index.md", "---\ndate: 2024-01-01\n---\n# First post\n")
+        self.poll()
+        self.assertIn('<a href="/blog/first">First post</a>', self.read("docs/blog/index.html"))
+        self.write("content/blog/first/index.md", "---\ndate: 2024-01-01\n---\n# Renamed post\n")
+        self.poll()
+        self.assertIn("Renamed post", self.read("docs/blog/index.html"))
+
+
+
+class TestWatcherBuildOptions(TestWatcher):
+    # The same scenarios with fingerprinting and gzip on, whose state must
+    # carry through rebuilds as well as the first build
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write("content/index.md", "# Home\n\n[About](/about)")
+        self.write("content/about/index.md", "# About\n\n" + "Hello " * 300)
+        self.write("static/index.css", "body {}")
+        self.write("template.html", '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+        self.watcher = Watcher("/", self.path("content"), self.path("static"), self.path("template.html"),
+                               self.path("docs"), self.path(".build/manifest.json"), fingerprint=True, gzip=True)
+        with redirect_stdout(StringIO()):
+            self.watcher.build()
+
+    def asset_name(self):
+        return self.watcher.names["index.css"]
+
+    def read_gzip(self, relative_path):
+        with gzip.open(self.path(relative_path + ".gz"), "rt") as f:
+            return f.read()
+
+    def test_initial_build(self):
+        self.assertNotEqual(self.asset_name(), "index.css")
+        self.assertEqual(self.read(os.path.join("docs", self.asset_name())), "body {}")
+        self.assertIn(f'href="/{self.asset_name()}"', self.read("docs/about/index.html"))
+        self.assertEqual(self.read_gzip("docs/about/index.html"), self.read("docs/about/index.html"))
+
+    def test_static_edit_copies_one_file(self):
+        old_name = self.asset_name()
+        self.write("static/index.css", "body { color: red }")
+        actions = self.poll()
+        self.assertIn(("copied", self.path("static/index.css")), actions)
+        # Every page points at the new name, and the old copy is gone
+        self.assertIn(("rendered", self.path("content/about/index.md")), actions)
+        self.assertNotEqual(self.asset_name(), old_name)
+        self.assertFalse(os.path.exists(self.path(os.path.join("docs", old_name))))
+        self.assertEqual(self.read(os.path.join("docs", self.asset_name())), "body { color: red }")
+        self.assertIn(f'href="/{self.asset_name()}"', self.read("docs/about/index.html"))
+        self.assertEqual(self.read_gzip("docs/about/index.html"), self.read("docs/about/index.html"))
+
+    def test_markdown_edit_refreshes_sidecar(self):
+        self.write("content/about/index.md", "# About\n\n" + "Changed " * 300)
+        self.poll()
+        self.assertIn("Changed", self.read_gzip("docs/about/index.html"))
+        os.remove(self.path("content/about/index.md"))
+        self.poll()
+        self.assertFalse(os.path.exists(self.path("docs/about/index.html.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
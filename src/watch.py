@@ -0,0 +1,262 @@
+import argparse
+import os
+import time
+
+import main as site
+from block_cache import BlockCache
+from compress import MIN_SIZE, compress_outputs
+from console import set_quiet
+from inventory import Inventory
+from links import ExternalLinkRule, LinkRewriter, UrlMapRule
+from manifest import Manifest, hash_file, manifest_path
+from metadata import MetadataIndex
+from sync import asset_urls, fingerprint_files, sync_files
+
+
+class DependencyGraph:
+    # Which outputs each input feeds: a markdown source feeds its own page,
+    # the template feeds every page and a static file feeds its copy
+    def __init__(self, content_dir, static_dir, template_path, output_dir):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.output_dir = output_dir
+
+    def page_for(self, src_path):
+        relative_path = os.path.relpath(src_path, self.content_dir)
+        return os.path.join(self.output_dir, os.path.splitext(relative_path)[0] + '.html')
+
+    def asset_for(self, src_path):
+        return os.path.join(self.output_dir, os.path.relpath(src_path, self.static_dir))
+
+    def is_page(self, path):
+        return path.endswith('.md') and path.startswith(os.path.join(self.content_dir, ''))
+
+    def is_asset(self, path):
+        return path.startswith(os.path.join(self.static_dir, ''))
+
+    def pages(self, snapshot):
+        return sorted(path for path in snapshot if self.is_page(path))
+
+
+class Watcher:
+    # fingerprint, gzip, gzip_min_size and external_links match main.py's
+    # --fingerprint-assets, --gzip, --gzip-min-size and --external-links, and
+    # apply to every rebuild as well as to the first build
+    def __init__(self, basepath='/', content_dir=site.content_dir, static_dir=site.static,
+                 template_path=site.template, output_dir=site.output_dir, manifest_file=manifest_path,
+                 fingerprint=False, gzip=False, gzip_min_size=MIN_SIZE, external_links=False):
+        self.basepath = basepath
+        self.fingerprint = fingerprint
+        self.gzip = gzip
+        self.gzip_min_size = gzip_min_size
+        self.external_links = external_links
+        # Source relative path -> fingerprinted name, while fingerprinting
+        self.names = None
+        self.graph = DependencyGraph(content_dir, static_dir, template_path, output_dir)
+        self.manifest = Manifest.load(manifest_file)
+        self.index = MetadataIndex.load(os.path.join(os.path.dirname(manifest_file), 'metadata.json'))
+        self.snapshot = {}
+        self.inventory = Inventory()
+        # Edits re-render only the blocks they touched
+        self.block_cache = BlockCache()
+
+    def scan(self):
+        # Rescan both trees; the inventory is kept for the phases that need
+        # file sizes and mtimes, so they don't stat the files again
+        self.inventory = Inventory.scan(self.graph.content_dir, self.graph.static_dir)
+        snapshot = self.inventory.snapshot()
+        try:
+            stat = os.stat(self.graph.template_path)
+            snapshot[self.graph.template_path] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def build(self):
+        # Bring the output up to date once; later changes go through poll()
+        graph = self.graph
+        self.snapshot = self.scan()
+        os.makedirs(graph.output_dir, exist_ok=True)
+        self.sync_assets()
+        self.prepare()
+        errors = site.generate_pages_recursive(graph.content_dir, self.template, graph.output_dir, self.basepath,
+                                               self.manifest, rewriter=self.rewriter, inventory=self.inventory)
+        self.manifest.remove_stale()
+        self.update_listings()
+        # Runs even without gzip so sidecars left by an earlier build are removed
+        outputs = [entry["output"] for entry in self.manifest.pages.values()] + self.manifest.listings
+        outputs.extend(os.path.join(graph.output_dir, relative_path) for relative_path in self.manifest.assets)
+        self.manifest.compressed = compress_outputs(outputs if self.gzip else [], self.manifest.compressed,
+                                                    min_size=self.gzip_min_size)
+        self.manifest.save()
+        self.report(errors)
+        return errors
+
+    def sync_assets(self):
+        # Copy every static file that changed, under its content-hashed name
+        # when fingerprinting, and remove the copies of ones that are gone
+        graph = self.graph
+        assets = self.inventory.assets()
+        if self.fingerprint:
+            self.names, self.manifest.asset_hashes = fingerprint_files(graph.static_dir,
+                                                                       self.manifest.asset_hashes, assets)
+        else:
+            self.names, self.manifest.asset_hashes = None, {}
+        self.manifest.assets = sync_files(graph.static_dir, graph.output_dir, self.manifest.assets,
+                                          names=self.names, files=assets)
+
+    def prepare(self):
+        # Pages and the template point at assets by their original names
+        rules = [UrlMapRule(asset_urls(self.names))] if self.names else []
+        if self.external_links:
+            rules.append(ExternalLinkRule())
+        self.template, self.rewriter, self.template_hash = site.prepare_template(
+            self.graph.template_path, self.basepath, LinkRewriter.for_basepath(self.basepath, rules))
+
+    def compress(self, paths):
+        # Refresh the .gz sidecars of the outputs in paths, which may include
+        # outputs that were just removed; other sidecars are left alone
+        if not self.gzip:
+            return
+        paths = {os.path.normpath(path) for path in paths}
+        compressed = {path: source_hash for path, source_hash in self.manifest.compressed.items()
+                      if path not in paths}
+        previous = {path: source_hash for path, source_hash in self.manifest.compressed.items() if path in paths}
+        compressed.update(compress_outputs(paths, previous, min_size=self.gzip_min_size))
+        self.manifest.compressed = compressed
+
+    def update_listings(self):
+        # Titles, dates and summaries come from the metadata index, which only
+        # re-reads the headers of pages that changed
+        graph = self.graph
+        self.index.update(self.inventory.pages())
+        self.index.save()
+        self.manifest.listings = site.generate_listings(self.index, self.template, self.basepath, self.rewriter,
+                                                        self.manifest.listings, graph.content_dir,
+                                                        graph.output_dir)
+
+    def render(self, src_path):
+        # The page's SourceFile from this poll's scan
+        source = self.inventory.get(src_path)
+        dest_path = self.graph.page_for(src_path)
+        source_hash = hash_file(src_path)
+        output_hash, error, links, _, _ = site.render_page(
+            (source, self.template, dest_path, self.basepath, self.rewriter), self.block_cache)
+        if error is not None:
+            return error
+        self.manifest.record(src_path, source_hash, self.template_hash, self.basepath, dest_path, output_hash,
+                             links, (source.size, source.mtime_ns))
+        return None
+
+    def poll(self):
+        # Rescan the inputs and rebuild only what depends on the changes.
+        # Returns a list of (action, path) pairs describing what was done.
+        graph = self.graph
+        snapshot = self.scan()
+        changed = {path for path, stat in snapshot.items() if self.snapshot.get(path) != stat}
+        removed = set(self.snapshot) - set(snapshot)
+        self.snapshot = snapshot
+        if not changed and not removed:
+            return []
+
+        actions = []
+        errors = []
+        # Outputs written or removed, whose sidecars need refreshing
+        touched = set()
+        # Every page embeds the template
+        render_all = graph.template_path in changed
+        changed_assets = sorted(path for path in changed if graph.is_asset(path))
+        removed_assets = sorted(path for path in removed if graph.is_asset(path))
+        if changed_assets or removed_assets:
+            # sync_files only copies what needs_copy says differs, so an output
+            # hardlinked to its source (main.py --link-assets) is left alone.
+            # Assets are synced before any page is rendered: with fingerprinting
+            # a changed asset gets a new name, and the pages pointing at it
+            # change too.
+            previous = set(self.manifest.assets)
+            self.sync_assets()
+            for src_path in changed_assets:
+                relative_path = os.path.relpath(src_path, graph.static_dir)
+                touched.add(os.path.join(graph.output_dir, self.names[relative_path]) if self.names
+                            else graph.asset_for(src_path))
+                actions.append(("copied", src_path))
+            actions.extend(("removed", src_path) for src_path in removed_assets)
+            touched.update(os.path.join(graph.output_dir, relative_path)
+                           for relative_path in previous - set(self.manifest.assets))
+            if self.fingerprint:
+                rewriter_key = self.rewriter.key
+                self.prepare()
+                render_all = render_all or self.rewriter.key != rewriter_key
+        if render_all and graph.template_path in changed:
+            self.prepare()
+
+        if render_all:
+            to_render = graph.pages(snapshot)
+        else:
+            to_render = sorted(path for path in changed if graph.is_page(path))
+        for src_path in to_render:
+            error = self.render(src_path)
+            if error is None:
+                touched.add(graph.page_for(src_path))
+                actions.append(("rendered", src_path))
+            else:
+                errors.append((src_path, error))
+
+        for src_path in sorted(path for path in removed if graph.is_page(path)):
+            self.block_cache.forget(src_path)
+            if src_path in self.manifest.pages:
+                touched.add(self.manifest.remove(src_path))
+            actions.append(("removed", src_path))
+
+        if any(graph.is_page(path) for path in changed | removed) or render_all:
+            touched.update(self.manifest.listings)
+            self.update_listings()
+            touched.update(self.manifest.listings)
+        self.compress(touched)
+        self.manifest.save()
+        self.report(errors)
+        return actions
+
+    def report(self, errors):
+        for src_path, error in errors:
+            print(f"Error processing {src_path}: {error}")
+
+    def run(self, interval):
+        self.build()
+        print(f"Watching {self.graph.content_dir}, {self.graph.static_dir} and {self.graph.template_path}"
+              " for changes (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(interval)
+                start = time.perf_counter()
+                actions = self.poll()
+                if actions:
+                    reused, rendered = self.block_cache.take_stats()
+                    print(f"Rebuilt {len(actions)} item(s) in {(time.perf_counter() - start) * 1000:.1f} ms"
+                          f" ({rendered} block(s) rendered, {reused} reused)")
+        except KeyboardInterrupt:
+            print("Stopped watching")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the site, then rebuild affected pages whenever inputs change")
+    parser.add_argument('basepath', nargs='?', default='/', help="URL prefix the site is served under")
+    parser.add_argument('--interval', type=float, default=0.5, help="seconds between polls (default 0.5)")
+    parser.add_argument('--fingerprint-assets', action='store_true',
+                        help="copy static files under content-hashed names and point links at them")
+    parser.add_argument('--gzip', action='store_true',
+                        help="write a .gz sidecar next to each compressible output file")
+    parser.add_argument('--gzip-min-size', type=int, default=MIN_SIZE, metavar='BYTES',
+                        help=f"don't compress files smaller than this (default {MIN_SIZE})")
+    parser.add_argument('--external-links', action='store_true',
+                        help='open links to other sites in a new tab (rel="noopener noreferrer" target="_blank")')
+    parser.add_argument('--quiet', '-q', action='store_true', help="don't print a line for every page and file")
+    args = parser.parse_args(argv)
+    set_quiet(args.quiet)
+    Watcher(args.basepath, fingerprint=args.fingerprint_assets, gzip=args.gzip, gzip_min_size=args.gzip_min_size,
+            external_links=args.external_links).run(args.interval)
+
+
+if __name__ == "__main__":
+    main()
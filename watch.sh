@@ -0,0 +1,3 @@
+python3 src/watch.py &
+trap "kill $!" EXIT
+mkdir -p docs && cd docs && python3 -m http.server 8000